@@ -0,0 +1,149 @@
+"""
+Article sections - Split Markdown articles into sections and stitch them
+
+Long-form generation writes an article's sections concurrently and stitches
+them together; targeted regeneration splits an article, rewrites some of
+its sections and splices them back. A section is a heading at the article's
+section level (the shallowest level below the title) plus everything up to
+the next such heading. Headings inside code fences are ignored.
+"""
+
+import re
+from typing import Optional, Dict, Any, List, Tuple
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_WRAPPER_FENCE_RE = re.compile(r"^\s*```(?:markdown|md)?\s*\n(.*?)\n\s*```\s*$", re.S)
+
+
+def _headings(lines: List[str]) -> List[Tuple[int, int, str]]:
+    """(line index, level, text) of every Markdown heading outside code fences"""
+    found = []
+    in_fence = False
+    for i, line in enumerate(lines):
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else _HEADING_RE.match(line)
+        if match:
+            found.append((i, len(match.group(1)), match.group(2).strip()))
+    return found
+
+
+def _section_starts(lines: List[str]) -> Tuple[int, List[Tuple[int, str]]]:
+    """(section level, [(line index, heading)]) of an article's sections"""
+    headings = _headings(lines)
+    if headings and headings[0][1] == 1:
+        # The article title is not a section
+        headings = headings[1:]
+    if not headings:
+        return 0, []
+    level = min(h[1] for h in headings)
+    return level, [(i, text) for i, lvl, text in headings if lvl == level]
+
+
+def split_sections(markdown: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Split an article into (preamble, sections). The preamble is the title
+    and introduction; each section is {"heading", "level", "text"} with
+    text including its heading line. No sections if the article has no headings
+    below the title.
+    """
+    lines = (markdown or "").splitlines()
+    level, starts = _section_starts(lines)
+    if not starts:
+        return (markdown or "").strip(), []
+
+    preamble = "\n".join(lines[:starts[0][0]]).strip()
+    sections = []
+    for n, (start, heading) in enumerate(starts):
+        end = starts[n + 1][0] if n + 1 < len(starts) else len(lines)
+        sections.append({"heading": heading, "level": level, "text": "\n".join(lines[start:end]).strip()})
+    return preamble, sections
+
+
+def _blank_run(lines: List[str], from_end: bool = False) -> int:
+    """Number of blank lines at the start (or end) of lines"""
+    count = 0
+    for line in (reversed(lines) if from_end else lines):
+        if line.strip():
+            break
+        count += 1
+    return count
+
+
+def splice_sections(markdown: str, replacements: Dict[int, str], intro: Optional[str] = None) -> str:
+    """
+    Replace some sections of an article (by split_sections index) and, if
+    given, its introduction, keeping everything else byte for byte: untouched
+    sections, code blocks and the whitespace between sections are not
+    re-rendered. A replaced segment keeps the blank lines around it.
+    """
+    lines = (markdown or "").split("\n")
+    _, starts = _section_starts(lines)
+    bounds = [0] + [i for i, _ in starts] + [len(lines)]
+    segments = [lines[bounds[n]:bounds[n + 1]] for n in range(len(bounds) - 1)]
+
+    def replace(segment: List[str], text: str) -> List[str]:
+        lead = _blank_run(segment)
+        trail = _blank_run(segment, from_end=True) if lead < len(segment) else 0
+        return segment[:lead] + text.strip().split("\n") + segment[len(segment) - trail:]
+
+    if intro is not None:
+        preamble = segments[0]
+        first = _blank_run(preamble)
+        keep = first + 1 if first < len(preamble) and preamble[first].startswith("# ") else 0
+        rest = preamble[keep:]
+        if keep and not _blank_run(rest):
+            rest = [""] + rest
+        segments[0] = preamble[:keep] + replace(rest, intro)
+    for index, text in replacements.items():
+        segments[index + 1] = replace(segments[index + 1], text)
+    return "\n".join(line for segment in segments for line in segment)
+
+
+def join_sections(preamble: str, texts: List[str]) -> str:
+    """Preamble and section texts, separated by one blank line (texts are not re-rendered)"""
+    parts = [p.strip() for p in [preamble, *texts] if p and p.strip()]
+    return "\n\n".join(parts) + "\n"
+
+
+def clean_section(text: str, heading: Optional[str], level: int = 2) -> str:
+    """
+    Normalize a generated section: unwrap a ```markdown fence, drop a
+    repeated article title, make it start with `heading` at `level`, and
+    demote any other heading at or above that level to a sub-heading.
+    With heading=None (an introduction) no heading is added.
+    """
+    text = (text or "").strip()
+    wrapped = _WRAPPER_FENCE_RE.match(text)
+    if wrapped:
+        text = wrapped.group(1).strip()
+
+    lines = text.splitlines()
+    while lines and (not lines[0].strip() or lines[0].startswith("# ")):
+        lines.pop(0)
+    if heading is not None:
+        first = _HEADING_RE.match(lines[0]) if lines else None
+        if first and first.group(2).strip().strip("*").strip() == heading.strip():
+            lines.pop(0)
+        lines = [f"{'#' * level} {heading.strip()}", ""] + lines
+
+    # Demote competing headings and collapse blank runs, outside code fences
+    cleaned: List[str] = []
+    in_fence = False
+    for i, line in enumerate(lines):
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        elif not in_fence:
+            if not line.strip() and cleaned and not cleaned[-1].strip():
+                continue
+            match = _HEADING_RE.match(line)
+            if match and len(match.group(1)) <= level and not (i == 0 and heading is not None):
+                line = f"{'#' * min(level + 1, 6)} {match.group(2).strip()}"
+        cleaned.append(line)
+    return "\n".join(cleaned).strip()
+
+
+def stitch_article(title: str, intro: str, sections: List[str]) -> str:
+    """The full article: title, introduction and sections (already cleaned)"""
+    return join_sections(f"# {title.strip()}\n\n{clean_section(intro, None)}", sections)
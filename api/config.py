@@ -18,6 +18,10 @@ class Settings(BaseSettings):
     
     # Firecrawl
     firecrawl_api_key: str = os.getenv("FIRECRAWL_API_KEY", "")
+    # Threads for blocking Firecrawl scrapes (an abandoned scrape holds one
+    # until it returns) and the per-scrape timeout (seconds)
+    firecrawl_workers: int = int(os.getenv("FIRECRAWL_WORKERS", "8"))
+    firecrawl_scrape_timeout: float = float(os.getenv("FIRECRAWL_SCRAPE_TIMEOUT", "30"))
     
     # OpenAI
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
@@ -26,12 +30,104 @@ class Settings(BaseSettings):
     supabase_url: str = os.getenv("SUPABASE_URL", "")
     supabase_key: str = os.getenv("SUPABASE_KEY", "")
     
+    # Database backend: "supabase" (default) or "sqlite" for local benchmarking
+    db_backend: str = os.getenv("DB_BACKEND", "supabase")
+    local_db_path: str = os.getenv("LOCAL_DB_PATH", "geo_local.db")
+    
+    # Project cache (seconds; 0 disables). Workers on one host share
+    # invalidations through CACHE_BUS_PATH (defaults to a temp file).
+    project_cache_ttl: float = float(os.getenv("PROJECT_CACHE_TTL", "30"))
+    cache_bus_path: str = os.getenv("CACHE_BUS_PATH", "")
+    
+    # Write-behind persistence for posts, reports and keywords (off by default).
+    # Pending writes are spooled to WRITE_BEHIND_DIR so a crash loses nothing.
+    write_behind_enabled: bool = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+    write_behind_dir: str = os.getenv("WRITE_BEHIND_DIR", "write_behind_spool")
+    write_behind_batch_size: int = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "100"))
+    write_behind_flush_interval: float = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.5"))
+    
+    # Generated images: concurrent DALL-E calls, where images are stored,
+    # and the public origin prefixed to their URLs ("" = same origin)
+    image_concurrency: int = int(os.getenv("IMAGE_CONCURRENCY", "3"))
+    image_dir: str = os.getenv("IMAGE_DIR", "generated_images")
+    public_base_url: str = os.getenv("PUBLIC_BASE_URL", "")
+    
+    # Image storage: "local" (IMAGE_DIR, needs PUBLIC_BASE_URL unless
+    # DB_BACKEND=sqlite) or "supabase" (Storage bucket MEDIA_BUCKET); unset
+    # picks local when PUBLIC_BASE_URL is set or DB_BACKEND=sqlite, else
+    # supabase. Plus the process pool and encoding of WebP variants
+    media_storage: str = os.getenv("MEDIA_STORAGE", "")
+    media_bucket: str = os.getenv("MEDIA_BUCKET", "media")
+    media_workers: int = int(os.getenv("MEDIA_WORKERS", "2"))
+    media_thumbnail_size: int = int(os.getenv("MEDIA_THUMBNAIL_SIZE", "320"))
+    media_webp_quality: int = int(os.getenv("MEDIA_WEBP_QUALITY", "80"))
+    
+    # WordPress publishing: concurrent requests per site, retries of
+    # 429/5xx/network failures, and the per-request timeout (seconds)
+    wordpress_site_concurrency: int = int(os.getenv("WORDPRESS_SITE_CONCURRENCY", "4"))
+    wordpress_max_retries: int = int(os.getenv("WORDPRESS_MAX_RETRIES", "3"))
+    wordpress_timeout: float = float(os.getenv("WORDPRESS_TIMEOUT", "30"))
+
+    # Scheduled publishing: due posts dispatched per batch, how often the
+    # in-memory timer is resynced with the DB, when a claimed post whose
+    # worker died is released (seconds), and attempts before giving up
+    scheduler_enabled: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    scheduler_batch_size: int = int(os.getenv("SCHEDULER_BATCH_SIZE", "50"))
+    scheduler_resync_interval: float = float(os.getenv("SCHEDULER_RESYNC_INTERVAL", "300"))
+    scheduler_claim_timeout: float = float(os.getenv("SCHEDULER_CLAIM_TIMEOUT", "600"))
+    scheduler_max_attempts: int = int(os.getenv("SCHEDULER_MAX_ATTEMPTS", "5"))
+    
     # Perplexity API
     perplexity_api_key: str = os.getenv("PERPLEXITY_API_KEY", "")
+
+    # Perplexity research cache (seconds; 0 disables): how long social trends
+    # and deep research stay fresh, and for how long after that a stale
+    # result is still served while it is refreshed in the background
+    perplexity_trends_ttl: float = float(os.getenv("PERPLEXITY_TRENDS_TTL", "21600"))
+    perplexity_research_ttl: float = float(os.getenv("PERPLEXITY_RESEARCH_TTL", "86400"))
+    perplexity_stale_ttl: float = float(os.getenv("PERPLEXITY_STALE_TTL", "43200"))
+    
+    # Company analysis: seconds a website scrape may run before a Perplexity
+    # lookup is started in parallel (0 = only after the scrape fails)
+    analyze_hedge_after: float = float(os.getenv("ANALYZE_HEDGE_AFTER", "8"))
+    
+    # Profile generation: deadlines (seconds) of the website scrape and the
+    # Perplexity news lookup that run concurrently; a late source is left out
+    profile_scrape_deadline: float = float(os.getenv("PROFILE_SCRAPE_DEADLINE", "20"))
+    profile_news_deadline: float = float(os.getenv("PROFILE_NEWS_DEADLINE", "30"))
     
     # SerpApi (for SEO rankings)
     serpapi_key: str = os.getenv("SERPAPI_KEY", "")
     
+    # Map-reduce analysis
+    analysis_map_concurrency: int = int(os.getenv("ANALYSIS_MAP_CONCURRENCY", "8"))
+    analysis_map_max_calls: int = int(os.getenv("ANALYSIS_MAP_MAX_CALLS", "60"))
+    
+    # Long-form articles: sections written concurrently, the default target
+    # length (words) of a long-form piece, and extra attempts per failed section
+    article_section_concurrency: int = int(os.getenv("ARTICLE_SECTION_CONCURRENCY", "6"))
+    article_long_form_words: int = int(os.getenv("ARTICLE_LONG_FORM_WORDS", "3000"))
+    article_section_retries: int = int(os.getenv("ARTICLE_SECTION_RETRIES", "2"))
+    
+    # Logging: level, "json" or "text" lines, and the fraction of
+    # below-WARNING records kept
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_format: str = os.getenv("LOG_FORMAT", "json")
+    log_sample_rate: float = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+    
+    # Access log: fraction of successful requests logged (errors and slow
+    # requests always are) and how many body bytes to include (0 = none;
+    # secrets are redacted and auth routes are never included)
+    request_log_sample_rate: float = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "1.0"))
+    request_log_body_bytes: int = int(os.getenv("REQUEST_LOG_BODY_BYTES", "0"))
+    request_log_slow_ms: float = float(os.getenv("REQUEST_LOG_SLOW_MS", "2000"))
+    
+    # Tracing: "" (off), "console", "file" (JSON lines in TRACE_FILE) or
+    # "otlp"; TRACE_SAMPLE_RATE is the fraction of new traces recorded
+    trace_exporter: str = os.getenv("TRACE_EXPORTER", "")
+    trace_file: str = os.getenv("TRACE_FILE", "traces.jsonl")
+    trace_sample_rate: float = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+    
     # App settings
     debug: bool = os.getenv("DEBUG", "false").lower() == "true"
     
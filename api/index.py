@@ -5,20 +5,67 @@ Main entry point for Vercel deployment
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
+import inspect
 import os
 
 # Import routers
 from api.routers import crawler, intelligence, projects, production, publishing, auth
+from api.services.cache_service import get_cache_service
+from api.services.write_behind_service import get_write_behind_service
+from api.services.media_service import get_media_service
+from api.services import firecrawl_service, publishing_service
+from api.services.scheduler_service import get_scheduler_service
+from api.request_logging import RequestLoggingMiddleware
+from api.logging_config import get_logger, setup_logging
+from api.metrics import MetricsMiddleware, render_metrics, mark_worker_dead, CONTENT_TYPE_LATEST
+from api.tracing import TracingMiddleware, setup_tracing, shutdown_tracing
+
+setup_logging()
+setup_tracing()
+logger = get_logger(__name__)
 
 # Lifespan for startup/shutdown events
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    print("🚀 GEO Content Engine API starting...")
+    logger.info("🚀 GEO Content Engine API starting...")
+    get_media_service().check_config()
+    await get_write_behind_service().start()
+    await get_scheduler_service().start()
     yield
     # Shutdown
-    print("👋 GEO Content Engine API shutting down...")
+    logger.info("👋 GEO Content Engine API shutting down...")
+    # Each step runs even if an earlier one fails
+    await _shutdown_step("scheduler", get_scheduler_service().stop)
+    await _shutdown_step("write-behind", get_write_behind_service().stop)
+    await _shutdown_step("media", get_media_service().shutdown)
+    await _shutdown_step("firecrawl", _shutdown_firecrawl)
+    await _shutdown_step("publishing", _close_publishing)
+    await _shutdown_step("metrics", mark_worker_dead)
+    await _shutdown_step("tracing", shutdown_tracing)
+
+
+async def _shutdown_step(name: str, step) -> None:
+    try:
+        result = step()
+        if inspect.isawaitable(result):
+            await result
+    except Exception:
+        logger.exception(f"Shutdown step '{name}' failed")
+
+
+# Only services this worker actually created are shut down; creating one
+# here would fail (or open clients) for no reason, e.g. without FIRECRAWL_API_KEY
+def _shutdown_firecrawl() -> None:
+    if firecrawl_service._firecrawl_service is not None:
+        firecrawl_service._firecrawl_service.shutdown()
+
+
+async def _close_publishing() -> None:
+    if publishing_service._publishing_service is not None:
+        await publishing_service._publishing_service.close()
 
 # Create FastAPI app
 app = FastAPI(
@@ -37,27 +84,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    import json
-    
-    # Clone the request body because it can be read only once
-    body_bytes = await request.body()
-    
-    # Re-package the body for the actual request handler
-    async def receive():
-        return {"type": "http.request", "body": body_bytes}
-    request._receive = receive
-    
-    try:
-        if request.method == "POST":
-            body_str = body_bytes.decode("utf-8")
-            print(f"[{request.method}] {request.url.path} - Body: {body_str[:500]}...", flush=True)
-    except Exception as e:
-        print(f"Error logging request: {e}", flush=True)
-        
-    response = await call_next(request)
-    return response
+# Access log (streams the body through; never buffers more than a short prefix)
+app.add_middleware(RequestLoggingMiddleware)
+
+# Prometheus latency by route template (added last so it sees the full request)
+app.add_middleware(MetricsMiddleware)
+
+# Server span per request (outermost, so access log records carry the trace id)
+app.add_middleware(TracingMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Auth"])
@@ -73,9 +107,15 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "GEO Content Engine API",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "cache": get_cache_service().stats()
     }
 
+# Prometheus scrape endpoint (aggregates all workers when PROMETHEUS_MULTIPROC_DIR is set)
+@app.get("/api/metrics", include_in_schema=False)
+async def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 # Root endpoint
 @app.get("/api")
 async def root():
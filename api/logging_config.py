@@ -0,0 +1,173 @@
+"""
+Logging Config - Non-blocking structured logging for the API
+
+All application loggers live under "api" (use get_logger(__name__)). Records:
+1. Are sampled below WARNING (LOG_SAMPLE_RATE) and filtered by LOG_LEVEL
+2. Pick up request-scoped fields (request_id, project_id) from contextvars
+   and the active trace id, when tracing is on
+3. Are put on a queue by a QueueHandler; a listener thread formats them
+   (JSON lines by default, LOG_FORMAT=text for local development) and
+   writes to stdout, so the event loop never blocks on I/O
+
+Extra structured fields are passed with `extra=`, e.g.
+    logger.info("call finished", extra={"upstream": "perplexity", "duration_ms": 812.4})
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import random
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Dict, Any
+
+from api.config import get_settings
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+
+ROOT_LOGGER = "api"
+ACCESS_LOGGER = "api.access"
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+project_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("project_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the "api" hierarchy (module __name__ values already are)"""
+    if name != ROOT_LOGGER and not name.startswith(ROOT_LOGGER + "."):
+        name = f"{ROOT_LOGGER}.{name}"
+    return logging.getLogger(name)
+
+
+def bind_project(project_id: Optional[str]) -> None:
+    """Tag the rest of the current request's log records with a project id"""
+    if project_id:
+        project_id_var.set(project_id)
+
+
+@contextmanager
+def log_context(**fields: Optional[str]):
+    """Temporarily set request_id / project_id for records logged inside the block"""
+    variables = {"request_id": request_id_var, "project_id": project_id_var}
+    tokens = [(variables[k], variables[k].set(v)) for k, v in fields.items() if k in variables]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copy request-scoped contextvars onto the record (runs in the caller's context)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.project_id = project_id_var.get()
+        record.trace_id = None
+        if otel_trace is not None:
+            span_context = otel_trace.get_current_span().get_span_context()
+            if span_context.is_valid:
+                record.trace_id = format(span_context.trace_id, "032x")
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of records below WARNING; warnings and errors always pass"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        # The access log applies its own sampling (REQUEST_LOG_SAMPLE_RATE)
+        return record.name == ACCESS_LOGGER or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the standard and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines; extra fields are appended as key=value"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:<7} {record.getMessage()}"
+        extras = " ".join(
+            f"{k}={v}" for k, v in vars(record).items() if k not in _RESERVED and v is not None
+        )
+        if extras:
+            line += f" ({extras})"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class _PreparedQueueHandler(QueueHandler):
+    """Enqueue the record as-is; formatting happens on the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message now (args may be mutable) but leave formatting
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging() -> None:
+    """Configure the "api" logger tree once per process"""
+    global _listener
+    if _listener is not None:
+        return
+    settings = get_settings()
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(TextFormatter() if settings.log_format == "text" else JsonFormatter())
+    log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, stream, respect_handler_level=False)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    handler = _PreparedQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(settings.log_sample_rate))
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers = [handler]
+    root.setLevel(settings.log_level.upper())
+    root.propagate = False
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,255 @@
+"""
+Metrics - Prometheus instrumentation for routes, upstream calls and caches
+
+Exposed at /api/metrics. Collected series:
+- http_request_duration_seconds{method,route,status}   route = path template
+- http_requests_in_flight
+- upstream_request_duration_seconds{upstream,operation}
+- upstream_errors_total{upstream,operation}
+- upstream_requests_in_flight{upstream}
+- cache_lookups_total{cache,result}                     hit ratio = hit / (hit + miss)
+
+Each upstream call is also a client span (see api.tracing).
+
+Upstreams are instrumented three ways:
+- httpx clients get a TrackedTransport (OpenAI, Perplexity, SerpApi, PageSpeed, WordPress)
+- Supabase queries go through track_upstream in SupabaseService
+- Synchronous SDK calls (Firecrawl) are wrapped in `with track_upstream(...)`
+
+With several workers, set PROMETHEUS_MULTIPROC_DIR to an empty directory
+shared by them; /api/metrics then aggregates every worker's samples.
+prometheus_client is optional: without it everything here is a no-op.
+"""
+
+import os
+import re
+import time
+from typing import Optional
+
+import httpx
+
+from api.logging_config import get_logger
+from api.tracing import start_span, mark_span_error
+
+try:
+    from prometheus_client import (
+        CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+    )
+    from prometheus_client import multiprocess
+except ImportError:
+    Counter = Gauge = Histogram = None
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = get_logger(__name__)
+
+# LLM and research calls routinely take tens of seconds
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+_ID_SEGMENT_RE = re.compile(r"/(?:\d+|[0-9a-fA-F-]{32,36})(?=/|$)")
+
+
+class _NoopMetric:
+    """Stand-in when prometheus_client is not installed"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+
+def _histogram(name, documentation, labels):
+    if Histogram is None:
+        return _NoopMetric()
+    return Histogram(name, documentation, labels, buckets=LATENCY_BUCKETS)
+
+
+def _counter(name, documentation, labels):
+    return Counter(name, documentation, labels) if Counter is not None else _NoopMetric()
+
+
+def _gauge(name, documentation, labels=()):
+    if Gauge is None:
+        return _NoopMetric()
+    # livesum: add up the live workers' values when aggregating
+    return Gauge(name, documentation, labels, multiprocess_mode="livesum")
+
+
+REQUEST_LATENCY = _histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"]
+)
+REQUESTS_IN_FLIGHT = _gauge("http_requests_in_flight", "HTTP requests currently being served")
+UPSTREAM_LATENCY = _histogram(
+    "upstream_request_duration_seconds", "Latency of calls to external services", ["upstream", "operation"]
+)
+UPSTREAM_ERRORS = _counter(
+    "upstream_errors_total", "Failed calls to external services", ["upstream", "operation"]
+)
+UPSTREAM_IN_FLIGHT = _gauge(
+    "upstream_requests_in_flight", "Calls to external services in progress", ["upstream"]
+)
+CACHE_LOOKUPS = _counter("cache_lookups_total", "Cache lookups by result", ["cache", "result"])
+
+
+class track_upstream:
+    """
+    Time one call to an external service (usable around sync or awaited code):
+
+        with track_upstream("firecrawl", "scrape") as call:
+            result = self.app.scrape(url)
+            if not result: call.fail()
+
+    Also opens a client span "<upstream> <operation>"; call.set(...) adds
+    attributes to it. Exceptions count as errors and are re-raised.
+    """
+
+    def __init__(self, upstream: str, operation: str = "call"):
+        self.upstream = upstream
+        self.operation = operation
+        self.failed = False
+        self.duration = 0.0
+        self.span = None
+        self._start = 0.0
+        self._span_cm = None
+
+    def fail(self) -> None:
+        """Count this call as an error without raising"""
+        self.failed = True
+
+    def set(self, **attributes) -> None:
+        """Attach attributes (URL, status, model...) to this call's span"""
+        self.span.set_attributes({k: v for k, v in attributes.items() if v is not None})
+
+    def __enter__(self):
+        self._span_cm = start_span(
+            f"{self.upstream} {self.operation}",
+            {"upstream": self.upstream, "operation": self.operation},
+            kind="client",
+        )
+        self.span = self._span_cm.__enter__()
+        UPSTREAM_IN_FLIGHT.labels(self.upstream).inc()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._start
+        UPSTREAM_IN_FLIGHT.labels(self.upstream).dec()
+        UPSTREAM_LATENCY.labels(self.upstream, self.operation).observe(self.duration)
+        failed = self.failed or exc_type is not None
+        if failed:
+            UPSTREAM_ERRORS.labels(self.upstream, self.operation).inc()
+        logger.debug(
+            f"{self.upstream} {self.operation} {'failed' if failed else 'ok'} in {self.duration * 1000:.0f}ms",
+            extra={"upstream": self.upstream, "operation": self.operation,
+                   "duration_ms": round(self.duration * 1000, 1), "ok": not failed}
+        )
+        if self.failed and exc_type is None:
+            mark_span_error(self.span)
+        self._span_cm.__exit__(exc_type, exc, tb)
+        return False
+
+
+def operation_from_path(path: str) -> str:
+    """Low-cardinality operation label from a URL path (ids collapsed)"""
+    return _ID_SEGMENT_RE.sub("/:id", path or "/") or "/"
+
+
+def route_template(scope) -> str:
+    """
+    Full path template of the matched route, e.g. /api/projects/{project_id}.
+
+    Rebuilt from the request path and path_params because the route object
+    in the scope may only know its path relative to an included router.
+    Unmatched paths share one label to keep cardinality bounded.
+    """
+    if scope.get("route") is None:
+        return "unmatched"
+    by_value = {str(value): name for name, value in (scope.get("path_params") or {}).items()}
+    segments = (scope.get("path") or "/").split("/")
+    return "/".join(f"{{{by_value[seg]}}}" if seg in by_value else seg for seg in segments)
+
+
+class TrackedTransport(httpx.AsyncBaseTransport):
+    """httpx transport that times every request against one upstream label"""
+
+    def __init__(self, upstream: str, transport: Optional[httpx.AsyncBaseTransport] = None, **transport_kwargs):
+        self.upstream = upstream
+        self._transport = transport or httpx.AsyncHTTPTransport(**transport_kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with track_upstream(self.upstream, operation_from_path(request.url.path)) as call:
+            # No query string: some upstreams take API keys as parameters
+            call.set(**{"http.method": request.method,
+                        "http.url": f"{request.url.scheme}://{request.url.host}{request.url.path}"})
+            response = await self._transport.handle_async_request(request)
+            call.set(**{"http.status_code": response.status_code})
+            if response.status_code >= 400:
+                call.fail()
+            return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def tracked_transport(upstream: str, verify: bool = True, **kwargs) -> TrackedTransport:
+    """
+    Transport for httpx.AsyncClient(transport=...). Pass verify here: a
+    client's own verify setting does not apply to a custom transport.
+    """
+    return TrackedTransport(upstream, verify=verify, **kwargs)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests"""
+
+    def __init__(self, app, skip_paths=("/api/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_LATENCY.labels(scope.get("method", ""), route_template(scope), str(status)).observe(
+                time.perf_counter() - start
+            )
+
+
+def render_metrics() -> bytes:
+    """Exposition-format payload (aggregated across workers in multiprocess mode)"""
+    if Counter is None:
+        return b"# prometheus_client is not installed\n"
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_worker_dead() -> None:
+    """Drop this worker's live gauges from the shared multiprocess directory"""
+    if MULTIPROCESS and Counter is not None:
+        multiprocess.mark_process_dead(os.getpid())
@@ -37,6 +37,21 @@ CREATE TABLE IF NOT EXISTS crawl_results (
 CREATE INDEX IF NOT EXISTS idx_crawl_project ON crawl_results(project_id);
 CREATE INDEX IF NOT EXISTS idx_crawl_url ON crawl_results(url);
 
+-- ==================== Crawl Chunks Table ====================
+-- Paragraph-aligned chunks of crawl_results, used by the retrieval index
+CREATE TABLE IF NOT EXISTS crawl_chunks (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    project_id UUID REFERENCES projects(id) ON DELETE CASCADE,
+    crawl_result_id UUID REFERENCES crawl_results(id) ON DELETE CASCADE,
+    url TEXT,
+    chunk_index INTEGER DEFAULT 0,
+    content TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_crawl_chunks_project ON crawl_chunks(project_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_crawl_chunks_result_chunk ON crawl_chunks(crawl_result_id, chunk_index);
+
 -- ==================== Tasks Table ====================
 CREATE TABLE IF NOT EXISTS tasks (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -73,6 +88,13 @@ CREATE TABLE IF NOT EXISTS gap_reports (
 
 CREATE INDEX IF NOT EXISTS idx_gap_reports_project ON gap_reports(project_id);
 
+-- ==================== Per-Project Read Indexes ====================
+-- Every per-project list filters on project_id and pages by (created_at, id).
+-- setup_db.py applies these (and later changes) as versioned migrations.
+CREATE INDEX IF NOT EXISTS idx_crawl_results_project_created ON crawl_results (project_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_crawl_chunks_project_created ON crawl_chunks (project_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_tasks_project_created ON tasks (project_id, created_at DESC, id DESC);
+
 -- ==================== Row Level Security (Optional) ====================
 -- Enable RLS for all tables (if you want user-based access control)
 
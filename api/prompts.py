@@ -4,7 +4,7 @@ This file allows for easy modification and versioning of AI prompts.
 """
 
 from typing import Optional, Dict, Any, List
-import json
+from api.token_budget import DEFAULT_MODEL, fit_json, fit_text, pack_sections, get_context_budget
 
 # ==========================================
 # KEYWORD GENERATION PROMPTS
@@ -18,8 +18,8 @@ SYSTEM_KEYWORD_GENERATION = (
     "你的任务是为客户挖掘那些**具有强烈交易意图**且**竞争适度**的关键词。"
 )
 
-def get_keyword_generation_prompt(profile: Dict[str, Any]) -> str:
-    profile_json = json.dumps(profile, ensure_ascii=False)[:3000]
+def get_keyword_generation_prompt(profile: Dict[str, Any], model: str = DEFAULT_MODEL) -> str:
+    profile_json = fit_json(profile, 2000, model)
     return f"""
     基于以下企业/产品画像，挖掘 8-12 个具有**高商业价值**的 GEO 关键词。
     
@@ -71,8 +71,8 @@ SYSTEM_SEARCH_SIMULATION = (
     "你需要站在用户的角度，思考他们会问什么问题，寻找什么解决方案。"
 )
 
-def get_search_simulation_prompt(profile: Dict[str, Any], n: int = 5) -> str:
-    profile_json = json.dumps(profile, ensure_ascii=False)[:3000]
+def get_search_simulation_prompt(profile: Dict[str, Any], n: int = 5, model: str = DEFAULT_MODEL) -> str:
+    profile_json = fit_json(profile, 2000, model)
     return f"""
     基于以下企业/产品画像，模拟 **{n} 个** 真实用户可能会使用的搜索查询（Search Queries）。
     
@@ -115,7 +115,8 @@ def get_discovery_prompt(niche_or_domain: str) -> str:
     请只返回 JSON 数据。
     """
 
-def get_hidden_competitor_prompt(company_profile_summary: str) -> str:
+def get_hidden_competitor_prompt(company_profile: Dict[str, Any], model: str = DEFAULT_MODEL) -> str:
+    company_profile_summary = fit_json(company_profile, 1500, model)
     return f"""
     基于以下我方企业画像，寻找 3 个“隐形竞品” (Hidden Competitors)。
     
@@ -136,11 +137,11 @@ def get_hidden_competitor_prompt(company_profile_summary: str) -> str:
 
 SYSTEM_COMPANY_ANALYSIS = "你是一位专业的企业分析师，擅长从网站内容中提取结构化信息。"
 
-def get_company_analysis_prompt(content: str) -> str:
+def get_company_analysis_prompt(content: str, model: str = DEFAULT_MODEL) -> str:
     return f"""
     分析以下网站内容，提取公司信息。请用 JSON 格式返回：
 
-    {content[:8000]}
+    {fit_text(content, 6000, model)}
 
     请提取：
     1. company_name: 公司名称
@@ -163,7 +164,15 @@ SYSTEM_COMPANY_PROFILE = (
     "你必须引用真实的数据、事件和趋势，让客户相信你确实做了深入调研。"
 )
 
-def get_company_profile_prompt(company_name: str, domain: str, content_context: str, latest_news: str = "") -> str:
+def get_company_profile_prompt(company_name: str, domain: str, content_context: str, latest_news: str = "", model: str = DEFAULT_MODEL) -> str:
+    # Latest news is scarcer than site content, so it gets first claim on the budget
+    packed = pack_sections([
+        {"name": "news", "text": latest_news, "priority": 1, "max_tokens": 3000},
+        {"name": "content", "text": content_context, "priority": 2, "max_tokens": 4000},
+    ], model)
+    latest_news = packed["news"]
+    content_context = packed["content"]
+    
     news_section = ""
     if latest_news:
         news_section = f"""
@@ -241,15 +250,31 @@ SYSTEM_GAP_ANALYSIS = (
     "你需要引用双方网站的真实内容片段来支撑你的分析结论。"
 )
 
-def get_gap_analysis_prompt(company_profile: Dict[str, Any], competitor_summary: str, our_content: str = "") -> str:
-    profile_json = json.dumps(company_profile, ensure_ascii=False)
+# Caps of the fixed sections of the gap analysis prompts; the competitor
+# content gets the rest of the model's budget
+GAP_PROFILE_TOKENS = 2000
+GAP_OUR_CONTENT_TOKENS = 3000
+
+def gap_findings_budget(model: str = DEFAULT_MODEL, with_our_content: bool = True) -> int:
+    """Tokens of competitor content a gap analysis prompt is guaranteed to keep"""
+    fixed = GAP_PROFILE_TOKENS + (GAP_OUR_CONTENT_TOKENS if with_our_content else 0)
+    return max(0, get_context_budget(model) - fixed)
+
+def get_gap_analysis_prompt(company_profile: Dict[str, Any], competitor_summary: str, our_content: str = "", model: str = DEFAULT_MODEL) -> str:
+    packed = pack_sections([
+        {"name": "profile", "text": company_profile, "json": True, "priority": 1, "max_tokens": GAP_PROFILE_TOKENS},
+        {"name": "our_content", "text": our_content, "priority": 2, "max_tokens": GAP_OUR_CONTENT_TOKENS},
+        {"name": "competitors", "text": competitor_summary, "priority": 3},
+    ], model)
+    profile_json = packed["profile"]
+    competitor_summary = packed["competitors"]
     
     our_content_section = ""
-    if our_content:
+    if packed["our_content"]:
         our_content_section = f"""
     
     ## 我方网站实际内容（爬取摘要）：
-    {our_content[:5000]}
+    {packed["our_content"]}
     """
     
     return f"""
@@ -310,8 +335,13 @@ def get_gap_analysis_prompt(company_profile: Dict[str, Any], competitor_summary:
 
 SYSTEM_DEEP_ANALYSIS = "你是一位高级 GEO 策略顾问，擅长通过海量数据对比，挖掘企业在 AI 搜索引擎中的结构性短板。"
 
-def get_deep_gap_analysis_prompt(company_profile: Dict[str, Any], aggregated_competitor_content: str, kb_stats: Dict[str, Any]) -> str:
-    profile_json = json.dumps(company_profile, ensure_ascii=False)
+def get_deep_gap_analysis_prompt(company_profile: Dict[str, Any], aggregated_competitor_content: str, kb_stats: Dict[str, Any], model: str = DEFAULT_MODEL) -> str:
+    packed = pack_sections([
+        {"name": "profile", "text": company_profile, "json": True, "priority": 1, "max_tokens": GAP_PROFILE_TOKENS},
+        {"name": "kb", "text": aggregated_competitor_content, "priority": 2},
+    ], model)
+    profile_json = packed["profile"]
+    aggregated_competitor_content = packed["kb"]
     
     return f"""
     基于全网情报知识库（Knowledge Base）进行深度差距审计。
@@ -349,6 +379,86 @@ def get_deep_gap_analysis_prompt(company_profile: Dict[str, Any], aggregated_com
     ]
     """
 
+# ==========================================
+# 4b. Map-Reduce Gap Analysis Prompts
+# ==========================================
+
+SYSTEM_GAP_MAP = (
+    "你是一位 GEO 竞品情报提取员。你只负责从单个页面片段中提取结构化事实，"
+    "不做最终结论。所有证据必须是原文摘录。"
+)
+
+def get_gap_map_prompt(company_profile: Dict[str, Any], source: str, content: str, model: str = DEFAULT_MODEL) -> str:
+    """Map step: extract comparable findings from one page / competitor part"""
+    packed = pack_sections([
+        {"name": "profile", "text": company_profile, "json": True, "priority": 1, "max_tokens": 800},
+        {"name": "content", "text": content, "priority": 2, "max_tokens": 4000},
+    ], model)
+    
+    return f"""
+    从以下竞品页面片段中提取与我方形成对比的关键信息。
+    
+    ## 我方企业画像（仅用于判断相关性）：
+    {packed["profile"]}
+    
+    ## 页面来源：{source}
+    ## 页面片段：
+    {packed["content"]}
+    
+    请返回 JSON 格式（没有的信息返回空数组，不要编造）：
+    {{
+        "source": "{source}",
+        "value_props": [{{"dimension": "维度（如 产品价值传递、信任信号、定价）", "evidence": "原文摘录"}}],
+        "entities": ["页面强调的实体/概念/品牌"],
+        "structures": ["页面使用的结构化组件（如 FAQ、Price Table、Case Study、对比表）"],
+        "keywords": ["页面覆盖的搜索关键词"],
+        "trust_signals": ["权威背书、认证、数据引用等（原文摘录）"]
+    }}
+    """
+
+SYSTEM_GAP_MERGE = (
+    "你是一位 GEO 竞品情报整理员。你负责把多条竞品情报合并为一条更紧凑的情报，"
+    "去重并保留最有对比价值的证据，不做最终结论，不编造信息。"
+)
+
+def get_gap_merge_prompt(findings_text: str, model: str = DEFAULT_MODEL) -> str:
+    """Intermediate reduce step: condense several findings into one, same schema as the map step"""
+    return f"""
+    以下是从多个竞品页面提取的情报，请合并为一条紧凑的情报。
+    
+    ## 待合并情报：
+    {fit_text(findings_text, 4000, model)}
+    
+    ### 要求：
+    1. 去除重复与相近的条目，每个维度保留最有对比价值的证据（原文摘录，可缩短）。
+    2. 在 evidence 前用 [来源] 标注证据来自哪个页面，来源写域名或路径即可。
+    3. 合并后的篇幅不超过待合并情报的一半。
+    
+    请返回 JSON 格式（没有的信息返回空数组）：
+    {{
+        "value_props": [{{"dimension": "维度", "evidence": "[来源] 原文摘录"}}],
+        "entities": ["实体/概念/品牌"],
+        "structures": ["结构化组件"],
+        "keywords": ["搜索关键词"],
+        "trust_signals": ["[来源] 权威背书、认证、数据引用等"]
+    }}
+    """
+
+def format_gap_findings(findings: List[Dict[str, Any]]) -> str:
+    """Render map-step findings as compact text for the reduce prompt"""
+    blocks = []
+    for f in findings:
+        lines = [f"### 来源: {f.get('source', 'Unknown')}"]
+        for vp in f.get("value_props", []) or []:
+            if isinstance(vp, dict):
+                lines.append(f"- [{vp.get('dimension', '')}] {vp.get('evidence', '')}")
+        for key, label in (("entities", "实体"), ("structures", "结构组件"), ("keywords", "关键词"), ("trust_signals", "信任信号")):
+            values = [str(v) for v in (f.get(key) or [])]
+            if values:
+                lines.append(f"- {label}: {'; '.join(values)}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
 SYSTEM_CONTENT_ARTICLE = (
     "你是一位精通‘产品驱动增长’(Product-Led Growth) 的内容营销专家。"
     "你的核心目标是通过高价值的内容，潜移默化地让读者意识到：‘使用该产品是解决问题的最佳方案’。"
@@ -361,8 +471,13 @@ SYSTEM_CONTENT_SOCIAL = (
     "拒绝自嗨式文案，必须以产品为英雄 (Product as Hero)。"
 )
 
-def get_content_generation_prompt(title: str, content_type: str, profile: Dict[str, Any], context_data: Optional[Dict[str, Any]] = None) -> str:
-    profile_json = json.dumps(profile, ensure_ascii=False)
+def get_content_generation_prompt(title: str, content_type: str, profile: Dict[str, Any], context_data: Optional[Dict[str, Any]] = None, model: str = DEFAULT_MODEL) -> str:
+    packed = pack_sections([
+        {"name": "profile", "text": profile, "json": True, "priority": 1, "max_tokens": 2000},
+        {"name": "context", "text": (context_data or {}).get("content", ""), "priority": 2,
+         "max_tokens": 2500 if content_type == "Article" else 1500},
+    ], model)
+    profile_json = packed["profile"]
     product_name = profile.get('productName', '我们产品')
     usp = profile.get('uniqueSellingPoint', '核心优势')
     
@@ -372,7 +487,7 @@ def get_content_generation_prompt(title: str, content_type: str, profile: Dict[s
             context_section = f"""
             
             ### 权威调研数据 (Deep Research Data):
-            {context_data.get('content', '')[:3000]}
+            {packed["context"]}
             
             必须引用上述调研中的数据或观点，增加文章权威性。
             """
@@ -380,7 +495,7 @@ def get_content_generation_prompt(title: str, content_type: str, profile: Dict[s
             context_section = f"""
             
             ### 社交媒体热点趋势 (Social Trends):
-            {context_data.get('content', '')[:2000]}
+            {packed["context"]}
             
             必须结合上述热点趋势，让贴文更具传播力。
             """
@@ -428,12 +543,92 @@ def get_content_generation_prompt(title: str, content_type: str, profile: Dict[s
         6. **字数**：150 字左右，短小精悍，适合快速阅读。
         """
 
-def get_regenerate_content_prompt(original_content: str, feedback: str, content_type: str) -> str:
+SYSTEM_ARTICLE_OUTLINE = (
+    "你是一位资深内容策划编辑，擅长为 GEO 优化的长文设计逻辑严密、互不重复的章节大纲。"
+    "你只输出 JSON。"
+)
+
+def get_article_outline_prompt(title: str, profile: Dict[str, Any], context_data: Optional[Dict[str, Any]] = None, target_words: int = 3000, model: str = DEFAULT_MODEL) -> str:
+    """Long-form step 1: outline plus introduction, so sections can be written in parallel"""
+    packed = pack_sections([
+        {"name": "profile", "text": profile, "json": True, "priority": 1, "max_tokens": 1200},
+        {"name": "context", "text": (context_data or {}).get("content", ""), "priority": 2, "max_tokens": 1500},
+    ], model)
+    product_name = profile.get('productName', '我们产品')
+    
+    return f"""
+    为一篇深度 GEO 优化文章设计章节大纲，标题："{title}"
+    
+    企业背景：{packed["profile"]}
+    
+    ### 调研要点（供规划章节使用）：
+    {packed["context"] or "无"}
+    
+    ### 要求：
+    1. 全文约 {target_words} 字，拆分为 5-8 个章节，各章节字数之和约等于全文字数。
+    2. 采用 痛点-后果-解决方案 的递进逻辑，围绕 **{product_name}** 展开，章节之间不要重复。
+    3. 必须有且仅有 1 个章节负责 Markdown 对比表格（{product_name} vs 传统方案/竞品），其 component 为 "table"。
+    4. 最后一个章节为 FAQ（3-5 个问题，至少 1 个与 {product_name} 直接相关），其 component 为 "faq"。
+    5. intro 为 80-150 字的开篇导语，直接点出读者痛点。
+    
+    请返回 JSON：
+    {{
+        "intro": "开篇导语",
+        "sections": [
+            {{"heading": "章节标题", "points": ["本章要点"], "words": 400, "component": "none"}}
+        ]
+    }}
+    """
+
+def get_article_section_prompt(title: str, outline: Dict[str, Any], index: int, profile: Dict[str, Any], context_data: Optional[Dict[str, Any]] = None, model: str = DEFAULT_MODEL) -> str:
+    """Long-form step 2: one section, written with the whole outline in view"""
+    packed = pack_sections([
+        {"name": "profile", "text": profile, "json": True, "priority": 1, "max_tokens": 1200},
+        {"name": "context", "text": (context_data or {}).get("content", ""), "priority": 2, "max_tokens": 2000},
+    ], model)
+    sections = outline.get("sections", [])
+    section = sections[index]
+    product_name = profile.get('productName', '我们产品')
+    usp = profile.get('uniqueSellingPoint', '核心优势')
+    
+    plan = "\n".join(
+        f"    {i + 1}. {s.get('heading', '')}{'  <- 本章' if i == index else ''}"
+        for i, s in enumerate(sections)
+    )
+    points = "\n".join(f"    - {p}" for p in section.get("points", []) or [])
+    component = {
+        "table": f"本章必须包含 1 个 Markdown 表格，将 {product_name} 与传统方案/竞品对比，突出我方优势。",
+        "faq": f"本章为 FAQ：3-5 个高价值问答，至少 1 个问题与 {product_name} 直接相关。",
+    }.get(section.get("component"), "本章不需要表格或 FAQ。")
+    
+    return f"""
+    你正在与其他作者并行撰写文章《{title}》，你只负责其中一个章节。
+    
+    企业背景：{packed["profile"]}
+    
+    ### 权威调研数据 (Deep Research Data)：
+    {packed["context"] or "无"}
+    
+    ### 全文大纲：
+{plan}
+    
+    ### 本章：{section.get("heading", "")}
+    要点：
+{points or "    - 围绕本章标题展开"}
+    
+    ### 要求：
+    1. 以 "## {section.get("heading", "")}" 开头，约 {section.get("words", 400)} 字，可使用 ### 小标题。
+    2. 只写本章内容：不要写全文导语或总结，不要展开其他章节的主题。
+    3. 自然地体现 **{product_name}** 的价值与核心卖点 "{usp}"，引用调研中的数据或观点。
+    4. {component}
+    """
+
+def get_regenerate_content_prompt(original_content: str, feedback: str, content_type: str, model: str = DEFAULT_MODEL) -> str:
     return f"""
     请根据用户反馈，对以下内容进行修改优化。
     
     ### 原内容：
-    {original_content[:3000]}
+    {fit_text(original_content, 6000, model)}
     
     ### 用户修改意见 (Feedback)：
     "{feedback}"
@@ -446,6 +641,55 @@ def get_regenerate_content_prompt(original_content: str, feedback: str, content_
     """
 
 
+SYSTEM_SECTION_SELECTION = (
+    "你是一位内容编辑，负责判断用户的修改意见涉及文章的哪些章节。你只输出 JSON。"
+)
+
+def get_section_selection_prompt(feedback: str, sections: List[Dict[str, Any]], model: str = DEFAULT_MODEL) -> str:
+    """Targeted regeneration step 1: which sections (by index) the feedback applies to"""
+    listing = "\n".join(
+        f"    [{i}] {s['label']}: {fit_text(s['text'], 60, model)}"
+        for i, s in enumerate(sections)
+    )
+    return f"""
+    用户对一篇文章提出了修改意见，请判断需要修改哪些章节。
+    
+    ### 章节列表（序号、标题、开头摘录）：
+{listing}
+    
+    ### 用户修改意见 (Feedback)：
+    "{feedback}"
+    
+    ### 规则：
+    1. 只选择修改意见明确或直接涉及的章节，其余章节保持不变。
+    2. 如果意见针对全文（如整体语气、风格、字数），scope 返回 "all"。
+    
+    请返回 JSON：
+    {{"scope": "sections" 或 "all", "sections": [需要修改的章节序号]}}
+    """
+
+def get_section_regenerate_prompt(title: str, headings: List[str], section: Dict[str, Any], feedback: str, model: str = DEFAULT_MODEL) -> str:
+    """Targeted regeneration step 2: rewrite one section in place (the caller keeps sections within budget)"""
+    plan = "\n".join(f"    - {h}" for h in headings)
+    return f"""
+    请根据用户反馈，修改文章《{title}》中的一个章节。文章其余部分保持不变。
+    
+    ### 全文章节：
+{plan}
+    
+    ### 需要修改的章节（{section["label"]}）：
+    {section["text"]}
+    
+    ### 用户修改意见 (Feedback)：
+    "{feedback}"
+    
+    ### 任务：
+    保持本章的优点和结构（表格、FAQ 等组件保留），只针对修改意见调整本章内容，不要写其他章节。
+    {"保留原章节标题。" if section.get("heading") else "这是文章开篇导语，不要输出文章标题。"}
+    请直接返回修改后的本章内容。
+    """
+
+
 # ==========================================
 # 5. Image Generation Prompts (Phase 4)
 # ==========================================
@@ -482,14 +726,18 @@ SYSTEM_TITLE_GENERATION = (
     "你深谙用户心理 (FOMO, 好奇心, 利益点) 和平台算法推荐机制。"
 )
 
-def get_title_generation_prompt(topic: str, niche: str, profile: Dict[str, Any], trends_context: str = "", n: int = 10) -> str:
-    profile_json = json.dumps(profile, ensure_ascii=False)
+def get_title_generation_prompt(topic: str, niche: str, profile: Dict[str, Any], trends_context: str = "", n: int = 10, model: str = DEFAULT_MODEL) -> str:
+    packed = pack_sections([
+        {"name": "profile", "text": profile, "json": True, "priority": 1, "max_tokens": 2000},
+        {"name": "trends", "text": trends_context, "priority": 2, "max_tokens": 2500},
+    ], model)
+    profile_json = packed["profile"]
     
     trends_section = ""
-    if trends_context:
+    if packed["trends"]:
         trends_section = f"""
         ### 当前行业流行趋势/热点 (Trends):
-        {trends_context[:3000]}
+        {packed["trends"]}
         
         请务必结合上述趋势，让标题蹭上热点流量。
         """
@@ -0,0 +1,107 @@
+"""
+Request Logging - Non-buffering access log middleware
+
+A pure ASGI middleware that records method, path, status and duration for
+each request without reading the body up front:
+- The receive channel is passed through untouched; at most a small prefix of
+  the body (REQUEST_LOG_BODY_BYTES, off by default) is copied as it streams
+  by. Auth routes are never captured, and values of secret-looking keys
+  (passwords, app passwords, API keys, tokens) are redacted
+- Successful requests are sampled (REQUEST_LOG_SAMPLE_RATE); errors and
+  slow requests are always logged
+- Every request gets a request id (X-Request-ID in/out) and, for project
+  routes, a project id; both are attached to all records logged while the
+  request runs (see api.logging_config)
+"""
+
+import random
+import re
+import time
+import uuid
+from typing import Optional
+
+from api.config import get_settings
+from api.logging_config import get_logger, log_context
+
+
+access_logger = get_logger("api.access")
+
+LOGGED_BODY_METHODS = {"POST", "PUT", "PATCH"}
+UNLOGGED_BODY_PREFIXES = ("/api/auth/",)
+
+# "key": "value" in JSON (the value may be cut off by the prefix limit) and
+# key=value in form bodies
+_SECRET_KEYS = r"(?:password|app_password|appPassword|api_key|apiKey|secret|token|access_token|refresh_token|authorization)"
+_SECRET_JSON_RE = re.compile(r'("' + _SECRET_KEYS + r'"\s*:\s*)"(?:[^"\\]|\\.)*(?:"|$)', re.I)
+_SECRET_FORM_RE = re.compile(r"(\b" + _SECRET_KEYS + r"=)[^&\s]*", re.I)
+
+_PROJECT_PATH_RE = re.compile(r"/(?:projects|export)/([0-9a-fA-F-]{36})(?:/|$)")
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def redact_secrets(body: str) -> str:
+    """Mask the values of secret-looking keys in a (possibly truncated) body"""
+    body = _SECRET_JSON_RE.sub(r'\1"***"', body)
+    return _SECRET_FORM_RE.sub(r"\1***", body)
+
+
+class RequestLoggingMiddleware:
+    """ASGI middleware logging method, path, status and duration"""
+
+    def __init__(self, app, sample_rate: Optional[float] = None, body_bytes: Optional[int] = None,
+                 slow_ms: Optional[float] = None):
+        settings = get_settings()
+        self.app = app
+        self.sample_rate = settings.request_log_sample_rate if sample_rate is None else sample_rate
+        self.body_bytes = settings.request_log_body_bytes if body_bytes is None else body_bytes
+        self.slow_ms = settings.request_log_slow_ms if slow_ms is None else slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        method = scope.get("method", "")
+        path = scope.get("path", "")
+        status = 500
+        body_prefix = bytearray()
+        capture = (self.body_bytes > 0 and method in LOGGED_BODY_METHODS
+                   and not path.startswith(UNLOGGED_BODY_PREFIXES))
+
+        request_id = self._request_id(scope)
+        project_match = _PROJECT_PATH_RE.search(path)
+
+        async def receive_wrapper():
+            message = await receive()
+            if capture and message["type"] == "http.request" and len(body_prefix) < self.body_bytes:
+                body_prefix.extend(message.get("body", b"")[:self.body_bytes - len(body_prefix)])
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        with log_context(request_id=request_id, project_id=project_match.group(1) if project_match else None):
+            try:
+                await self.app(scope, receive_wrapper if capture else receive, send_wrapper)
+            finally:
+                duration_ms = (time.perf_counter() - start) * 1000
+                if status >= 400 or duration_ms >= self.slow_ms or random.random() < self.sample_rate:
+                    fields = {"method": method, "path": path, "status": status, "duration_ms": round(duration_ms, 1)}
+                    if body_prefix:
+                        fields["body"] = redact_secrets(body_prefix.decode("utf-8", "replace"))
+                    access_logger.info(f"{method} {path} {status} {duration_ms:.1f}ms", extra=fields)
+
+    def _request_id(self, scope) -> str:
+        """Reuse a well-formed incoming X-Request-ID, otherwise mint one"""
+        for name, value in scope.get("headers") or []:
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_RE.match(candidate):
+                    return candidate
+        return uuid.uuid4().hex[:16]
@@ -7,6 +7,11 @@ from pydantic import BaseModel, HttpUrl
 from typing import Optional, List, Dict, Any
 from api.services.firecrawl_service import get_firecrawl_service
 from api.services.supabase_service import get_supabase_service
+from api.services.normalizer_service import get_normalizer_service
+from api.services.retrieval_service import get_retrieval_service
+from api.logging_config import get_logger, bind_project
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
@@ -44,6 +49,7 @@ async def scrape_url(request: ScrapeRequest):
     - Get content from a company's homepage
     - Extract specific page content for analysis
     """
+    bind_project(request.project_id)
     service = get_firecrawl_service()
     db = get_supabase_service()
 
@@ -60,7 +66,9 @@ async def scrape_url(request: ScrapeRequest):
             "content": data.get("markdown", "") if isinstance(data, dict) else getattr(data, 'markdown', ''),
             "metadata": data.get("metadata", {}) if isinstance(data, dict) else getattr(data, 'metadata', {})
         }
-        await db.save_crawl_result(request.project_id, page_data)
+        saved = await db.save_crawl_result(request.project_id, page_data)
+        if "error" not in saved:
+            await get_retrieval_service().index_page(request.project_id, saved)
         result["saved_to_kb"] = True
 
     return result
@@ -75,6 +83,7 @@ async def crawl_website(request: CrawlRequest):
     - Analyze a competitor's full site structure
     - Gather all content pages for gap analysis
     """
+    bind_project(request.project_id)
     service = get_firecrawl_service()
     db = get_supabase_service()
     
@@ -91,7 +100,7 @@ async def crawl_website(request: CrawlRequest):
     
     # 2. Save to Knowledge Base (DB) if requested
     if request.save_to_db and request.project_id:
-        print(f"saving crawl results for project {request.project_id}")
+        logger.info(f"saving crawl results for project {request.project_id}")
         data = result.get("data", {})
         # If firecrawl returns a list of pages in 'data'
         pages = []
@@ -100,15 +109,26 @@ async def crawl_website(request: CrawlRequest):
         elif isinstance(data, list):
              pages = data
         
-        saved_count = 0
-        for page in pages:
-            # Normalized page object
-            page_data = {
+        # Normalized page objects
+        page_items = [
+            {
                 "url": page.get("metadata", {}).get("sourceURL", request.url),
                 "content": page.get("markdown", "") or page.get("content", ""),
                 "metadata": page.get("metadata", {})
             }
-            await db.save_crawl_result(request.project_id, page_data)
+            for page in pages
+        ]
+        
+        # Strip site chrome detected across the whole crawl before saving
+        cleaned = get_normalizer_service().normalize_pages(page_items)
+        
+        retrieval = get_retrieval_service()
+        saved_count = 0
+        for page_data, content in zip(page_items, cleaned):
+            page_data["content"] = content
+            saved = await db.save_crawl_result(request.project_id, page_data)
+            if "error" not in saved:
+                await retrieval.index_page(request.project_id, saved)
             saved_count += 1
         
         result["saved_to_kb"] = True
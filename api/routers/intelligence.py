@@ -2,21 +2,29 @@
 Intelligence Router - API endpoints for AI-powered analysis
 """
 
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Literal, Optional, Tuple
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel
 from urllib.parse import urlparse
 
+from api.config import get_settings
 from api.services.firecrawl_service import get_firecrawl_service
 from api.services.gemini_service import get_gemini_service
 from api.services.search_service import get_search_service
 from api.services.analysis_service import get_analysis_service
 from api.services.perplexity_service import get_perplexity_service
 from api.services.seo_service import get_seo_service
-from api.services.supabase_service import get_supabase_service
+from api.services.write_behind_service import get_write_behind_service
+from api.logging_config import get_logger, bind_project
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
+# Characters of each competitor page echoed back by analyze-competitor
+COMPETITOR_PREVIEW_CHARS = 6000
+
 # Request Models
 class AnalyzeCompanyRequest(BaseModel):
     url: str
@@ -26,6 +34,7 @@ class AnalyzeCompetitorRequest(BaseModel):
     company_profile: Dict[str, Any]
     competitor_urls: List[str]
     project_id: Optional[str] = None  # Added for persistence
+    mode: Literal["single", "map_reduce"] = "single"  # one prompt, or full pages with concurrent extraction
 
 class GenerateProfileRequest(BaseModel):
     company_name: str
@@ -36,6 +45,7 @@ class GenerateProfileRequest(BaseModel):
 
 class DeepGapAnalysisRequest(BaseModel):
     project_id: str
+    mode: Literal["retrieval", "map_reduce"] = "retrieval"  # top-k chunks, or every page
 
 class DiscoverCompetitorsRequest(BaseModel):
     niche: str
@@ -66,6 +76,80 @@ class EnhancedKeywordsRequest(BaseModel):
     project_id: Optional[str] = None  # Added for persistence
 
 
+# ==================== Company sources ====================
+
+# _scrape_markdown's error when the scrape succeeded but yielded no markdown
+NO_CONTENT = "No content extracted"
+
+
+async def _scrape_markdown(firecrawl, url: str) -> Tuple[str, str]:
+    """(markdown, error) of a website scrape; markdown is "" when unusable"""
+    scrape_result = await firecrawl.scrape_url(url, ["markdown"])
+    content = ""
+    if scrape_result["success"]:
+        data = scrape_result.get("data", {})
+        if isinstance(data, dict):
+            content = data.get("markdown", "")
+        else:
+            content = getattr(data, 'markdown', '') if data else ""
+    return content or "", "" if content else scrape_result.get("error") or NO_CONTENT
+
+
+async def _race_company_sources(
+    firecrawl,
+    perplexity,
+    url: str,
+    company_name: Optional[str],
+    domain: str
+) -> Tuple[Optional[str], Any, Dict[str, str]]:
+    """
+    Website scrape with a hedged Perplexity lookup. The lookup starts when
+    the scrape fails, or when it is still running after ANALYZE_HEDGE_AFTER
+    seconds; the first usable result wins and the other call is cancelled.
+    Returns (data_source, markdown or Perplexity result, errors per source);
+    data_source is None when no source was usable.
+    """
+    hedge_after = get_settings().analyze_hedge_after
+    scrape = asyncio.create_task(_scrape_markdown(firecrawl, url))
+    research: Optional[asyncio.Task] = None
+    pending = {scrape}
+    errors: Dict[str, str] = {}
+
+    def start_research() -> None:
+        nonlocal research
+        if company_name and research is None:
+            research = asyncio.create_task(perplexity.search_brand_info(company_name, domain))
+            pending.add(research)
+
+    try:
+        if company_name and hedge_after > 0:
+            done, _ = await asyncio.wait(pending, timeout=hedge_after)
+            if not done:
+                logger.info(f"Scrape still running after {hedge_after}s, starting Perplexity lookup in parallel")
+                start_research()
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # When both finish together the website wins
+            if scrape in done:
+                content, error = scrape.result()
+                if content:
+                    return "website_scrape", content, errors
+                errors["scrape"] = error
+                logger.warning(f"Scrape failed or empty: {error}")
+                start_research()
+            if research is not None and research in done:
+                result = research.result()
+                if result.get("success") and result.get("content"):
+                    return "perplexity_search", result, errors
+                errors["perplexity"] = result.get("error", "No content")
+                logger.warning(f"Perplexity lookup failed: {errors['perplexity']}")
+        return None, None, errors
+    finally:
+        for task in pending:
+            task.cancel()
+
+
 # Endpoints
 @router.post("/analyze-company")
 async def analyze_company(request: AnalyzeCompanyRequest):
@@ -102,92 +186,82 @@ async def analyze_company(request: AnalyzeCompanyRequest):
                 "error": f"Invalid URL format: {cleaned_url}. Please enter a valid website URL (e.g., example.com)."
             }
 
-        print(f"Scraping Normalized URL: '{cleaned_url}'")
-        scrape_result = await firecrawl.scrape_url(cleaned_url, ["markdown"])
+        logger.info(f"Scraping Normalized URL: '{cleaned_url}'")
+        source, payload, source_errors = await _race_company_sources(
+            firecrawl, perplexity, cleaned_url, request.company_name, request.url
+        )
+        scrape_error = source_errors.get("scrape", "Scrape was slower than the Perplexity search")
         
-        # Extract content from scrape result
-        content = ""
-        if scrape_result["success"]:
-            data = scrape_result.get("data", {})
-            if isinstance(data, dict):
-                content = data.get("markdown", "")
+        if source == "perplexity_search":
+            perplexity_result = payload
+            # Use Perplexity search results as context for AI analysis
+            logger.info(f"Perplexity search successful, analyzing {len(perplexity_result['content'])} chars")
+            
+            # Wrap Perplexity content with source attribution
+            perplexity_content = (
+                f"以下是通过 Perplexity AI 搜索引擎获取的关于「{request.company_name}」的品牌信息：\n\n"
+                f"{perplexity_result['content']}"
+            )
+            
+            company_data = await gemini.analyze_company_content(
+                perplexity_content, 
+                request.company_name
+            )
+            
+            if "error" in company_data:
+                scrape_note = "Scrape failed" if "scrape" in source_errors else "Scrape was slower than Perplexity"
+                return {
+                    "success": False,
+                    "error": f"{scrape_note} and AI analysis of Perplexity data failed: {company_data['error']}"
+                }
+            
+            if "scrape" in source_errors:
+                note = f"网站爬取失败({scrape_error})，已通过 Perplexity 搜索获取品牌信息进行分析。"
             else:
-                content = getattr(data, 'markdown', '') if data else ""
+                note = "网站爬取响应较慢，已采用先返回的 Perplexity 搜索结果进行分析。"
+            return {
+                "success": True,
+                "url": request.url,
+                "company_profile": company_data,
+                "data_source": "perplexity_search",
+                "perplexity_citations": perplexity_result.get("citations", []),
+                "note": note
+            }
         
-        # If scrape failed or no content extracted, use Perplexity fallback
-        if not content:
-            scrape_error = scrape_result.get("error", "No content extracted")
-            print(f"Scrape failed or empty: {scrape_error}")
+        if source is None:
+            if not request.company_name:
+                return {
+                    "success": False,
+                    "error": f"Scrape failed: {scrape_error}"
+                }
             
-            if request.company_name:
-                # === Perplexity Fallback ===
-                print("Falling back to Perplexity search for brand info...")
-                perplexity_result = await perplexity.search_brand_info(
-                    request.company_name, 
-                    request.url
-                )
-                
-                if perplexity_result.get("success") and perplexity_result.get("content"):
-                    # Use Perplexity search results as context for AI analysis
-                    print(f"Perplexity search successful, analyzing {len(perplexity_result['content'])} chars")
-                    
-                    # Wrap Perplexity content with source attribution
-                    perplexity_content = (
-                        f"以下是通过 Perplexity AI 搜索引擎获取的关于「{request.company_name}」的品牌信息：\n\n"
-                        f"{perplexity_result['content']}"
-                    )
-                    
-                    company_data = await gemini.analyze_company_content(
-                        perplexity_content, 
-                        request.company_name
-                    )
-                    
-                    if "error" in company_data:
-                        return {
-                            "success": False,
-                            "error": f"Scrape failed and AI analysis of Perplexity data failed: {company_data['error']}"
-                        }
-                    
-                    return {
-                        "success": True,
-                        "url": request.url,
-                        "company_profile": company_data,
-                        "data_source": "perplexity_search",
-                        "perplexity_citations": perplexity_result.get("citations", []),
-                        "note": f"网站爬取失败({scrape_error})，已通过 Perplexity 搜索获取品牌信息进行分析。"
-                    }
-                else:
-                    # Perplexity also failed, fall back to AI generation from name only
-                    perplexity_error = perplexity_result.get("error", "Unknown")
-                    print(f"Perplexity fallback also failed: {perplexity_error}")
-                    print("Final fallback: AI generation from company name only")
-                    
-                    company_data = await gemini.generate_company_profile(
-                        request.company_name, 
-                        request.url
-                    )
-                    
-                    if "error" in company_data:
-                        return {
-                            "success": False,
-                            "error": f"All data sources failed - Scrape: {scrape_error}, Perplexity: {perplexity_error}, AI: {company_data['error']}"
-                        }
-                    
-                    return {
-                        "success": True,
-                        "url": request.url,
-                        "company_profile": company_data.get("profile_text", ""),
-                        "data_source": "ai_generated",
-                        "note": f"网站爬取和 Perplexity 搜索均失败，仅基于品牌名称生成（准确性较低）。"
-                    }
-            else:
+            # Scrape and Perplexity both failed, fall back to AI generation from name only
+            perplexity_error = source_errors.get("perplexity", "Unknown")
+            logger.info("Final fallback: AI generation from company name only")
+            
+            company_data = await gemini.generate_company_profile(
+                request.company_name, 
+                request.url
+            )
+            
+            if "error" in company_data:
                 return {
                     "success": False,
-                    "error": f"Scrape failed: {scrape_result.get('error')}"
+                    "error": f"All data sources failed - Scrape: {scrape_error}, Perplexity: {perplexity_error}, AI: {company_data['error']}"
                 }
+            
+            return {
+                "success": True,
+                "url": request.url,
+                "company_profile": company_data.get("profile_text", ""),
+                "data_source": "ai_generated",
+                "note": f"网站爬取和 Perplexity 搜索均失败，仅基于品牌名称生成（准确性较低）。"
+            }
+        
+        content = payload
         
         # Step 2: Use OpenAI to analyze the scraped content
-        print(f"Analyzing scraped content length: {len(content)}")
+        logger.info(f"Analyzing scraped content length: {len(content)}")
         company_data = await gemini.analyze_company_content(content, request.company_name)
         
         # 检查是否返回了错误
@@ -207,8 +281,7 @@ async def analyze_company(request: AnalyzeCompanyRequest):
         }
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Company profile extraction failed for {request.url}")
         return {
             "success": False,
             "error": f"Server Exception: {str(e)}"
@@ -226,9 +299,10 @@ async def analyze_competitor(request: AnalyzeCompetitorRequest):
     3. Generates side-by-side gap analysis with real content quotes
     4. Saves the result to database (if project_id provided)
     """
+    bind_project(request.project_id)
     firecrawl = get_firecrawl_service()
     gemini = get_gemini_service()
-    supabase = get_supabase_service()
+    persistence = get_write_behind_service()
     
     # Step 1: Scrape our own site for comparison material
     our_site_content = ""
@@ -238,40 +312,43 @@ async def analyze_competitor(request: AnalyzeCompetitorRequest):
     if our_domain:
         try:
             our_url = our_domain if our_domain.startswith('http') else f'https://{our_domain}'
-            print(f"[GapAnalysis] Scraping our site: {our_url}")
+            logger.info(f"[GapAnalysis] Scraping our site: {our_url}")
             our_scrape = await firecrawl.scrape_url(our_url, ["markdown"])
             if our_scrape.get("success"):
                 data = our_scrape.get("data", {})
                 our_site_content = data.get("markdown", "") if isinstance(data, dict) else getattr(data, 'markdown', '')
-                print(f"[GapAnalysis] Got {len(our_site_content)} chars from our site")
+                logger.info(f"[GapAnalysis] Got {len(our_site_content)} chars from our site")
         except Exception as e:
-            print(f"[GapAnalysis] Our site scrape failed: {e}")
+            logger.warning(f"[GapAnalysis] Our site scrape failed: {e}")
             
     # Fallback: If scrape failed or empty, use Perplexity to get "My Brand" info
     if not our_site_content and (request.company_profile.get("company_name") or our_domain):
         brand = request.company_profile.get("company_name", "My Brand")
-        print(f"[GapAnalysis] Scraping failed, falling back to Perplexity for {brand}")
+        logger.warning(f"[GapAnalysis] Scraping failed, falling back to Perplexity for {brand}")
         bp = await perplexity.search_brand_info(brand, our_domain)
         if bp.get("success"):
             our_site_content = f"Perplexity Brand Research for {brand}:\n{bp.get('content', '')}"
-            print(f"[GapAnalysis] Got {len(our_site_content)} chars from Perplexity fallback")
+            logger.info(f"[GapAnalysis] Got {len(our_site_content)} chars from Perplexity fallback")
     
     # Step 2: Scrape competitor websites
+    # Map-reduce reads every page in full, so it can take more competitors
+    map_reduce = request.mode == "map_reduce"
+    competitor_limit = 10 if map_reduce else 3
     competitor_data = []
     
-    for url in request.competitor_urls[:3]:  # Limit to 3 competitors
+    for url in request.competitor_urls[:competitor_limit]:
         try:
-            print(f"[GapAnalysis] Scraping competitor: {url}")
+            logger.info(f"[GapAnalysis] Scraping competitor: {url}")
             scrape_result = await firecrawl.scrape_url(url, ["markdown"])
             if scrape_result.get("success"):
                 data = scrape_result.get("data", {})
                 content = data.get("markdown", "") if isinstance(data, dict) else getattr(data, 'markdown', '')
                 competitor_data.append({
                     "url": url,
-                    "content": content[:6000],  # Increased for richer comparison
+                    "content": content,  # Prompt builders fit it to the token budget
                     "success": True
                 })
-                print(f"[GapAnalysis] Got {len(content)} chars from {url}")
+                logger.info(f"[GapAnalysis] Got {len(content)} chars from {url}")
             else:
                 competitor_data.append({
                     "url": url,
@@ -286,32 +363,44 @@ async def analyze_competitor(request: AnalyzeCompetitorRequest):
             })
     
     # Step 3: Generate gap analysis with real content from BOTH sides
-    gap_analysis = await gemini.generate_gap_analysis(
-        request.company_profile,
-        competitor_data,
-        our_site_content=our_site_content[:5000]
-    )
+    if map_reduce:
+        gap_analysis = await gemini.generate_gap_analysis_map_reduce(
+            request.company_profile,
+            competitor_data,
+            our_site_content=our_site_content
+        )
+    else:
+        gap_analysis = await gemini.generate_gap_analysis(
+            request.company_profile,
+            competitor_data,
+            our_site_content=our_site_content
+        )
 
     result = {
         "success": True,
+        "mode": request.mode,
         "competitors_analyzed": len([c for c in competitor_data if c["success"]]),
         "our_site_scraped": bool(our_site_content),
-        "competitor_data": competitor_data,
+        # Full pages are only needed by the prompts; the response carries a preview
+        "competitor_data": [
+            {**c, "content": c["content"][:COMPETITOR_PREVIEW_CHARS]} if "content" in c else c
+            for c in competitor_data
+        ],
         "gap_analysis": gap_analysis
     }
     
     # Step 4: Save to Database
     if request.project_id:
-        print(f"[GapAnalysis] Saving report to project {request.project_id}")
+        logger.info(f"[GapAnalysis] Saving report to project {request.project_id}")
         try:
-            await supabase.save_analysis_report(
+            await persistence.save_analysis_report(
                 project_id=request.project_id,
                 report_type="gap_analysis",
                 data=gap_analysis
             )
-            print("[GapAnalysis] Report saved successfully")
+            logger.info("[GapAnalysis] Report saved successfully")
         except Exception as e:
-            print(f"[GapAnalysis] Failed to save report: {e}")
+            logger.warning(f"[GapAnalysis] Failed to save report: {e}")
 
     return result
 
@@ -330,41 +419,54 @@ async def generate_profile(request: GenerateProfileRequest):
     perplexity = get_perplexity_service()
     firecrawl = get_firecrawl_service()
     
-    # Step 1: Get website content if not already provided
-    scraped_content = request.scraped_content
-    if not scraped_content and request.domain:
-        try:
-            domain = request.domain.strip()
-            url = domain if domain.startswith('http') else f'https://{domain}'
-            print(f"[Profile] Scraping website: {url}")
-            scrape_result = await firecrawl.scrape_url(url, ["markdown"])
-            if scrape_result.get("success"):
-                data = scrape_result.get("data", {})
-                content = data.get("markdown", "") if isinstance(data, dict) else getattr(data, 'markdown', '')
-                if content:
-                    scraped_content = {"markdown": content[:8000]}
-                    print(f"[Profile] Scraped {len(content)} chars from website")
-        except Exception as e:
-            print(f"[Profile] Website scrape failed (non-critical): {e}")
+    settings = get_settings()
+    
+    # Step 1 + 2: Website content (if not already provided) and latest brand
+    # news/strategy are independent, so both are fetched concurrently, each
+    # under its own deadline
+    async def fetch_website() -> Optional[Dict[str, Any]]:
+        domain = request.domain.strip()
+        url = domain if domain.startswith('http') else f'https://{domain}'
+        logger.info(f"[Profile] Scraping website: {url}")
+        content, error = await _scrape_markdown(firecrawl, url)
+        if error and error != NO_CONTENT:
+            # Reported as "failed" by _within_deadline, not as "empty"
+            raise RuntimeError(error)
+        if not content:
+            logger.warning("[Profile] Website scrape returned no content (non-critical)")
+            return None
+        logger.info(f"[Profile] Scraped {len(content)} chars from website")
+        return {"markdown": content}
     
-    # Step 2: Query Perplexity for latest brand news/strategy
-    latest_news = ""
-    try:
+    async def fetch_news() -> str:
         news_query = (
             f"请提供关于 {request.company_name} 的最新动态和市场策略分析。"
             f"包括：近期重大产品发布、合作伙伴关系、融资/收购、市场扩张、"
             f"最新的公司战略方向、行业趋势回应等。"
             f"请用中文回答，提供具体的时间点和事实。"
         )
-        print(f"[Profile] Querying Perplexity for latest news about {request.company_name}")
+        logger.info(f"[Profile] Querying Perplexity for latest news about {request.company_name}")
         news_result = await perplexity.test_citation(news_query)
-        if news_result.get("answer"):
-            latest_news = news_result["answer"]
-            print(f"[Profile] Got {len(latest_news)} chars from lastest news")
-    except Exception as e:
-        print(f"[Profile] Perplexity news query failed (non-critical): {e}")
+        latest_news = news_result.get("answer") or ""
+        if latest_news:
+            logger.info(f"[Profile] Got {len(latest_news)} chars from lastest news")
+        return latest_news
+    
+    if request.scraped_content:
+        website_fetch = _provided(request.scraped_content)
+    elif request.domain:
+        website_fetch = _within_deadline(fetch_website(), settings.profile_scrape_deadline, "website")
+    else:
+        website_fetch = _provided(None, "skipped")
+    
+    (website_data, website_status), (news_data, news_status) = await asyncio.gather(
+        website_fetch,
+        _within_deadline(fetch_news(), settings.profile_news_deadline, "latest news")
+    )
+    scraped_content = website_data
+    latest_news = news_data or ""
     
-    # Step 3: Generate enhanced profile
+    # Step 3: Generate enhanced profile from whatever arrived in time
     profile = await gemini.generate_company_profile(
         company_name=request.company_name,
         domain=request.domain,
@@ -372,17 +474,41 @@ async def generate_profile(request: GenerateProfileRequest):
         latest_news=latest_news
     )
     
+    sources = {"website": website_status, "latest_news": news_status}
     return {
         "success": True,
         "profile": profile,
         "enrichment": {
             "has_website_data": bool(scraped_content),
             "has_latest_news": bool(latest_news),
-            "news_length": len(latest_news)
+            "news_length": len(latest_news),
+            "sources": sources,
+            "sources_used": [name for name, status in sources.items() if status in ("used", "provided")]
         }
     }
 
 
+async def _provided(value: Any, status: str = "provided") -> Tuple[Any, str]:
+    """A profile source that needs no fetch"""
+    return value, status
+
+
+async def _within_deadline(coro, deadline: float, label: str) -> Tuple[Any, str]:
+    """
+    (result, status) of a best-effort profile source. status is "used",
+    "empty", "timeout" or "failed"; late or failing sources never raise.
+    """
+    try:
+        result = await asyncio.wait_for(coro, timeout=deadline if deadline > 0 else None)
+    except asyncio.TimeoutError:
+        logger.warning(f"[Profile] {label} missed its {deadline}s deadline; generating without it")
+        return None, "timeout"
+    except Exception as e:
+        logger.warning(f"[Profile] {label} failed (non-critical): {e}")
+        return None, "failed"
+    return result, "used" if result else "empty"
+
+
 @router.post("/discover-competitors")
 async def discover_competitors(request: DiscoverCompetitorsRequest):
     """
@@ -442,10 +568,11 @@ async def analyze_gap_deep(request: DeepGapAnalysisRequest):
     3. Returns actionable strategic advice
     4. Saves report to database
     """
+    bind_project(request.project_id)
     analysis_service = get_analysis_service()
-    supabase = get_supabase_service()
+    persistence = get_write_behind_service()
     
-    result = await analysis_service.perform_deep_gap_analysis(request.project_id)
+    result = await analysis_service.perform_deep_gap_analysis(request.project_id, mode=request.mode)
     
     if "error" in result:
         return {
@@ -454,7 +581,7 @@ async def analyze_gap_deep(request: DeepGapAnalysisRequest):
         }
     
     # Save report to Supabase
-    await supabase.save_analysis_report(
+    await persistence.save_analysis_report(
         project_id=request.project_id,
         report_type="deep_gap_analysis",
         data=result
@@ -471,14 +598,15 @@ async def generate_keywords(request: GenerateKeywordsRequest):
     """
     Generate GEO-optimized keywords from company profile (legacy)
     """
+    bind_project(request.project_id)
     gemini = get_gemini_service()
-    supabase = get_supabase_service()
+    persistence = get_write_behind_service()
     
     keywords = await gemini.generate_keywords(request.profile)
     
     # Save to DB if project_id is provided
     if request.project_id and keywords:
-        print(f"[Keywords] Saving {len(keywords)} legacy keywords to Supabase")
+        logger.info(f"[Keywords] Saving {len(keywords)} legacy keywords to Supabase")
         # Format for saving
         formatted_keywords = []
         for kw in keywords:
@@ -487,7 +615,7 @@ async def generate_keywords(request: GenerateKeywordsRequest):
                 "data": kw,
                 "source": "ai_generated_legacy"
             })
-        await supabase.save_keywords(request.project_id, formatted_keywords)
+        await persistence.save_keywords(request.project_id, formatted_keywords)
         
     return {
         "success": True,
@@ -523,9 +651,10 @@ async def generate_keywords_enhanced(request: EnhancedKeywordsRequest):
     
     Returns merged, deduplicated, and scored keyword list.
     """
+    bind_project(request.project_id)
     seo = get_seo_service()
     gemini = get_gemini_service()
-    supabase = get_supabase_service()
+    persistence = get_write_behind_service()
     
     all_keywords = []
     sources_status = {
@@ -539,9 +668,9 @@ async def generate_keywords_enhanced(request: EnhancedKeywordsRequest):
         # Strategy: User Search Simulation (AI-First)
         simulation_queries = []
         if request.profile:
-            print(f"[Keywords] Generating User Search Simulation queries...")
+            logger.info(f"[Keywords] Generating User Search Simulation queries...")
             simulation_queries = await gemini.generate_search_simulation(request.profile, n=5)
-            print(f"[Keywords] Simulated queries: {simulation_queries}")
+            logger.info(f"[Keywords] Simulated queries: {simulation_queries}")
         
         # Fallback if AI fails: use Product Name or Niche
         search_term = request.niche
@@ -557,7 +686,7 @@ async def generate_keywords_enhanced(request: EnhancedKeywordsRequest):
                     search_term = c
                     break
         
-        print(f"[Keywords] Discovering SERP keywords for: {search_term} (Custom Queries: {len(simulation_queries)})")
+        logger.info(f"[Keywords] Discovering SERP keywords for: {search_term} (Custom Queries: {len(simulation_queries)})")
         
         serp_keywords = await seo.discover_trending_keywords(
             niche=search_term,
@@ -577,9 +706,9 @@ async def generate_keywords_enhanced(request: EnhancedKeywordsRequest):
                 "intent": "Commercial" if kw.get("is_long_tail") else "Informational"
             })
         sources_status["google_serp"] = {"count": len(serp_keywords), "status": "ok"}
-        print(f"[Keywords] Got {len(serp_keywords)} SERP keywords")
+        logger.info(f"[Keywords] Got {len(serp_keywords)} SERP keywords")
     except Exception as e:
-        print(f"[Keywords] SERP keyword discovery failed: {e}")
+        logger.warning(f"[Keywords] SERP keyword discovery failed: {e}")
         sources_status["google_serp"]["status"] = f"error: {str(e)[:100]}"
     
     # ── Source 2: Competitor Gap Keywords ──
@@ -601,15 +730,15 @@ async def generate_keywords_enhanced(request: EnhancedKeywordsRequest):
         
         gap_count = sum(len(c.get("keywords", [])) for c in missing_kw_clusters)
         sources_status["competitor_gap"] = {"count": gap_count, "status": "ok"}
-        print(f"[Keywords] Extracted {gap_count} competitor gap keywords")
+        logger.info(f"[Keywords] Extracted {gap_count} competitor gap keywords")
     except Exception as e:
-        print(f"[Keywords] Competitor gap extraction failed: {e}")
+        logger.warning(f"[Keywords] Competitor gap extraction failed: {e}")
         sources_status["competitor_gap"]["status"] = f"error: {str(e)[:100]}"
     
     # ── Source 3: AI-Generated Brand Keywords ──
     try:
         if request.profile:
-            print(f"[Keywords] Generating AI brand keywords...")
+            logger.info(f"[Keywords] Generating AI brand keywords...")
             ai_keywords = await gemini.generate_keywords(request.profile)
             for kw in (ai_keywords if isinstance(ai_keywords, list) else []):
                 all_keywords.append({
@@ -621,9 +750,9 @@ async def generate_keywords_enhanced(request: EnhancedKeywordsRequest):
                     "estimatedWords": kw.get("estimatedWords", 1500)
                 })
             sources_status["ai_generated"] = {"count": len(ai_keywords) if isinstance(ai_keywords, list) else 0, "status": "ok"}
-            print(f"[Keywords] Generated {len(ai_keywords) if isinstance(ai_keywords, list) else 0} AI keywords")
+            logger.info(f"[Keywords] Generated {len(ai_keywords) if isinstance(ai_keywords, list) else 0} AI keywords")
     except Exception as e:
-        print(f"[Keywords] AI keyword generation failed: {e}")
+        logger.warning(f"[Keywords] AI keyword generation failed: {e}")
         sources_status["ai_generated"]["status"] = f"error: {str(e)[:100]}"
     
     # ── Deduplicate & Filter by Competitor Brand ──
@@ -657,7 +786,7 @@ async def generate_keywords_enhanced(request: EnhancedKeywordsRequest):
                         if brand and len(brand) > 2:
                             competitor_brands.add(brand)
 
-    print(f"[Keywords] Filtering out competitor brands: {competitor_brands}")
+    logger.info(f"[Keywords] Filtering out competitor brands: {competitor_brands}")
 
     seen = set()
     unique_keywords = []
@@ -683,12 +812,12 @@ async def generate_keywords_enhanced(request: EnhancedKeywordsRequest):
             seen.add(key)
             unique_keywords.append(kw)
     
-    print(f"[Keywords] Total: {len(all_keywords)} → Unique: {len(unique_keywords)}")
+    logger.info(f"[Keywords] Total: {len(all_keywords)} → Unique: {len(unique_keywords)}")
     
     # Save keywords if project_id is provided
     if request.project_id:
-        print(f"[Keywords] Saving {len(unique_keywords)} keywords to Supabase for project {request.project_id}")
-        await supabase.save_keywords(request.project_id, unique_keywords)
+        logger.info(f"[Keywords] Saving {len(unique_keywords)} keywords to Supabase for project {request.project_id}")
+        await persistence.save_keywords(request.project_id, unique_keywords)
 
     return {
         "success": True,
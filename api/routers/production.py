@@ -3,15 +3,23 @@ Production Router - API endpoints for content generation (Matrix)
 """
 
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from api.services.gemini_service import get_gemini_service
-from api.services.image_service import get_image_service
+from api.services.image_service import get_image_service, preferred_image_url
+from api.services.media_service import get_media_service, MEDIA_NAME_RE, media_content_type
 from api.services.supabase_service import get_supabase_service
+from api.services.write_behind_service import get_write_behind_service
 from api.services.perplexity_service import get_perplexity_service
 import asyncio
+import os
 
 from api.services.supabase_service import get_supabase_service
+from api.logging_config import get_logger, bind_project
+
+logger = get_logger(__name__)
+
 router = APIRouter()
 
 # Models
@@ -20,6 +28,7 @@ class ContentTask(BaseModel):
     content_type: str = "Article" # Article or Social
     keyword: str
     target_intent: str = "Informational"
+    long_form: bool = False  # Articles: outline + sections written in parallel
 
 class BatchGenerateRequest(BaseModel):
     project_id: str
@@ -37,10 +46,12 @@ async def generate_batch_content(request: BatchGenerateRequest):
     """
     Generate a batch of content (Text + Image) for the Matrix
     """
+    bind_project(request.project_id)
     gemini = get_gemini_service()
     image_service = get_image_service()
     perplexity = get_perplexity_service()
     supabase = get_supabase_service()
+    persistence = get_write_behind_service()
     
     # Get Project Profile (for context)
     project = await supabase.get_project(request.project_id)
@@ -55,85 +66,122 @@ async def generate_batch_content(request: BatchGenerateRequest):
     has_social_tasks = any(t.content_type == "Social" for t in request.tasks)
     
     if has_social_tasks:
-        print(f"[Production] Batch has social tasks, fetching trends for {niche}...")
+        logger.info(f"[Production] Batch has social tasks, fetching trends for {niche}...")
         try:
             trends_result = await perplexity.search_social_trends(niche)
             if trends_result.get("success"):
                 social_trends = trends_result
-                print("[Production] Social trends fetched successfully")
+                logger.info("[Production] Social trends fetched successfully")
         except Exception as e:
-            print(f"[Production] Failed to fetch social trends: {e}")
+            logger.warning(f"[Production] Failed to fetch social trends: {e}")
     
     results = []
     
-    # Process tasks concurrently? 
-    # For MVP, we'll do them sequentially or semi-parallel to avoid rate limits
-    # But let's try asyncio.gather for Text + Image per task
+    # Start every image up front: they run under the image service's own
+    # rate limit (and dedupe identical titles) while text is generated
+    # task by task below
+    image_styles = {"Article": "tech", "Social": "infographic"}
+    image_futures = [
+        asyncio.ensure_future(image_service.generate_image_variants(t.title, style=image_styles[t.content_type]))
+        if request.generate_images and t.content_type in image_styles else None
+        for t in request.tasks
+    ]
     
-    for task in request.tasks:
-        print(f"Processing task: {task.title}")
-        
-        # Prepare context data
-        context_data = None
-        if task.content_type == "Social":
-            context_data = social_trends
+    try:
+        for task, image_future in zip(request.tasks, image_futures):
+            results.append(await _produce_task(
+                request.project_id, task, image_future, company_profile, social_trends, gemini, persistence
+            ))
+    finally:
+        for future in image_futures:
+            if future is not None and not future.done():
+                future.cancel()
         
-        # 1. Generate Text (AI)
-        text_future = gemini.generate_content(
+    return {
+        "success": True,
+        "results": results
+    }
+
+
+async def _produce_task(project_id, task, image_future, company_profile, social_trends, gemini, persistence):
+    """Generate one task's text, pair it with its image and save the post"""
+    logger.info(f"Processing task: {task.title}")
+    
+    # Prepare context data
+    context_data = None
+    if task.content_type == "Social":
+        context_data = social_trends
+    
+    # 1. Generate Text (AI); the image (if any) is already under way
+    missing_sections = []
+    if task.long_form and task.content_type == "Article":
+        article = await gemini.generate_long_form_article(task.title, company_profile, context_data)
+        content_text = article["content"]
+        missing_sections = article["stats"]["missing"]
+    else:
+        content_text = await gemini.generate_content(
             task.title, 
             task.content_type, 
             company_profile,
             context_data=context_data
         )
-        
-        # 2. Generate Image (DALL-E) - Optional
-        image_future = None
-        if request.generate_images and task.content_type == "Article":
-            image_future = image_service.generate_image(task.title, style="tech")
-        elif request.generate_images and task.content_type == "Social":
-            image_future = image_service.generate_image(task.title, style="infographic")
-            
-        # Await both
-        if image_future:
-             content_text, image_url = await asyncio.gather(text_future, image_future)
-        else:
-             content_text = await text_future
-             image_url = None
-             
-        # 3. Save to DB (as Content Post)
-        post_data = {
-            "title": task.title,
-            "type": task.content_type,
-            "status": "DRAFT",
-            "full_content": content_text,
-            "image_url": image_url,
-            "meta_data": {
-                "keyword": task.keyword,
-                "target_intent": task.target_intent,
-                "used_trends": bool(context_data)
-            }
+    image_variants = await image_future if image_future is not None else None
+    image_url = preferred_image_url(image_variants)
+         
+    # 2. Save to DB (as Content Post)
+    post_data = {
+        "title": task.title,
+        "type": task.content_type,
+        "status": "DRAFT",
+        "full_content": content_text,
+        "image_url": image_url,
+        "meta_data": {
+            "keyword": task.keyword,
+            "target_intent": task.target_intent,
+            "used_trends": bool(context_data),
+            "image_variants": image_variants,
+            "missing_sections": missing_sections
         }
-        
-        saved_post = await supabase.save_content_post(request.project_id, post_data)
-        
-        results.append({
-            "task_id": saved_post.get("id"),
-            "title": task.title,
-            "status": "SUCCESS",
-            "image_url": image_url
-        })
-        
+    }
+    
+    saved_post = await persistence.save_content_post(project_id, post_data)
+    
     return {
-        "success": True,
-        "results": results
+        "task_id": saved_post.get("id"),
+        "title": task.title,
+        "status": "INCOMPLETE" if missing_sections else "SUCCESS",
+        "missing_sections": missing_sections,
+        "image_url": image_url,
+        "thumbnail_url": (image_variants or {}).get("thumbnail")
     }
 
 
+@router.get("/images/{name}")
+async def get_generated_image(name: str):
+    """
+    Serve a generated image or one of its variants from local media storage.
+    Names are content hashes, so responses can be cached indefinitely.
+    """
+    if not MEDIA_NAME_RE.match(name):
+        raise HTTPException(status_code=404, detail="Image not found")
+    path = get_media_service().local_path(name)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(
+        path,
+        media_type=media_content_type(name),
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+
 class SingleContentRequest(BaseModel):
     title: str
     content_type: str = "Article"
     keyword: str
     profile: Optional[Dict[str, Any]] = None
+    long_form: bool = False  # Articles: outline + sections written in parallel
+    # Long-form length (default ARTICLE_LONG_FORM_WORDS)
+    target_words: Optional[int] = Field(None, ge=500, le=10000)
 
 
     keyword: str
@@ -156,7 +204,7 @@ async def generate_titles(request: TitleGenerationRequest):
     
     trends_context = ""
     if request.use_trends:
-        print(f"[Production] Fetching trends for title generation: {request.niche}")
+        logger.info(f"[Production] Fetching trends for title generation: {request.niche}")
         try:
             # Use niche + topic for better trend relevance
             query = f"{request.niche} {request.topic} trends"
@@ -164,7 +212,7 @@ async def generate_titles(request: TitleGenerationRequest):
             if trends.get("success"):
                 trends_context = trends.get("content", "")
         except Exception as e:
-            print(f"Error fetching trends: {e}")
+            logger.error(f"Error fetching trends: {e}")
             
     titles = await gemini.generate_titles(
         request.topic,
@@ -194,24 +242,37 @@ async def generate_single_content(request: SingleContentRequest):
     try:
         # 1. Conduct Research based on content type
         if request.content_type == "Article":
-            print(f"[Production] Conducting deep research for: {request.keyword}")
+            logger.info(f"[Production] Conducting deep research for: {request.keyword}")
             research = await perplexity.deep_research(request.keyword)
             if research.get("success"):
                 context_data = research
         else: # Social
             niche = profile.get("industry", "Technology")
-            print(f"[Production] Searching social trends for: {niche}")
+            logger.info(f"[Production] Searching social trends for: {niche}")
             trends = await perplexity.search_social_trends(niche)
             if trends.get("success"):
                 context_data = trends
         
         # 2. Generate Content with Context
-        content_text = await gemini.generate_content(
-            request.title, 
-            request.content_type, 
-            profile,
-            context_data
-        )
+        outline = None
+        missing_sections = []
+        if request.long_form and request.content_type == "Article":
+            article = await gemini.generate_long_form_article(
+                request.title,
+                profile,
+                context_data,
+                target_words=request.target_words
+            )
+            content_text = article["content"]
+            outline = article["outline"]
+            missing_sections = article["stats"]["missing"]
+        else:
+            content_text = await gemini.generate_content(
+                request.title, 
+                request.content_type, 
+                profile,
+                context_data
+            )
         
         return {
             "success": True,
@@ -219,7 +280,10 @@ async def generate_single_content(request: SingleContentRequest):
             "title": request.title,
             "content_type": request.content_type,
             "research_used": bool(context_data),
-            "citations": context_data.get("citations", []) if context_data else []
+            "citations": context_data.get("citations", []) if context_data else [],
+            "outline": outline,
+            "incomplete": bool(missing_sections),
+            "missing_sections": missing_sections
         }
     except Exception as e:
         return {
@@ -231,6 +295,7 @@ class RegenerateRequest(BaseModel):
     original_content: str
     feedback: str
     content_type: str = "Article"
+    targeted: bool = False  # Articles: rewrite only the sections the feedback applies to
 
 @router.post("/regenerate")
 async def regenerate_content(request: RegenerateRequest):
@@ -240,7 +305,17 @@ async def regenerate_content(request: RegenerateRequest):
     gemini = get_gemini_service()
     
     try:
-        print(f"[Production] Regenerating content with feedback: {request.feedback[:50]}...")
+        logger.info(f"[Production] Regenerating content with feedback: {request.feedback[:50]}...")
+        if request.targeted and request.content_type == "Article":
+            result = await gemini.regenerate_sections(request.original_content, request.feedback)
+            return {
+                "success": True,
+                "content": result["content"],
+                "mode": result["mode"],
+                "regenerated_sections": result["regenerated"],
+                "skipped_sections": result["skipped"]
+            }
+        
         new_content = await gemini.regenerate_content(
             request.original_content,
             request.feedback,
@@ -2,11 +2,16 @@
 Projects Router - API endpoints for project management
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Depends
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
-from datetime import datetime
-from api.services.supabase_service import get_supabase_service
+from api.services.supabase_service import (
+    get_supabase_service, parse_fields, next_cursor, decode_cursor, InvalidCursor
+)
+from api.services.retrieval_service import get_retrieval_service
+from api.logging_config import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
@@ -31,7 +36,7 @@ async def list_projects(user_id: Optional[str] = None):
     """List all projects, optionally filtered by user"""
     supabase = get_supabase_service()
     projects = await supabase.get_projects(user_id=user_id)
-    print(f"DEBUG: list_projects fetched {len(projects)} projects for user {user_id}")
+    logger.debug(f"DEBUG: list_projects fetched {len(projects)} projects for user {user_id}")
     return {"success": True, "data": projects}
 
 
@@ -90,13 +95,49 @@ async def delete_project(project_id: str):
     return {"success": True, "message": "Project deleted"}
 
 
+def _ensure_in_project(row: Optional[Dict[str, Any]], project_id: str, label: str) -> Dict[str, Any]:
+    """404 unless the row exists and belongs to the project"""
+    if not row or (row.get("project_id") and row.get("project_id") != project_id):
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    return row
+
+
+def valid_cursor(cursor: Optional[str] = None) -> Optional[str]:
+    """Query dependency: 400 for a cursor that next_cursor did not produce"""
+    try:
+        decode_cursor(cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return cursor
+
+
 # Crawl Results (cached crawl data for a project)
 @router.get("/{project_id}/crawl-results")
-async def get_crawl_results(project_id: str):
-    """Get cached crawl results for a project"""
+async def get_crawl_results(
+    project_id: str,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = Depends(valid_cursor),
+    limit: Optional[int] = Query(None, ge=1, le=1000)
+):
+    """
+    Get cached crawl results for a project (newest first, keyset-paginated).
+    Use fields=summary (or a column list) to skip page bodies, and pass
+    next_cursor back as cursor for the following page. Without limit every
+    row is returned (as for all list routes here).
+    """
+    supabase = get_supabase_service()
+    results = await supabase.get_crawl_results(
+        project_id, fields=parse_fields("crawl_results", fields), cursor=cursor, limit=limit
+    )
+    return {"success": True, "data": results, "next_cursor": next_cursor(results, limit)}
+
+
+@router.get("/{project_id}/crawl-results/{result_id}")
+async def get_crawl_result(project_id: str, result_id: str):
+    """Get a single crawl result with its full content"""
     supabase = get_supabase_service()
-    results = await supabase.get_crawl_results(project_id)
-    return {"success": True, "data": results}
+    result = await supabase.get_crawl_result(result_id)
+    return {"success": True, "data": _ensure_in_project(result, project_id, "Crawl result")}
 
 
 @router.post("/{project_id}/crawl-results")
@@ -104,74 +145,120 @@ async def save_crawl_result(project_id: str, data: Dict[str, Any]):
     """Save a crawl result to the project"""
     supabase = get_supabase_service()
     result = await supabase.save_crawl_result(project_id, data)
+    if "error" not in result:
+        await get_retrieval_service().index_page(project_id, result)
     return {"success": True, "data": result}
 
 
 # ==================== History / Persistence Endpoints ====================
 
 @router.get("/{project_id}/reports")
-async def get_project_reports(project_id: str):
-    """Get saved analysis reports"""
+async def get_project_reports(
+    project_id: str,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = Depends(valid_cursor),
+    limit: Optional[int] = Query(None, ge=1, le=1000)
+):
+    """Get saved analysis reports (keyset-paginated, optional field projection)"""
     supabase = get_supabase_service()
-    reports = await supabase.get_analysis_reports(project_id)
-    return {"success": True, "data": reports}
+    reports = await supabase.get_analysis_reports(
+        project_id, limit=limit, fields=parse_fields("analysis_reports", fields), cursor=cursor
+    )
+    return {"success": True, "data": reports, "next_cursor": next_cursor(reports, limit)}
+
+@router.get("/{project_id}/reports/{report_id}")
+async def get_project_report(project_id: str, report_id: str):
+    """Get a single analysis report with its full data"""
+    supabase = get_supabase_service()
+    report = await supabase.get_analysis_report(report_id)
+    return {"success": True, "data": _ensure_in_project(report, project_id, "Report")}
 
 @router.get("/{project_id}/keywords")
-async def get_project_keywords(project_id: str):
-    """Get saved keywords"""
+async def get_project_keywords(
+    project_id: str,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = Depends(valid_cursor),
+    limit: Optional[int] = Query(None, ge=1, le=1000)
+):
+    """Get saved keywords (keyset-paginated, optional field projection)"""
     supabase = get_supabase_service()
-    keywords = await supabase.get_keywords(project_id)
-    return {"success": True, "data": keywords}
+    keywords = await supabase.get_keywords(
+        project_id, limit=limit, fields=parse_fields("generated_keywords", fields), cursor=cursor
+    )
+    return {"success": True, "data": keywords, "next_cursor": next_cursor(keywords, limit)}
 
 @router.get("/{project_id}/posts")
-async def get_project_posts(project_id: str):
-    """Get generated content posts"""
+async def get_project_posts(
+    project_id: str,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = Depends(valid_cursor),
+    limit: Optional[int] = Query(None, ge=1, le=1000)
+):
+    """Get generated content posts (keyset-paginated, optional field projection)"""
     supabase = get_supabase_service()
-    posts = await supabase.get_content_posts(project_id)
-    return {"success": True, "data": posts}
+    posts = await supabase.get_content_posts(
+        project_id, limit=limit, fields=parse_fields("content_posts", fields), cursor=cursor
+    )
+    return {"success": True, "data": posts, "next_cursor": next_cursor(posts, limit)}
+
+@router.get("/{project_id}/posts/{post_id}")
+async def get_project_post(project_id: str, post_id: str):
+    """Get a single content post with its full content"""
+    supabase = get_supabase_service()
+    post = await supabase.get_content_post(post_id)
+    return {"success": True, "data": _ensure_in_project(post, project_id, "Post")}
 
 
 # ==================== Task Management ====================
 
 @router.get("/{project_id}/tasks")
-async def get_project_tasks(project_id: str):
-    """Get all tasks for a project"""
+async def get_project_tasks(
+    project_id: str,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = Depends(valid_cursor),
+    limit: Optional[int] = Query(None, ge=1, le=1000)
+):
+    """Get tasks for a project (keyset-paginated, optional field projection)"""
     supabase = get_supabase_service()
-    tasks = await supabase.get_tasks(project_id)
-    return {"success": True, "data": tasks}
+    tasks = await supabase.get_tasks(
+        project_id, fields=parse_fields("tasks", fields), cursor=cursor, limit=limit
+    )
+    return {"success": True, "data": tasks, "next_cursor": next_cursor(tasks, limit)}
+
+@router.get("/{project_id}/tasks/{task_id}")
+async def get_project_task(project_id: str, task_id: str):
+    """Get a single task with its full content"""
+    supabase = get_supabase_service()
+    task = await supabase.get_task(task_id)
+    return {"success": True, "data": _ensure_in_project(task, project_id, "Task")}
 
 @router.post("/{project_id}/tasks/batch")
 async def create_task_batch(project_id: str, tasks: List[Dict[str, Any]]):
-    """Create a batch of tasks"""
+    """
+    Create a batch of tasks in bulk.
+    `ids` lists the stored task id for each input row (None if it failed),
+    so clients can map their local ids; `errors` holds per-row failures.
+    """
     supabase = get_supabase_service()
-    created_tasks = []
-    
-    for task in tasks:
-        # Ensure task has necessary fields
-        task_data = {
+    task_rows = [
+        {
             "id": task.get("id"),
             "batch_id": task.get("batchId"),
             "title": task.get("title"),
             "branch": task.get("branch"), # Article/Social
             "status": "Pending", # Initial status
-            "created_at": datetime.utcnow().isoformat(),
             "meta_data": {
                 "type": task.get("type"),
                 "profile": task.get("profile")
             }
         }
-        res = await supabase.create_task(project_id, task_data)
-        if "error" not in res:
-            created_tasks.append(res)
-            
-    return {"success": True, "data": created_tasks}
+        for task in tasks
+    ]
+    result = await supabase.create_tasks(project_id, task_rows)
+    return {"success": True, **result}
 
-@router.patch("/tasks/{task_id}")
-async def update_task_status(task_id: str, update_data: Dict[str, Any]):
-    """Update a task's status and content"""
-    supabase = get_supabase_service()
-    
-    # field mapping: frontend -> db
+def _task_update_fields(update_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map frontend task fields to db columns"""
     db_update = {}
     if "genStatus" in update_data:
         db_update["status"] = update_data["genStatus"]
@@ -179,8 +266,22 @@ async def update_task_status(task_id: str, update_data: Dict[str, Any]):
         db_update["publish_status"] = update_data["pubStatus"]
     if "content" in update_data:
         db_update["content"] = update_data["content"]
-        
-    result = await supabase.update_task(task_id, db_update)
+    return db_update
+
+@router.patch("/tasks/batch")
+async def update_task_batch(updates: List[Dict[str, Any]]):
+    """Update many tasks at once; each item is {"id", "genStatus"?, "pubStatus"?, "content"?}"""
+    supabase = get_supabase_service()
+    result = await supabase.update_tasks([
+        {"id": u.get("id"), **_task_update_fields(u)} for u in updates
+    ])
+    return {"success": True, **result}
+
+@router.patch("/tasks/{task_id}")
+async def update_task_status(task_id: str, update_data: Dict[str, Any]):
+    """Update a task's status and content"""
+    supabase = get_supabase_service()
+    result = await supabase.update_task(task_id, _task_update_fields(update_data))
     
     if not result:
         raise HTTPException(status_code=404, detail="Task not found")
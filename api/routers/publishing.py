@@ -3,13 +3,20 @@ Publishing Router - API endpoints for publishing content
 """
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
-from api.services.publishing_service import get_publishing_service
-from api.services.supabase_service import get_supabase_service
+from datetime import datetime
+from api.services.publishing_service import get_publishing_service, site_key
+from api.services.scheduler_service import get_scheduler_service, PLATFORMS
+from api.services.supabase_service import get_supabase_service, next_cursor, decode_cursor, InvalidCursor
+from api.services.export_service import get_export_service, parse_include, EXPORT_FORMATS, MEDIA_TYPES
 
 router = APIRouter()
 
+MAX_BULK_POSTS = 200
+MAX_SCHEDULE_ITEMS = 1000
+
 # Models
 class WordPressConfig(BaseModel):
     url: str
@@ -22,6 +29,23 @@ class PublishRequest(BaseModel):
     content_data: Dict[str, Any] # { title, content, image_url }
     config: Optional[WordPressConfig] = None # For WordPress
 
+class BulkPublishRequest(BaseModel):
+    post_ids: List[str]  # content_posts ids
+    config: WordPressConfig
+    status: str = "draft"
+    upload_images: bool = True
+
+class ScheduleItem(BaseModel):
+    post_id: str  # content_posts id
+    publish_at: datetime  # ISO 8601; without an offset it is taken as UTC
+    platform: str = "wordpress"
+
+class ScheduleRequest(BaseModel):
+    project_id: str
+    items: List[ScheduleItem]
+    config: Optional[WordPressConfig] = None  # Saved as the project's WordPress connection
+    status: str = "publish"  # WordPress post status
+
 class PublishResponse(BaseModel):
     success: bool
     data: Optional[Dict[str, Any]] = None
@@ -61,16 +85,106 @@ async def publish_content(request: PublishRequest):
     else:
         raise HTTPException(status_code=400, detail=f"Platform {request.platform} not supported")
 
+@router.post("/wordpress/bulk")
+async def bulk_publish_wordpress(request: BulkPublishRequest):
+    """
+    Publish many content posts to one WordPress site. Safe to retry:
+    posts already published to the site are skipped.
+    """
+    if not request.post_ids:
+        raise HTTPException(status_code=400, detail="post_ids must not be empty")
+    if len(request.post_ids) > MAX_BULK_POSTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_POSTS} posts per request")
+
+    return await get_publishing_service().bulk_publish_to_wordpress(
+        request.post_ids,
+        wp_url=request.config.url,
+        username=request.config.username,
+        app_password=request.config.app_password,
+        status=request.status,
+        upload_images=request.upload_images
+    )
+
+@router.post("/schedule")
+async def schedule_posts(request: ScheduleRequest):
+    """
+    Schedule content posts for publishing at their publish_at time.
+    Times in the past are published as soon as possible. Entries publish
+    with the project's WordPress connection; a config given here replaces it.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="items must not be empty")
+    if len(request.items) > MAX_SCHEDULE_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SCHEDULE_ITEMS} items per request")
+    unsupported = sorted({item.platform for item in request.items} - PLATFORMS)
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Platform {', '.join(unsupported)} not supported")
+
+    target: Dict[str, Any] = {"status": request.status}
+    if request.config:
+        # Credentials are kept once, on the project; entries only name the site
+        db = get_supabase_service()
+        project = await db.get_project(request.project_id)
+        if project is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        connection = {**(project.get("wp_connection") or {}), **request.config.model_dump()}
+        if not await db.update_project(request.project_id, {"wp_connection": connection}):
+            raise HTTPException(status_code=500, detail="Failed to save WordPress connection")
+        target["site"] = site_key(request.config.url)
+    scheduled = await get_scheduler_service().schedule(
+        request.project_id, [item.model_dump() for item in request.items], target
+    )
+    if not scheduled:
+        raise HTTPException(status_code=500, detail="Failed to save schedule")
+    return {"success": True, "scheduled": [_public_entry(row) for row in scheduled]}
+
+@router.get("/schedule/{project_id}")
+async def list_scheduled_posts(project_id: str, limit: int = 100, cursor: Optional[str] = None):
+    """Schedule entries of a project, newest first (keyset paginated)"""
+    limit = max(1, min(limit, 500))
+    try:
+        decode_cursor(cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows = await get_scheduler_service().list_scheduled(project_id, limit=limit, cursor=cursor)
+    return {"items": [_public_entry(row) for row in rows], "next_cursor": next_cursor(rows, limit)}
+
+@router.delete("/schedule/{schedule_id}")
+async def cancel_scheduled_post(schedule_id: str):
+    """Cancel a pending schedule entry"""
+    if not await get_scheduler_service().cancel(schedule_id):
+        raise HTTPException(status_code=409, detail="Entry is not pending (already dispatched or cancelled)")
+    return {"success": True}
+
+def _public_entry(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Schedule entry without stored credentials"""
+    target = dict(row.get("target") or {})
+    if "config" in target:
+        target["config"] = {"url": (target["config"] or {}).get("url")}
+    return {**row, "target": target}
+
 @router.get("/export/{project_id}")
-async def export_project_data(project_id: str, format: str = "json"):
+async def export_project_data(
+    project_id: str,
+    format: str = "json",
+    include: Optional[str] = None,
+    gzip: bool = False
+):
     """
-    Export all generated content for a project
+    Export a project's content as a streamed download.
+    format: json | ndjson | csv; include: comma-separated subset of
+    tasks, posts, keywords, crawl_results (default all); gzip: compress output.
     """
-    db = get_supabase_service()
-    tasks = await db.get_tasks(project_id)
-    
-    if format == "json":
-        return {"project_id": project_id, "tasks": tasks}
-    
-    # CSV implementation omitted for brevity in MVP
-    return {"project_id": project_id, "tasks": tasks}
+    try:
+        entities = parse_include(include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format {format} not supported")
+
+    filename = f"export-{project_id}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        get_export_service().stream(project_id, format, entities, compress=gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
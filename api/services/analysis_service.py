@@ -6,16 +6,28 @@ from typing import Dict, Any, List, Optional
 import json
 from api.services.supabase_service import get_supabase_service
 from api.services.gemini_service import get_gemini_service
-from api.prompts import get_deep_gap_analysis_prompt, SYSTEM_DEEP_ANALYSIS
+from api.services.retrieval_service import get_retrieval_service
+from api.prompts import get_deep_gap_analysis_prompt, format_gap_findings, gap_findings_budget, SYSTEM_DEEP_ANALYSIS
+from api.logging_config import get_logger
+from api.tracing import trace_service
 
+logger = get_logger(__name__)
+
+@trace_service
 class AnalysisService:
     def __init__(self):
         self.db = get_supabase_service()
         self.ai = get_gemini_service()
+        self.retrieval = get_retrieval_service()
 
-    async def perform_deep_gap_analysis(self, project_id: str) -> Dict[str, Any]:
+    async def perform_deep_gap_analysis(self, project_id: str, mode: str = "retrieval") -> Dict[str, Any]:
         """
         Perform deep gap analysis using the Knowledge Base (DB)
+        
+        Modes:
+        - retrieval: top-k chunks relevant to the profile fill a single prompt
+        - map_reduce: every crawled page is mapped to findings concurrently,
+          then one reduce call produces the report
         """
         # 1. Fetch Project & Crawl Results from DB
         # Note: In a real implementation, we would fetch the project profile too.
@@ -36,29 +48,40 @@ class AnalysisService:
                 "status": "no_data"
             }
 
-        # 3. Aggregate Content (Simple strategy: Concat summaries or first N chars)
-        # In a production system, we would use RAG or vector search here.
-        # For this MVP, we'll take snippets from top pages.
-        aggregated_content = ""
         page_count = len(crawl_results)
-        total_chars = 0
-        
-        for item in crawl_results[:20]: # Limit to top 20 pages
-            content_snippet = item.get("content", "")[:1000] # Take first 1000 chars
-            url = item.get("url", "Unknown URL")
-            aggregated_content += f"Source: {url}\nContent: {content_snippet}\n---\n"
-            total_chars += len(item.get("content", ""))
-
+        total_chars = sum(len(item.get("content") or "") for item in crawl_results)
         kb_stats = {
             "page_count": page_count,
             "total_size_mb": round(total_chars / 1024 / 1024, 2)
         }
+
+        # 3. Build the knowledge base context
+        if mode == "map_reduce":
+            # Read every page: concurrent per-page extraction on the fast model
+            documents = [
+                {"source": item.get("url", "Unknown URL"), "content": item.get("content") or ""}
+                for item in crawl_results
+            ]
+            mapped = await self.ai.map_gap_findings(company_profile, documents)
+            reduced = await self.ai.reduce_gap_findings(
+                mapped["findings"], gap_findings_budget(self.ai.model, with_our_content=False)
+            )
+            aggregated_content = format_gap_findings(reduced["findings"])
+            kb_stats["map_reduce"] = {**mapped["stats"], **reduced["stats"]}
+        else:
+            # Retrieve the chunks most relevant to our profile and each gap dimension
+            chunks = await self.retrieval.retrieve_for_gap_analysis(project_id, company_profile)
+            aggregated_content = "".join(
+                f"Source: {c.get('url', 'Unknown URL')}\nContent: {c['content']}\n---\n"
+                for c in chunks
+            )
+            kb_stats["retrieved_chunks"] = len(chunks)
         
         # 4. Call AI for Deep Analysis
-        prompt = get_deep_gap_analysis_prompt(company_profile, aggregated_content, kb_stats)
+        prompt = get_deep_gap_analysis_prompt(company_profile, aggregated_content, kb_stats, model=self.ai.model)
         
         try:
-            response = await self.ai.client.chat.completions.create(
+            response = await self.ai.chat_completion(
                 model=self.ai.model,
                 messages=[
                     {"role": "system", "content": SYSTEM_DEEP_ANALYSIS},
@@ -72,6 +95,7 @@ class AnalysisService:
             # Add metadata
             analysis_result["meta"] = {
                 "kb_stats": kb_stats,
+                "mode": mode,
                 "analyzed_at": str(__import__('datetime').datetime.now())
             }
             
@@ -81,7 +105,7 @@ class AnalysisService:
             return analysis_result
             
         except Exception as e:
-            print(f"Deep Analysis Failed: {e}")
+            logger.error(f"Deep Analysis Failed: {e}")
             return {"error": str(e)}
 
 # Singleton
@@ -0,0 +1,235 @@
+"""
+Cache Service - In-process TTL caches with cross-worker invalidation
+
+Each worker keeps its own LRU/TTL cache. Invalidations are published to a
+small append-only file (the "bus"); every cache checks the file on read and
+drops the keys other workers appended since its last check. The TTL is
+a safety net for writes made outside this API (e.g. directly in Supabase).
+"""
+
+import copy
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Hashable, Tuple
+
+from api.config import get_settings
+from api.logging_config import get_logger
+from api.metrics import CACHE_LOOKUPS
+
+logger = get_logger(__name__)
+
+
+# Replace the bus with an empty file once it grows past this size; readers
+# that see a new file clear their whole cache, which is always safe
+BUS_MAX_BYTES = 1024 * 1024
+
+
+class InvalidationBus:
+    """Append-only file shared by the workers on one host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._inode, self._offset = self._stat()
+
+    def publish(self, namespace: str, key: Hashable) -> None:
+        line = f"{namespace}\t{key}\n".encode("utf-8")
+        try:
+            if self._stat()[1] > BUS_MAX_BYTES:
+                self._rotate()
+            for _ in range(3):
+                # O_APPEND writes of one short line are atomic across processes
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                    written_to = os.fstat(fd).st_ino
+                finally:
+                    os.close(fd)
+                # Written to a file rotated away meanwhile: readers may have moved on
+                if written_to == self._stat()[0]:
+                    break
+        except OSError as e:
+            logger.warning(f"[Cache] Could not publish invalidation: {e}")
+
+    def poll(self) -> Optional[list]:
+        """
+        Return [(namespace, key)] appended since the last poll, or None if the
+        bus was rotated (the caller should then clear everything).
+        """
+        inode, size = self._stat()
+        if inode != self._inode:
+            first = self._inode is None
+            self._inode, self._offset = inode, 0
+            if not first:
+                return None
+        if size == self._offset:
+            return []
+        if size < self._offset:
+            # Truncated in place
+            self._offset = size
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read(size - self._offset)
+        except OSError:
+            return []
+        # Only consume complete lines; a partial write is picked up next time
+        consumed = data.rfind(b"\n") + 1
+        self._offset += consumed
+        events = []
+        for line in data[:consumed].decode("utf-8", "replace").splitlines():
+            namespace, _, key = line.partition("\t")
+            events.append((namespace, key))
+        return events
+
+    def _rotate(self) -> None:
+        """Swap in an empty bus; the rename is atomic, so no reader sees a partial file"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".bus-")
+        os.close(fd)
+        os.chmod(tmp_path, 0o644)
+        try:
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+
+    def _stat(self) -> Tuple[Optional[int], int]:
+        """(inode, size) of the bus, or (None, 0) before it exists"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None, 0
+        return st.st_ino, st.st_size
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and hit/miss counters"""
+
+    def __init__(self, namespace: str, ttl: float, max_size: int = 1024, bus: Optional[InvalidationBus] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_size = max_size
+        self.bus = bus
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        # Bumped on every invalidation so a fetch that raced one is not cached
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a copy of the cached value, or None on miss/expiry"""
+        if not self.enabled:
+            return None
+        self._sync()
+        key = str(key)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                CACHE_LOOKUPS.labels(self.namespace, "miss").inc()
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        CACHE_LOOKUPS.labels(self.namespace, "hit").inc()
+        # Callers may mutate what they get back
+        return copy.deepcopy(value)
+
+    def version(self, key: Hashable) -> int:
+        """Take before loading a value; pass to set() to reject stale loads"""
+        return self._versions.get(str(key), 0)
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None) -> None:
+        if not self.enabled or value is None:
+            return
+        with self._lock:
+            if version is not None and self._versions.get(str(key), 0) != version:
+                return
+            self._data[str(key)] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+            self._data.move_to_end(str(key))
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a key here and tell the other workers to drop it too"""
+        with self._lock:
+            self._drop(str(key))
+            self.invalidations += 1
+        if self.bus is not None:
+            self.bus.publish(self.namespace, key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "ttl": self.ttl,
+        }
+
+    def _sync(self) -> None:
+        if self.bus is None:
+            return
+        with self._lock:
+            events = self.bus.poll()
+            if events is None:
+                self._data.clear()
+                return
+            for namespace, key in events:
+                if namespace == self.namespace:
+                    self._drop(key)
+
+    def _drop(self, key: str) -> None:
+        self._data.pop(key, None)
+        self._versions[key] = self._versions.get(key, 0) + 1
+        if len(self._versions) > self.max_size * 4:
+            self._versions.clear()
+
+
+class CacheService:
+    """Registry of named caches sharing one invalidation bus"""
+
+    def __init__(self):
+        settings = get_settings()
+        self.bus_path = settings.cache_bus_path or os.path.join(tempfile.gettempdir(), "geo_cache_bus.log")
+        self._caches: Dict[str, TTLCache] = {}
+
+    def get_cache(self, namespace: str, ttl: float, max_size: int = 1024) -> TTLCache:
+        cache = self._caches.get(namespace)
+        if cache is None:
+            # Each cache tracks its own read offset into the bus
+            cache = TTLCache(namespace, ttl, max_size, InvalidationBus(self.bus_path))
+            self._caches[namespace] = cache
+        return cache
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: cache.stats() for name, cache in self._caches.items()}
+
+
+# Singleton
+_cache_service: Optional[CacheService] = None
+
+def get_cache_service() -> CacheService:
+    """Get or create Cache service instance"""
+    global _cache_service
+    if _cache_service is None:
+        _cache_service = CacheService()
+    return _cache_service
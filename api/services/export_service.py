@@ -0,0 +1,173 @@
+"""
+Export Service - Streaming project exports (CSV / NDJSON / JSON)
+
+Pages through a project's tasks, posts, keywords and crawl results with
+keyset cursors and yields the encoded output chunk by chunk, so memory stays
+flat regardless of project size. Output can optionally be gzip-compressed.
+
+Pages are read with get_project_page, which raises on a DB error; the stream
+then aborts mid-body so the client sees a broken transfer rather than a
+complete-looking but truncated export.
+"""
+
+import csv
+import io
+import json
+import zlib
+from typing import Optional, Dict, Any, List, AsyncIterator
+
+from api.services.supabase_service import get_supabase_service, next_cursor
+from api.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+EXPORT_FORMATS = {"csv", "ndjson", "json"}
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+# entity -> table it is read from
+ENTITY_TABLES = {
+    "tasks": "tasks",
+    "posts": "content_posts",
+    "keywords": "generated_keywords",
+    "crawl_results": "crawl_results",
+}
+
+# entity -> (page size, columns written to CSV). Crawl results carry whole
+# pages, so they are fetched in smaller pages.
+EXPORT_ENTITIES = {
+    "tasks": (200, ["id", "batch_id", "title", "branch", "status", "publish_status", "content",
+                    "meta_data", "created_at", "updated_at"]),
+    "posts": (200, ["id", "title", "content_type", "status", "content", "image_url", "meta_data",
+                    "created_at", "updated_at"]),
+    "keywords": (500, ["id", "keyword", "source", "data", "created_at"]),
+    "crawl_results": (50, ["id", "url", "content", "metadata", "created_at"]),
+}
+
+# Flush the output buffer once it grows past this many bytes
+FLUSH_BYTES = 64 * 1024
+
+
+def parse_include(include: Optional[str]) -> List[str]:
+    """Parse ?include=tasks,posts into known entity names (all when empty)"""
+    if not include:
+        return list(EXPORT_ENTITIES)
+    names = [name.strip() for name in include.split(",") if name.strip()]
+    unknown = [name for name in names if name not in EXPORT_ENTITIES]
+    if unknown:
+        raise ValueError(f"Unknown export entities: {', '.join(unknown)}")
+    return names
+
+
+class ExportService:
+    """Builds streaming exports for a project"""
+
+    def __init__(self):
+        self.db = get_supabase_service()
+
+    async def iter_rows(self, project_id: str, entity: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every row of one entity, newest first, one page at a time"""
+        page_size = EXPORT_ENTITIES[entity][0]
+        cursor = None
+        while True:
+            try:
+                rows = await self.db.get_project_page(ENTITY_TABLES[entity], project_id, cursor, page_size)
+            except Exception as e:
+                logger.error(f"Export of {entity} for project {project_id} aborted: {e}")
+                raise
+            for row in rows:
+                yield row
+            cursor = next_cursor(rows, page_size)
+            if not cursor:
+                break
+
+    async def stream(
+        self,
+        project_id: str,
+        format: str = "json",
+        entities: Optional[List[str]] = None,
+        compress: bool = False
+    ) -> AsyncIterator[bytes]:
+        """Yield the encoded export, gzip-compressed when compress is set"""
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {format}")
+        entities = entities or list(EXPORT_ENTITIES)
+        encoder = {"csv": self._encode_csv, "ndjson": self._encode_ndjson, "json": self._encode_json}[format]
+        # wbits=31 writes a gzip header/trailer rather than a raw zlib stream
+        gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+        buffer = io.StringIO()
+        async for text in encoder(project_id, entities):
+            buffer.write(text)
+            if buffer.tell() >= FLUSH_BYTES:
+                data = buffer.getvalue().encode("utf-8")
+                buffer = io.StringIO()
+                data = gzip.compress(data) if gzip else data
+                if data:
+                    yield data
+
+        data = buffer.getvalue().encode("utf-8")
+        if gzip:
+            data = gzip.compress(data) + gzip.flush()
+        if data:
+            yield data
+
+    # ==================== Encoders ====================
+
+    async def _encode_ndjson(self, project_id: str, entities: List[str]) -> AsyncIterator[str]:
+        for entity in entities:
+            async for row in self.iter_rows(project_id, entity):
+                yield json.dumps({"type": entity, **row}, ensure_ascii=False, default=str) + "\n"
+
+    async def _encode_json(self, project_id: str, entities: List[str]) -> AsyncIterator[str]:
+        yield "{" + f'"project_id": {json.dumps(project_id)}'
+        for entity in entities:
+            yield f', "{entity}": ['
+            first = True
+            async for row in self.iter_rows(project_id, entity):
+                yield ("" if first else ", ") + json.dumps(row, ensure_ascii=False, default=str)
+                first = False
+            yield "]"
+        yield "}\n"
+
+    async def _encode_csv(self, project_id: str, entities: List[str]) -> AsyncIterator[str]:
+        # One sheet: a "type" column plus the union of the selected entities' columns
+        columns: List[str] = []
+        for entity in entities:
+            columns.extend(c for c in EXPORT_ENTITIES[entity][1] if c not in columns)
+        line = io.StringIO()
+        writer = csv.writer(line)
+
+        def render(values: List[Any]) -> str:
+            line.seek(0)
+            line.truncate()
+            writer.writerow(values)
+            return line.getvalue()
+
+        yield "\ufeff" + render(["type"] + columns)  # BOM so Excel opens UTF-8 correctly
+        for entity in entities:
+            async for row in self.iter_rows(project_id, entity):
+                yield render([entity] + [self._csv_value(row.get(c)) for c in columns])
+
+    def _csv_value(self, value: Any) -> Any:
+        if value is None:
+            return ""
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False, default=str)
+        return value
+
+
+# Singleton
+_export_service: Optional[ExportService] = None
+
+def get_export_service() -> ExportService:
+    """Get or create Export service instance"""
+    global _export_service
+    if _export_service is None:
+        _export_service = ExportService()
+    return _export_service
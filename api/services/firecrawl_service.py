@@ -2,27 +2,56 @@
 Firecrawl Service - Web scraping and crawling functionality
 """
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from firecrawl import Firecrawl
 from typing import Optional, Dict, Any, List
 from api.config import get_settings
+from api.services.normalizer_service import get_normalizer_service
+from api.logging_config import get_logger
+from api.metrics import track_upstream
+from api.tracing import trace_service
 
+logger = get_logger(__name__)
+
+@trace_service
 class FirecrawlService:
     """Service wrapper for Firecrawl SDK"""
     
     def __init__(self):
         settings = get_settings()
         self.app = Firecrawl(api_key=settings.firecrawl_api_key)
+        self.normalizer = get_normalizer_service()
+        self.scrape_timeout = settings.firecrawl_scrape_timeout
+        # Scrapes run here rather than in the loop's default executor: a
+        # caller that stops waiting (e.g. a lost hedge race) cannot stop the
+        # SDK call, and abandoned scrapes must not starve other to_thread work
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.firecrawl_workers), thread_name_prefix="firecrawl"
+        )
     
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
     async def scrape_url(
         self, 
         url: str, 
-        formats: List[str] = ["markdown", "html"]
+        formats: List[str] = ["markdown", "html"],
+        normalize: bool = True
     ) -> Dict[str, Any]:
         """
-        Scrape a single URL and return content in specified formats
+        Scrape a single URL and return content in specified formats.
+        Markdown is stripped of site chrome and link/image noise unless normalize=False.
         """
         try:
-            result = self.app.scrape(url, formats=formats)
+            # The SDK is blocking; a thread keeps the event loop free (and
+            # lets callers race or abandon a slow scrape), and the timeout
+            # bounds how long an abandoned scrape keeps its thread
+            with track_upstream("firecrawl", "scrape"):
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._executor,
+                    lambda: self.app.scrape(url, formats=formats, timeout=int(self.scrape_timeout * 1000))
+                )
             # Handle both object and dict responses
             if hasattr(result, 'markdown'):
                 data = {
@@ -32,6 +61,8 @@ class FirecrawlService:
                 }
             else:
                 data = result
+            if normalize and isinstance(data, dict) and data.get("markdown"):
+                data["markdown"] = self.normalizer.normalize(data["markdown"], url)
             return {
                 "success": True,
                 "url": url,
@@ -39,7 +70,7 @@ class FirecrawlService:
             }
         except Exception as e:
             error_msg = str(e)
-            print(f"Firecrawl Scrape Error for {url}: {error_msg}")
+            logger.warning(f"Firecrawl Scrape Error for {url}: {error_msg}")
             
             # Handle common validation errors from SDK/API
             if "Invalid URL" in error_msg or "invalid_format" in error_msg:
@@ -66,12 +97,13 @@ class FirecrawlService:
         Crawl an entire website starting from the given URL
         """
         try:
-            result = self.app.crawl(
-                url=url, 
-                limit=max_pages,
-                include_paths=include_paths,
-                exclude_paths=exclude_paths
-            )
+            with track_upstream("firecrawl", "crawl"):
+                result = self.app.crawl(
+                    url=url, 
+                    limit=max_pages,
+                    include_paths=include_paths,
+                    exclude_paths=exclude_paths
+                )
             return {
                 "success": True,
                 "url": url,
@@ -90,7 +122,8 @@ class FirecrawlService:
         Get a sitemap of all URLs on a website
         """
         try:
-            result = self.app.map(url=url)
+            with track_upstream("firecrawl", "map"):
+                result = self.app.map(url=url)
             links = result.links if hasattr(result, 'links') else result.get('links', [])
             return {
                 "success": True,
@@ -119,7 +152,8 @@ class FirecrawlService:
             # Firecrawl extract is a separate method, not a param to scrape
             # Fall back to using the OpenAI service for structured extraction
             # For now, just scrape and return - let the router handle AI extraction
-            result = self.app.scrape(url, formats=["markdown"])
+            with track_upstream("firecrawl", "extract"):
+                result = self.app.scrape(url, formats=["markdown"])
             
             if hasattr(result, 'markdown'):
                 data = {"markdown": result.markdown}
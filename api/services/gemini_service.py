@@ -2,11 +2,35 @@
 OpenAI GPT-5 Service - Content generation and analysis
 """
 
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from typing import Optional, Dict, Any, List
 import json
+import asyncio
 from api.config import get_settings
+from api.token_budget import fit_text, split_by_tokens, count_tokens
+from api.article_sections import clean_section, stitch_article, split_sections, splice_sections
+from api.logging_config import get_logger
+from api.metrics import tracked_transport
+from api.tracing import trace_service, record_llm_usage
 
+logger = get_logger(__name__)
+
+# Long-form outlines: at most this many sections (the prompt asks for 5-8),
+# each planned at a length within these bounds (words)
+MAX_OUTLINE_SECTIONS = 8
+SECTION_WORDS_MIN = 150
+SECTION_WORDS_MAX = 1500
+
+# Gap analysis: findings over the reduce prompt's budget are condensed in
+# rounds of merge calls, each reading at most REDUCE_BATCH_TOKENS of findings
+REDUCE_BATCH_TOKENS = 4000
+REDUCE_MAX_ROUNDS = 3
+
+# Targeted regeneration rewrites a section only if it fits in this many
+# tokens; larger sections are kept as they are and reported as skipped
+SECTION_REWRITE_TOKENS = 3000
+
+@trace_service
 class OpenAIService:
     """Service wrapper for OpenAI API (Async)"""
     
@@ -14,17 +38,31 @@ class OpenAIService:
         settings = get_settings()
         self.api_key = settings.openai_api_key
         # Use AsyncOpenAI for non-blocking calls
-        self.client = AsyncOpenAI(api_key=self.api_key)
+        self.client = AsyncOpenAI(
+            api_key=self.api_key,
+            http_client=DefaultAsyncHttpxClient(transport=tracked_transport("openai"))
+        )
         # 使用 gpt-4o-mini 因为它更快、更便宜且不仅限于 Tier 1+ 用户
         self.model = "gpt-4o-mini"  
         self.fast_model = "gpt-4o-mini"
+        self.map_concurrency = settings.analysis_map_concurrency
+        self.map_max_calls = settings.analysis_map_max_calls
+        self.section_concurrency = max(1, settings.article_section_concurrency)
+        self.long_form_words = settings.article_long_form_words
+        self.section_retries = max(0, settings.article_section_retries)
         
         # Debug: 打印 Key 信息到日志 (仅前几位)
         if self.api_key:
             mask_key = f"{self.api_key[:8]}...{self.api_key[-4:]}"
-            print(f"OpenAI Service initialized with Key: {mask_key}")
+            logger.info(f"OpenAI Service initialized with Key: {mask_key}")
         else:
-            print("OpenAI Service initialized WITHOUT API Key")
+            logger.warning("OpenAI Service initialized WITHOUT API Key")
+    
+    async def chat_completion(self, **kwargs):
+        """chat.completions.create, recording model and token usage on the span"""
+        response = await self.client.chat.completions.create(**kwargs)
+        record_llm_usage(response, kwargs.get("model"))
+        return response
     
     async def analyze_company_content(
         self, 
@@ -36,10 +74,10 @@ class OpenAIService:
         """
         from api.prompts import get_company_analysis_prompt, SYSTEM_COMPANY_ANALYSIS
         
-        prompt = get_company_analysis_prompt(content)
+        prompt = get_company_analysis_prompt(content, model=self.fast_model)
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.chat_completion(
                 model=self.fast_model,
                 messages=[
                     {"role": "system", "content": SYSTEM_COMPANY_ANALYSIS},
@@ -49,7 +87,7 @@ class OpenAIService:
             )
             return json.loads(response.choices[0].message.content)
         except Exception as e:
-            print(f"Error in analyze_company_content: {e}")
+            logger.error(f"Error in analyze_company_content: {e}")
             return {
                 "company_name": company_name or "Unknown",
                 "industry": "Technology",
@@ -70,10 +108,10 @@ class OpenAIService:
         """
         from api.prompts import get_search_simulation_prompt, SYSTEM_SEARCH_SIMULATION
         
-        prompt = get_search_simulation_prompt(profile, n)
+        prompt = get_search_simulation_prompt(profile, n, model=self.fast_model)
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.chat_completion(
                 model=self.fast_model,
                 messages=[
                     {"role": "system", "content": SYSTEM_SEARCH_SIMULATION},
@@ -84,7 +122,7 @@ class OpenAIService:
             result = json.loads(response.choices[0].message.content)
             return result.get("queries", [])
         except Exception as e:
-            print(f"[Gemini] Search simulation failed: {e}")
+            logger.warning(f"[Gemini] Search simulation failed: {e}")
             return []
     
     async def generate_gap_analysis(
@@ -100,14 +138,14 @@ class OpenAIService:
         from api.prompts import get_gap_analysis_prompt, SYSTEM_GAP_ANALYSIS
         
         competitor_summary = "\n\n".join([
-            f"### 竞品 {i+1}: {c['url']}\n{c.get('content', 'N/A')[:5000]}"
+            f"### 竞品 {i+1}: {c['url']}\n{fit_text(c.get('content', 'N/A'), 2500, self.model)}"
             for i, c in enumerate(competitor_data) if c.get("success")
         ])
         
-        prompt = get_gap_analysis_prompt(company_profile, competitor_summary, our_site_content)
+        prompt = get_gap_analysis_prompt(company_profile, competitor_summary, our_site_content, model=self.model)
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.chat_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": SYSTEM_GAP_ANALYSIS},
@@ -118,7 +156,204 @@ class OpenAIService:
             return json.loads(response.choices[0].message.content)
         except Exception as e:
             # Return error instead of mock data
-            print(f"[GapAnalysis] AI analysis failed: {e}")
+            logger.warning(f"[GapAnalysis] AI analysis failed: {e}")
+            return {
+                "summary": f"差距分析失败: {str(e)}",
+                "contentComparisons": [],
+                "competitorGaps": [],
+                "missingKeywords": [],
+                "structuralGaps": [],
+                "suggestions": [],
+                "error": str(e)
+            }
+    
+    async def extract_gap_findings(
+        self,
+        company_profile: Dict[str, Any],
+        source: str,
+        content: str
+    ) -> Dict[str, Any]:
+        """
+        Map step of map-reduce gap analysis: extract structured findings
+        from one page (or one part of a page) on the fast model
+        """
+        from api.prompts import get_gap_map_prompt, SYSTEM_GAP_MAP
+        
+        prompt = get_gap_map_prompt(company_profile, source, content, model=self.fast_model)
+        
+        try:
+            response = await self.chat_completion(
+                model=self.fast_model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_GAP_MAP},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"}
+            )
+            findings = json.loads(response.choices[0].message.content)
+            findings["source"] = source
+            return findings
+        except Exception as e:
+            logger.warning(f"[MapReduce] Extraction failed for {source}: {e}")
+            return {"source": source, "error": str(e)}
+
+    async def map_gap_findings(
+        self,
+        company_profile: Dict[str, Any],
+        documents: List[Dict[str, Any]],
+        part_tokens: int = 3000
+    ) -> Dict[str, Any]:
+        """
+        Run the map step over documents ({"source", "content"}) concurrently.
+        Long documents are split into parts so nothing beyond a slice limit
+        is dropped; total calls are capped by ANALYSIS_MAP_MAX_CALLS.
+        """
+        jobs = []
+        for doc in documents:
+            parts = split_by_tokens(doc.get("content", ""), part_tokens, self.fast_model)
+            for i, part in enumerate(parts):
+                label = doc["source"] if len(parts) == 1 else f"{doc['source']} (part {i + 1}/{len(parts)})"
+                jobs.append((label, part))
+        
+        skipped = max(0, len(jobs) - self.map_max_calls)
+        jobs = jobs[:self.map_max_calls]
+        semaphore = asyncio.Semaphore(self.map_concurrency)
+        
+        async def run(label: str, part: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.extract_gap_findings(company_profile, label, part)
+        
+        logger.info(f"[MapReduce] Mapping {len(jobs)} parts (concurrency {self.map_concurrency}, skipped {skipped})")
+        results = await asyncio.gather(*(run(label, part) for label, part in jobs))
+        findings = [r for r in results if "error" not in r]
+        
+        return {
+            "findings": findings,
+            "stats": {
+                "map_calls": len(jobs),
+                "map_failed": len(jobs) - len(findings),
+                "parts_skipped": skipped
+            }
+        }
+
+    async def merge_gap_findings(
+        self,
+        findings: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Intermediate reduce step: condense several findings into one (fast model)"""
+        from api.prompts import get_gap_merge_prompt, format_gap_findings, SYSTEM_GAP_MERGE
+        
+        sources = [f.get("source", "Unknown") for f in findings]
+        prompt = get_gap_merge_prompt(format_gap_findings(findings), model=self.fast_model)
+        try:
+            response = await self.chat_completion(
+                model=self.fast_model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_GAP_MERGE},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"}
+            )
+            merged = json.loads(response.choices[0].message.content)
+            merged["source"] = ", ".join(sources)
+            return merged
+        except Exception as e:
+            logger.warning(f"[MapReduce] Merge of {len(findings)} findings failed: {e}")
+            return {"source": ", ".join(sources), "error": str(e)}
+
+    async def reduce_gap_findings(
+        self,
+        findings: List[Dict[str, Any]],
+        budget: int
+    ) -> Dict[str, Any]:
+        """
+        Hierarchical reduce: while the rendered findings exceed budget tokens,
+        group them into batches of about REDUCE_BATCH_TOKENS and condense each
+        batch with a concurrent merge call (at most REDUCE_MAX_ROUNDS rounds).
+        A failed merge keeps its batch as is. Whatever still exceeds the budget
+        is cut by the prompt builder and reported as findings_tokens_dropped.
+        """
+        from api.prompts import format_gap_findings
+        
+        semaphore = asyncio.Semaphore(self.map_concurrency)
+        tokens = count_tokens(format_gap_findings(findings), self.model)
+        rounds = calls = 0
+        
+        async def merge(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                merged = await self.merge_gap_findings(batch)
+            return batch if "error" in merged else [merged]
+        
+        while tokens > budget and len(findings) > 1 and rounds < REDUCE_MAX_ROUNDS:
+            batches: List[List[Dict[str, Any]]] = [[]]
+            batch_tokens = 0
+            for finding in findings:
+                size = count_tokens(format_gap_findings([finding]), self.fast_model)
+                if batches[-1] and batch_tokens + size > REDUCE_BATCH_TOKENS:
+                    batches.append([])
+                    batch_tokens = 0
+                batches[-1].append(finding)
+                batch_tokens += size
+            
+            rounds += 1
+            calls += len(batches)
+            logger.info(f"[MapReduce] Reduce round {rounds}: {len(findings)} findings ({tokens} tokens) in {len(batches)} batches")
+            merged = await asyncio.gather(*(merge(batch) for batch in batches))
+            reduced = [f for batch in merged for f in batch]
+            reduced_tokens = count_tokens(format_gap_findings(reduced), self.model)
+            if reduced_tokens >= tokens:
+                break
+            findings, tokens = reduced, reduced_tokens
+        
+        return {
+            "findings": findings,
+            "stats": {
+                "reduce_rounds": rounds,
+                "reduce_calls": calls,
+                "findings_tokens": tokens,
+                "findings_tokens_dropped": max(0, tokens - budget)
+            }
+        }
+
+    async def generate_gap_analysis_map_reduce(
+        self,
+        company_profile: Dict[str, Any],
+        competitor_data: List[Dict[str, Any]],
+        our_site_content: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Map-reduce variant of generate_gap_analysis: every competitor page is
+        read in full by concurrent map calls, the extracted findings are
+        condensed until they fit the reduce prompt (reduce_gap_findings), and
+        a final reduce call merges them into the usual gap analysis report
+        """
+        from api.prompts import get_gap_analysis_prompt, format_gap_findings, gap_findings_budget, SYSTEM_GAP_ANALYSIS
+        
+        documents = [
+            {"source": c["url"], "content": c.get("content", "")}
+            for c in competitor_data if c.get("success")
+        ]
+        mapped = await self.map_gap_findings(company_profile, documents)
+        reduced = await self.reduce_gap_findings(mapped["findings"], gap_findings_budget(self.model))
+        mapped["stats"].update(reduced["stats"])
+        findings_summary = format_gap_findings(reduced["findings"])
+        
+        prompt = get_gap_analysis_prompt(company_profile, findings_summary, our_site_content, model=self.model)
+        
+        try:
+            response = await self.chat_completion(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_GAP_ANALYSIS},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"}
+            )
+            result = json.loads(response.choices[0].message.content)
+            result["map_reduce"] = mapped["stats"]
+            return result
+        except Exception as e:
+            logger.warning(f"[GapAnalysis] Map-reduce reduce step failed: {e}")
             return {
                 "summary": f"差距分析失败: {str(e)}",
                 "contentComparisons": [],
@@ -126,6 +361,7 @@ class OpenAIService:
                 "missingKeywords": [],
                 "structuralGaps": [],
                 "suggestions": [],
+                "map_reduce": mapped["stats"],
                 "error": str(e)
             }
     
@@ -144,12 +380,12 @@ class OpenAIService:
         
         content_context = ""
         if scraped_content:
-            content_context = f"基于爬取的内容：{str(scraped_content)[:5000]}"
+            content_context = f"基于爬取的内容：{str(scraped_content)}"
         
-        prompt = get_company_profile_prompt(company_name, domain, content_context, latest_news)
+        prompt = get_company_profile_prompt(company_name, domain, content_context, latest_news, model=self.model)
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.chat_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": SYSTEM_COMPANY_PROFILE},
@@ -181,11 +417,10 @@ class OpenAIService:
         """
         Generate content based on title and type (Article or Social).
         Supports context injection (Deep Research / Social Trends).
+        Long-form Articles go through generate_long_form_article.
         """
         from api.prompts import get_content_generation_prompt, SYSTEM_CONTENT_ARTICLE, SYSTEM_CONTENT_SOCIAL
         
-        prompt = get_content_generation_prompt(title, content_type, profile, context_data)
-        
         if content_type == "Article":
             system_prompt = SYSTEM_CONTENT_ARTICLE
             model = self.model
@@ -193,8 +428,10 @@ class OpenAIService:
             system_prompt = SYSTEM_CONTENT_SOCIAL
             model = self.fast_model
         
+        prompt = get_content_generation_prompt(title, content_type, profile, context_data, model=model)
+        
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.chat_completion(
                 model=model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -208,6 +445,113 @@ class OpenAIService:
             else:
                 return f"{title}\n\n🚀 内容生成失败: {str(e)}\n\n#GEO #AI #Marketing"
 
+    async def generate_long_form_article(
+        self,
+        title: str,
+        profile: Dict[str, Any],
+        context_data: Optional[Dict[str, Any]] = None,
+        target_words: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Long-form Article in two rounds instead of one long completion:
+        1. One fast call plans the outline (sections with points and word
+           counts) and writes the introduction
+        2. Every section is written concurrently (ARTICLE_SECTION_CONCURRENCY)
+           with the whole outline, profile and research as shared context
+        The sections are then stitched and their headings normalized, so
+        latency is roughly one outline plus one section. Failed sections are
+        retried (ARTICLE_SECTION_RETRIES); any still missing are left out and
+        listed in stats["missing"], so callers can flag the piece as
+        incomplete. Falls back to the single-call article when no outline
+        can be planned.
+        """
+        from api.prompts import (
+            get_article_outline_prompt, get_article_section_prompt,
+            SYSTEM_ARTICLE_OUTLINE, SYSTEM_CONTENT_ARTICLE
+        )
+        
+        target_words = target_words or self.long_form_words
+        try:
+            response = await self.chat_completion(
+                model=self.fast_model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_ARTICLE_OUTLINE},
+                    {"role": "user", "content": get_article_outline_prompt(
+                        title, profile, context_data, target_words, model=self.fast_model
+                    )}
+                ],
+                response_format={"type": "json_object"}
+            )
+            outline = self._bounded_outline(json.loads(response.choices[0].message.content), target_words)
+        except Exception as e:
+            logger.warning(f"[LongForm] Outline failed, writing in one call: {e}")
+            content = await self.generate_content(title, "Article", profile, context_data)
+            return {"content": content, "outline": None, "stats": {"sections": 0, "sections_failed": 0, "missing": []}}
+        
+        semaphore = asyncio.Semaphore(self.section_concurrency)
+        
+        async def write_section(index: int) -> Optional[str]:
+            heading = outline["sections"][index]["heading"]
+            prompt = get_article_section_prompt(title, outline, index, profile, context_data, model=self.model)
+            async with semaphore:
+                try:
+                    response = await self.chat_completion(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": SYSTEM_CONTENT_ARTICLE},
+                            {"role": "user", "content": prompt}
+                        ]
+                    )
+                    return clean_section(response.choices[0].message.content, heading)
+                except Exception as e:
+                    logger.warning(f"[LongForm] Section {index + 1} ({heading}) failed: {e}")
+                    return None
+        
+        count = len(outline["sections"])
+        logger.info(f"[LongForm] Writing {count} sections (concurrency {self.section_concurrency})")
+        written: List[Optional[str]] = [None] * count
+        pending = list(range(count))
+        for attempt in range(1 + self.section_retries):
+            if attempt:
+                logger.info(f"[LongForm] Retrying {len(pending)} failed sections (attempt {attempt + 1})")
+            results = await asyncio.gather(*(write_section(i) for i in pending))
+            for i, text in zip(pending, results):
+                written[i] = text
+            pending = [i for i in pending if written[i] is None]
+            if not pending:
+                break
+        
+        missing = [outline["sections"][i]["heading"] for i in pending]
+        if missing:
+            logger.error(f"[LongForm] '{title}' is missing {len(missing)} of {count} sections: {missing}")
+        return {
+            "content": stitch_article(title, outline.get("intro", ""), [t for t in written if t is not None]),
+            "outline": outline,
+            "stats": {"sections": count, "sections_failed": len(missing), "missing": missing}
+        }
+
+    def _bounded_outline(self, outline: Dict[str, Any], target_words: int) -> Dict[str, Any]:
+        """
+        Keep a planned outline within bounds: at most MAX_OUTLINE_SECTIONS
+        sections (the last one, the FAQ, is kept) and every section's word
+        count an integer within SECTION_WORDS_MIN..SECTION_WORDS_MAX.
+        """
+        sections = [s for s in outline.get("sections") or [] if isinstance(s, dict) and s.get("heading")]
+        if not sections:
+            raise ValueError("Outline has no sections")
+        if len(sections) > MAX_OUTLINE_SECTIONS:
+            sections = sections[:MAX_OUTLINE_SECTIONS - 1] + sections[-1:]
+        
+        default_words = target_words // len(sections)
+        for section in sections:
+            try:
+                words = int(section.get("words") or default_words)
+            except (TypeError, ValueError):
+                words = default_words
+            section["words"] = min(max(words, SECTION_WORDS_MIN), SECTION_WORDS_MAX)
+        outline["sections"] = sections
+        return outline
+
     async def regenerate_content(
         self,
         original_content: str,
@@ -219,12 +563,12 @@ class OpenAIService:
         """
         from api.prompts import get_regenerate_content_prompt, SYSTEM_CONTENT_ARTICLE, SYSTEM_CONTENT_SOCIAL
         
-        prompt = get_regenerate_content_prompt(original_content, feedback, content_type)
+        prompt = get_regenerate_content_prompt(original_content, feedback, content_type, model=self.model)
         
         system_prompt = SYSTEM_CONTENT_ARTICLE if content_type == "Article" else SYSTEM_CONTENT_SOCIAL
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.chat_completion(
                 model=self.model, # Use smart model for refinement
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -235,6 +579,103 @@ class OpenAIService:
         except Exception as e:
             return f"优化失败: {str(e)}\n\n{original_content}"
 
+    async def regenerate_sections(
+        self,
+        original_content: str,
+        feedback: str
+    ) -> Dict[str, Any]:
+        """
+        Targeted refinement of an Article: split it into sections, let one
+        fast call pick the sections the feedback applies to, rewrite only
+        those concurrently and splice them back; untouched sections are kept
+        byte for byte. Cost scales with the edit, not the article. A selected
+        section over SECTION_REWRITE_TOKENS is kept and reported in "skipped"
+        rather than rewritten from a truncated copy. Articles with fewer than
+        two sections are refined whole (regenerate_content).
+        """
+        from api.prompts import (
+            get_section_selection_prompt, get_section_regenerate_prompt,
+            SYSTEM_SECTION_SELECTION, SYSTEM_CONTENT_ARTICLE
+        )
+        
+        preamble, sections = split_sections(original_content)
+        if len(sections) < 2:
+            content = await self.regenerate_content(original_content, feedback, "Article")
+            return {"content": content, "mode": "full", "regenerated": [], "skipped": []}
+        
+        # The introduction is a candidate too; the title line itself is kept
+        title_line = ""
+        intro = preamble
+        if preamble.startswith("# "):
+            title_line, _, intro = preamble.partition("\n")
+        title = title_line[2:].strip() or sections[0]["heading"]
+        units = [{"label": s["heading"], **s} for s in sections]
+        if intro.strip():
+            units.insert(0, {"label": "开篇导语", "heading": None, "level": None, "text": intro.strip()})
+        
+        try:
+            response = await self.chat_completion(
+                model=self.fast_model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_SECTION_SELECTION},
+                    {"role": "user", "content": get_section_selection_prompt(feedback, units, model=self.fast_model)}
+                ],
+                response_format={"type": "json_object"}
+            )
+            selection = json.loads(response.choices[0].message.content)
+            if selection.get("scope") == "all":
+                selected = list(range(len(units)))
+            else:
+                selected = sorted({
+                    int(i) for i in selection.get("sections") or []
+                    if str(i).lstrip("-").isdigit() and 0 <= int(i) < len(units)
+                })
+        except Exception as e:
+            logger.warning(f"[Regenerate] Section selection failed, revising every section: {e}")
+            selected = []
+        if not selected:
+            selected = list(range(len(units)))
+        skipped = [i for i in selected if count_tokens(units[i]["text"], self.model) > SECTION_REWRITE_TOKENS]
+        if skipped:
+            logger.warning(f"[Regenerate] Keeping {len(skipped)} sections too long to rewrite: {[units[i]['label'] for i in skipped]}")
+            selected = [i for i in selected if i not in skipped]
+        
+        headings = [u["label"] for u in units]
+        semaphore = asyncio.Semaphore(self.section_concurrency)
+        
+        async def rewrite(index: int) -> Optional[str]:
+            unit = units[index]
+            prompt = get_section_regenerate_prompt(title, headings, unit, feedback, model=self.model)
+            async with semaphore:
+                try:
+                    response = await self.chat_completion(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": SYSTEM_CONTENT_ARTICLE},
+                            {"role": "user", "content": prompt}
+                        ]
+                    )
+                    return clean_section(response.choices[0].message.content, unit["heading"], unit["level"] or 2)
+                except Exception as e:
+                    logger.warning(f"[Regenerate] Section {unit['label']} failed, keeping the original: {e}")
+                    return None
+        
+        logger.info(f"[Regenerate] Rewriting {len(selected)}/{len(units)} sections")
+        rewritten = dict(zip(selected, await asyncio.gather(*(rewrite(i) for i in selected))))
+        rewritten = {i: text for i, text in rewritten.items() if text}
+        
+        offset = 1 if units[0]["heading"] is None else 0
+        return {
+            "content": splice_sections(
+                original_content,
+                {i - offset: text for i, text in rewritten.items() if i >= offset},
+                intro=rewritten.get(0) if offset else None
+            ),
+            "mode": "targeted",
+            "regenerated": [units[i]["label"] for i in selected if i in rewritten],
+            "skipped": [units[i]["label"] for i in skipped]
+        }
+
     async def generate_keywords(
         self,
         profile: Dict[str, Any]
@@ -244,10 +685,10 @@ class OpenAIService:
         """
         from api.prompts import get_keyword_generation_prompt, SYSTEM_KEYWORD_GENERATION
         
-        prompt = get_keyword_generation_prompt(profile)
+        prompt = get_keyword_generation_prompt(profile, model=self.model)
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.chat_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": SYSTEM_KEYWORD_GENERATION},
@@ -258,7 +699,7 @@ class OpenAIService:
             result = json.loads(response.choices[0].message.content)
             return result.get("keywords", [])
         except Exception as e:
-            print(f"Error in generate_keywords: {e}")
+            logger.error(f"Error in generate_keywords: {e}")
             return []
             return []
 
@@ -275,10 +716,10 @@ class OpenAIService:
         """
         from api.prompts import get_title_generation_prompt, SYSTEM_TITLE_GENERATION
         
-        prompt = get_title_generation_prompt(topic, niche, profile, trends_context, n)
+        prompt = get_title_generation_prompt(topic, niche, profile, trends_context, n, model=self.model)
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.chat_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": SYSTEM_TITLE_GENERATION},
@@ -289,7 +730,7 @@ class OpenAIService:
             result = json.loads(response.choices[0].message.content)
             return result.get("titles", [])
         except Exception as e:
-            print(f"Error in generate_titles: {e}")
+            logger.error(f"Error in generate_titles: {e}")
             return []
 
 
@@ -1,39 +1,115 @@
 """
 Image Service - DALL-E Image Generation
+
+Images are keyed by a hash of the generation prompt (plus model settings):
+1. A stored image for the key is reused without calling DALL-E again
+2. Concurrent requests for the same key share one in-flight generation
+3. New generations run under their own concurrency limit (IMAGE_CONCURRENCY),
+   independent of text generation
+
+DALL-E returns the image bytes inline (b64_json), so nothing has to be
+fetched from OpenAI's expiring URLs; the bytes go to the MediaService,
+which stores them with WebP and thumbnail variants under stable URLs.
 """
 
-from typing import Optional
+import asyncio
+import base64
+import hashlib
+from typing import Optional, Dict
+
+from api.config import get_settings
 from api.services.gemini_service import get_gemini_service
+from api.services.media_service import get_media_service
 from api.prompts import get_image_generation_prompt
+from api.logging_config import get_logger
+from api.tracing import trace_service, set_span_attributes
+
+logger = get_logger(__name__)
+
+IMAGE_MODEL = "dall-e-3"
+IMAGE_SIZE = "1024x1024"
+IMAGE_QUALITY = "standard"
+
+
+def preferred_image_url(variants: Optional[Dict[str, str]]) -> Optional[str]:
+    """The URL to publish: WebP when it was derived, else the original"""
+    if not variants:
+        return None
+    return variants.get("webp") or variants.get("original")
+
 
+def image_key(prompt: str) -> str:
+    """Cache key for a generation prompt under the current model settings"""
+    material = f"{IMAGE_MODEL}|{IMAGE_SIZE}|{IMAGE_QUALITY}|{prompt.strip()}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:32]
+
+
+@trace_service
 class ImageService:
     def __init__(self):
+        settings = get_settings()
         self.ai = get_gemini_service()
+        self.media = get_media_service()
+        self._semaphore = asyncio.Semaphore(max(1, settings.image_concurrency))
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {"generated": 0, "reused": 0, "joined": 0, "failed": 0}
 
     async def generate_image(self, title: str, style: str = "tech") -> Optional[str]:
         """
-        Generate an image using DALL-E 3
+        Generate an image using DALL-E 3 (or reuse the stored one for the
+        same prompt). Returns a stable URL, or None if generation failed.
         """
+        variants = await self.generate_image_variants(title, style)
+        return preferred_image_url(variants)
+
+    async def generate_image_variants(self, title: str, style: str = "tech") -> Optional[Dict[str, str]]:
+        """Like generate_image, but returns every stored variant's URL"""
         prompt = get_image_generation_prompt(title, style)
-        print(f"Generating image with prompt: {prompt[:100]}...")
-        
+        key = image_key(prompt)
+        set_span_attributes(**{"image.key": key, "image.style": style})
+
+        stored = await self.media.lookup(key)
+        if stored:
+            self.stats["reused"] += 1
+            return stored
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._generate(key, prompt))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats["joined"] += 1
+
+        # Shielded: a cancelled caller must not cancel a generation others await
+        return await asyncio.shield(task)
+
+    async def _generate(self, key: str, prompt: str) -> Optional[Dict[str, str]]:
+        async with self._semaphore:
+            logger.info(f"Generating image with prompt: {prompt.strip()[:100]}...")
+            try:
+                response = await self.ai.client.images.generate(
+                    model=IMAGE_MODEL,
+                    prompt=prompt,
+                    size=IMAGE_SIZE,
+                    quality=IMAGE_QUALITY,
+                    response_format="b64_json",
+                    n=1,
+                )
+                data = base64.b64decode(response.data[0].b64_json)
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Image Generation Failed: {e}")
+                return None
+
         try:
-            response = self.ai.client.images.generate(
-                model="dall-e-3",
-                prompt=prompt,
-                size="1024x1024",
-                quality="standard",
-                n=1,
-            )
-            
-            image_url = response.data[0].url
-            return image_url
-            
+            variants = await self.media.store_image(key, data)
         except Exception as e:
-            print(f"Image Generation Failed: {e}")
-            # Mock URL for fallback or development (if no quota)
-            # return "https://images.unsplash.com/photo-1620712943543-bcc4688e7485" 
+            self.stats["failed"] += 1
+            logger.error(f"Storing generated image failed: {e}")
             return None
+        self.stats["generated"] += 1
+        return variants
 
 # Singleton
 _image_service = None
@@ -0,0 +1,896 @@
+"""
+Local DB Service - SQLite backend with the SupabaseService interface
+
+Lets the persistence path run without a Supabase project (benchmarks, load
+tests, offline development). Selected with DB_BACKEND=sqlite; the database
+file is LOCAL_DB_PATH. Every public method mirrors SupabaseService, including
+return shapes and error handling, so routers and services are unchanged.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+from api.config import get_settings
+from api.services.supabase_service import (
+    decode_cursor, prepare_task_rows, group_task_updates, get_project_cache, TASK_INSERT_CHUNK,
+    build_content_post_row, build_analysis_report_row, build_keyword_rows
+)
+from api.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+# Column names per table; JSON columns are stored as TEXT and decoded on read
+TABLES = {
+    "projects": ["id", "name", "domain", "status", "company_profile", "wp_connection",
+                 "social_connections", "user_id", "created_at", "updated_at"],
+    "crawl_results": ["id", "project_id", "url", "content", "metadata", "created_at"],
+    "crawl_chunks": ["id", "project_id", "crawl_result_id", "url", "chunk_index", "content", "created_at"],
+    "analysis_reports": ["id", "project_id", "report_type", "data", "created_at"],
+    "generated_keywords": ["id", "project_id", "keyword", "data", "source", "created_at"],
+    "content_posts": ["id", "project_id", "title", "content_type", "status", "content", "image_url",
+                      "meta_data", "created_at", "updated_at"],
+    "tasks": ["id", "project_id", "batch_id", "title", "branch", "status", "content", "meta_data",
+              "publish_status", "created_at", "updated_at"],
+    "wordpress_media": ["site", "image_hash", "media_id", "source_url", "created_at"],
+    "scheduled_posts": ["id", "project_id", "post_id", "platform", "target", "publish_at", "status",
+                        "attempts", "last_error", "result", "claimed_at", "published_at",
+                        "created_at", "updated_at"],
+}
+
+JSON_COLUMNS = {"company_profile", "wp_connection", "social_connections", "metadata", "data", "meta_data",
+                "target", "result"}
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    status TEXT DEFAULT 'PROFILE_ENTRY',
+    company_profile TEXT,
+    wp_connection TEXT,
+    social_connections TEXT,
+    user_id TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS crawl_results (
+    id TEXT PRIMARY KEY,
+    project_id TEXT REFERENCES projects(id) ON DELETE CASCADE,
+    url TEXT NOT NULL,
+    content TEXT,
+    metadata TEXT,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS crawl_chunks (
+    id TEXT PRIMARY KEY,
+    project_id TEXT REFERENCES projects(id) ON DELETE CASCADE,
+    crawl_result_id TEXT REFERENCES crawl_results(id) ON DELETE CASCADE,
+    url TEXT,
+    chunk_index INTEGER DEFAULT 0,
+    content TEXT NOT NULL,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS analysis_reports (
+    id TEXT PRIMARY KEY,
+    project_id TEXT REFERENCES projects(id) ON DELETE CASCADE,
+    report_type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS generated_keywords (
+    id TEXT PRIMARY KEY,
+    project_id TEXT REFERENCES projects(id) ON DELETE CASCADE,
+    keyword TEXT NOT NULL,
+    data TEXT,
+    source TEXT,
+    created_at TEXT,
+    UNIQUE (project_id, keyword)
+);
+CREATE TABLE IF NOT EXISTS content_posts (
+    id TEXT PRIMARY KEY,
+    project_id TEXT REFERENCES projects(id) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    content_type TEXT,
+    status TEXT DEFAULT 'DRAFT',
+    content TEXT,
+    image_url TEXT,
+    meta_data TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    project_id TEXT REFERENCES projects(id) ON DELETE CASCADE,
+    batch_id TEXT,
+    title TEXT NOT NULL,
+    branch TEXT,
+    status TEXT DEFAULT 'Pending',
+    content TEXT,
+    meta_data TEXT,
+    publish_status TEXT DEFAULT 'Pending',
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS wordpress_media (
+    site TEXT NOT NULL,
+    image_hash TEXT NOT NULL,
+    media_id INTEGER NOT NULL,
+    source_url TEXT,
+    created_at TEXT,
+    PRIMARY KEY (site, image_hash)
+);
+CREATE TABLE IF NOT EXISTS scheduled_posts (
+    id TEXT PRIMARY KEY,
+    project_id TEXT REFERENCES projects(id) ON DELETE CASCADE,
+    post_id TEXT REFERENCES content_posts(id) ON DELETE CASCADE,
+    platform TEXT NOT NULL,
+    target TEXT,
+    publish_at TEXT NOT NULL,
+    status TEXT DEFAULT 'pending',
+    attempts INTEGER DEFAULT 0,
+    last_error TEXT,
+    result TEXT,
+    claimed_at TEXT,
+    published_at TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scheduled_posts_status_publish_at ON scheduled_posts (status, publish_at);
+CREATE INDEX IF NOT EXISTS idx_scheduled_posts_project_created ON scheduled_posts (project_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_projects_user_created ON projects (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_crawl_results_project_created ON crawl_results (project_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_crawl_chunks_project_created ON crawl_chunks (project_id, created_at DESC, id DESC);
+DELETE FROM crawl_chunks WHERE rowid NOT IN (
+    SELECT MIN(rowid) FROM crawl_chunks GROUP BY crawl_result_id, chunk_index
+) AND NOT EXISTS (
+    SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uq_crawl_chunks_result_chunk'
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_crawl_chunks_result_chunk ON crawl_chunks (crawl_result_id, chunk_index);
+CREATE INDEX IF NOT EXISTS idx_analysis_reports_project_created ON analysis_reports (project_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_generated_keywords_project_created ON generated_keywords (project_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_content_posts_project_created ON content_posts (project_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_tasks_project_created ON tasks (project_id, created_at DESC, id DESC);
+"""
+
+
+class LocalDBService:
+    """SQLite implementation of the SupabaseService interface"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        settings = get_settings()
+        self.db_path = db_path or settings.local_db_path
+        # One connection shared across worker threads, serialized by a lock;
+        # WAL keeps readers from other processes unblocked
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA foreign_keys=ON")
+            self.conn.executescript(SCHEMA_SQL)
+        # Kept for code that checks `service.client` before use
+        self.client = self
+        logger.info(f"Local DB Service initialized at {os.path.abspath(self.db_path)}")
+
+    # ==================== Low-level helpers ====================
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [self._decode(dict(r)) for r in rows]
+
+    def _executemany(self, batches: List[Tuple[str, List[tuple]]]) -> None:
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                for sql, rows in batches:
+                    self.conn.executemany(sql, rows)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    async def _run(self, fn, *args):
+        """Run blocking SQLite work off the event loop"""
+        return await asyncio.to_thread(fn, *args)
+
+    def _decode(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        for key in JSON_COLUMNS.intersection(row):
+            if isinstance(row[key], str):
+                try:
+                    row[key] = json.loads(row[key])
+                except ValueError:
+                    pass
+        return row
+
+    def _encode(self, key: str, value: Any) -> Any:
+        if key in JSON_COLUMNS and value is not None and not isinstance(value, str):
+            return json.dumps(value, ensure_ascii=False, default=str)
+        return value
+
+    def _check_columns(self, table: str, keys) -> None:
+        unknown = [k for k in keys if k not in TABLES[table]]
+        if unknown:
+            raise ValueError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+
+    def _insert(self, table: str, data: Dict[str, Any], upsert_on: Optional[str] = None) -> Dict[str, Any]:
+        self._insert_many(table, [data], upsert_on)
+        return dict(data)
+
+    def _insert_many(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        upsert_on: Optional[str] = None,
+        ignore_duplicates: bool = False
+    ) -> None:
+        if not rows:
+            return
+        # Rows with different key sets need different statements; omitted
+        # columns keep their schema defaults. All run in one transaction.
+        statements: Dict[tuple, List[tuple]] = {}
+        for row in rows:
+            keys = tuple(row.keys())
+            statements.setdefault(keys, []).append(tuple(self._encode(k, row.get(k)) for k in keys))
+        batches = []
+        for keys, params in statements.items():
+            self._check_columns(table, keys)
+            sql = f"INSERT INTO {table} ({', '.join(keys)}) VALUES ({', '.join('?' for _ in keys)})"
+            if upsert_on and ignore_duplicates:
+                sql += f" ON CONFLICT ({upsert_on}) DO NOTHING"
+            elif upsert_on:
+                conflict = ("id",) + tuple(upsert_on.split(","))
+                updates = ", ".join(f"{k} = excluded.{k}" for k in keys if k not in conflict)
+                sql += f" ON CONFLICT ({upsert_on}) DO UPDATE SET {updates}"
+            batches.append((sql, params))
+        self._executemany(batches)
+
+    def _update(self, table: str, row_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        self._check_columns(table, data.keys())
+        assignments = ", ".join(f"{k} = ?" for k in data)
+        params = tuple(self._encode(k, v) for k, v in data.items()) + (row_id,)
+        with self._lock:
+            cur = self.conn.execute(f"UPDATE {table} SET {assignments} WHERE id = ?", params)
+            changed = cur.rowcount
+        return self._get_row(table, row_id) if changed else None
+
+    def _update_many(self, table: str, row_ids: List[str], data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        self._check_columns(table, data.keys())
+        assignments = ", ".join(f"{k} = ?" for k in data)
+        placeholders = ", ".join("?" for _ in row_ids)
+        params = tuple(self._encode(k, v) for k, v in data.items()) + tuple(row_ids)
+        with self._lock:
+            self.conn.execute(f"UPDATE {table} SET {assignments} WHERE id IN ({placeholders})", params)
+        return self._execute(f"SELECT * FROM {table} WHERE id IN ({placeholders})", tuple(row_ids))
+
+    def _get_row(self, table: str, row_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._execute(f"SELECT * FROM {table} WHERE id = ? LIMIT 1", (row_id,))
+        return rows[0] if rows else None
+
+    def _select_project_rows(
+        self,
+        table: str,
+        project_id: str,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Same keyset semantics as SupabaseService._select_project_rows"""
+        columns = "*"
+        if fields:
+            selected = [f for f in fields if f in TABLES[table]]
+            for required in ("created_at", "id"):
+                if required not in selected:
+                    selected.insert(0, required)
+            columns = ", ".join(selected)
+
+        sql = f"SELECT {columns} FROM {table} WHERE project_id = ?"
+        params: list = [project_id]
+        position = decode_cursor(cursor)
+        if position:
+            created_at, row_id = position
+            sql += " AND (created_at < ? OR (created_at = ? AND id < ?))"
+            params += [created_at, created_at, row_id]
+        sql += " ORDER BY created_at DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._execute(sql, tuple(params))
+
+    async def get_project_page(
+        self,
+        table: str,
+        project_id: str,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Same as SupabaseService.get_project_page (errors propagate)"""
+        return await self._run(self._select_project_rows, table, project_id, None, cursor, limit)
+
+    def _now(self) -> str:
+        return datetime.utcnow().isoformat()
+
+    # ==================== Auth ====================
+
+    def _hash_password(self, password: str, salt: str) -> str:
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), 100_000).hex()
+
+    async def sign_up(self, email: str, password: str) -> Dict[str, Any]:
+        """Sign up a new user"""
+        try:
+            salt = secrets.token_hex(8)
+            user = {"id": str(uuid.uuid4()), "email": email, "created_at": self._now()}
+            await self._run(
+                self._execute,
+                "INSERT INTO users (id, email, password_hash, created_at) VALUES (?, ?, ?, ?)",
+                (user["id"], email, f"{salt}${self._hash_password(password, salt)}", user["created_at"])
+            )
+            return {"user": user, "session": {"access_token": secrets.token_urlsafe(32), "user": user}}
+        except Exception as e:
+            logger.error(f"Error signing up: {e}")
+            return {"error": str(e)}
+
+    async def sign_in(self, email: str, password: str) -> Dict[str, Any]:
+        """Sign in an existing user"""
+        try:
+            rows = await self._run(self._execute, "SELECT * FROM users WHERE email = ?", (email,))
+            if rows:
+                salt, digest = rows[0]["password_hash"].split("$", 1)
+                if secrets.compare_digest(digest, self._hash_password(password, salt)):
+                    user = {"id": rows[0]["id"], "email": email, "created_at": rows[0]["created_at"]}
+                    return {"user": user, "session": {"access_token": secrets.token_urlsafe(32), "user": user}}
+            return {"error": "Invalid login credentials"}
+        except Exception as e:
+            logger.error(f"Error signing in: {e}")
+            return {"error": str(e)}
+
+    # ==================== Projects ====================
+
+    async def get_projects(self, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get projects, optionally filtered by user. Includes legacy projects (user_id is NULL)."""
+        try:
+            if user_id:
+                return await self._run(
+                    self._execute,
+                    "SELECT * FROM projects WHERE user_id = ? OR user_id IS NULL ORDER BY created_at DESC",
+                    (user_id,)
+                )
+            return await self._run(self._execute, "SELECT * FROM projects ORDER BY created_at DESC")
+        except Exception as e:
+            logger.error(f"Error getting projects: {e}")
+            return []
+
+    async def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """Get a specific project by ID (read-through cached)"""
+        cache = get_project_cache()
+        cached = cache.get(project_id)
+        if cached is not None:
+            return cached
+        version = cache.version(project_id)
+        try:
+            project = await self._run(self._get_row, "projects", project_id)
+            cache.set(project_id, project, version)
+            return project
+        except Exception as e:
+            logger.error(f"Error getting project {project_id}: {e}")
+            return None
+
+    async def create_project(
+        self,
+        name: str,
+        domain: str,
+        company_profile: Optional[Dict[str, Any]] = None,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Create a new project"""
+        data = {
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "domain": domain,
+            "status": "PROFILE_ENTRY",
+            "company_profile": company_profile,
+            "created_at": self._now()
+        }
+        if user_id:
+            data["user_id"] = user_id
+        try:
+            return await self._run(self._insert, "projects", data)
+        except Exception as e:
+            logger.error(f"Error creating project: {e}")
+            return {**data, "mock": True}
+
+    async def update_project(
+        self,
+        project_id: str,
+        update_data: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Update a project"""
+        try:
+            update_data["updated_at"] = self._now()
+            project = await self._run(self._update, "projects", project_id, update_data)
+            get_project_cache().invalidate(project_id)
+            return project
+        except Exception as e:
+            logger.error(f"Error updating project {project_id}: {e}")
+            return None
+
+    async def delete_project(self, project_id: str) -> bool:
+        """Delete a project"""
+        try:
+            await self._run(self._execute, "DELETE FROM projects WHERE id = ?", (project_id,))
+            get_project_cache().invalidate(project_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting project {project_id}: {e}")
+            return False
+
+    # ==================== Crawl Results ====================
+
+    async def get_crawl_results(
+        self,
+        project_id: str,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Get crawl results for a project"""
+        try:
+            return await self._run(self._select_project_rows, "crawl_results", project_id, fields, cursor, limit)
+        except Exception as e:
+            logger.error(f"Error getting crawl results: {e}")
+            return []
+
+    async def get_crawl_result(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single crawl result with its full content"""
+        try:
+            return await self._run(self._get_row, "crawl_results", result_id)
+        except Exception as e:
+            logger.error(f"Error getting crawl result {result_id}: {e}")
+            return None
+
+    async def save_crawl_result(
+        self,
+        project_id: str,
+        data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Save a crawl result"""
+        try:
+            insert_data = {
+                "id": str(uuid.uuid4()),
+                "project_id": project_id,
+                "url": data.get("url"),
+                "content": data.get("content"),
+                "metadata": data.get("metadata"),
+                "created_at": self._now()
+            }
+            return await self._run(self._insert, "crawl_results", insert_data)
+        except Exception as e:
+            logger.error(f"Error saving crawl result: {e}")
+            return {"error": str(e)}
+
+    # ==================== Crawl Chunks (Retrieval Index) ====================
+
+    async def save_crawl_chunks(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Save a batch of retrieval chunks for crawl results"""
+        if not chunks:
+            return []
+        try:
+            timestamp = self._now()
+            insert_data = [
+                {
+                    "id": str(uuid.uuid4()),
+                    "project_id": c.get("project_id"),
+                    "crawl_result_id": c.get("crawl_result_id"),
+                    "url": c.get("url"),
+                    "chunk_index": c.get("chunk_index", 0),
+                    "content": c.get("content"),
+                    "created_at": timestamp
+                }
+                for c in chunks
+            ]
+            # Two workers backfilling the same page write each chunk once
+            await self._run(
+                self._insert_many, "crawl_chunks", insert_data, "crawl_result_id,chunk_index", True
+            )
+            return insert_data
+        except Exception as e:
+            logger.error(f"Error saving crawl chunks: {e}")
+            return []
+
+    async def get_crawl_chunks(self, project_id: str) -> List[Dict[str, Any]]:
+        """Get all retrieval chunks for a project"""
+        try:
+            return await self._run(
+                self._execute,
+                "SELECT id, crawl_result_id, url, chunk_index, content FROM crawl_chunks "
+                "WHERE project_id = ? ORDER BY created_at",
+                (project_id,)
+            )
+        except Exception as e:
+            logger.error(f"Error getting crawl chunks: {e}")
+            return []
+
+    # ==================== Tasks ====================
+
+    async def get_tasks(
+        self,
+        project_id: str,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Get tasks for a project (all of them unless limit is given)"""
+        try:
+            return await self._run(self._select_project_rows, "tasks", project_id, fields, cursor, limit)
+        except Exception as e:
+            logger.error(f"Error getting tasks: {e}")
+            return []
+
+    async def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single task with its full content"""
+        try:
+            return await self._run(self._get_row, "tasks", task_id)
+        except Exception as e:
+            logger.error(f"Error getting task {task_id}: {e}")
+            return None
+
+    async def create_task(
+        self,
+        project_id: str,
+        task_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Create a new task"""
+        task_id = task_data.get("id") or str(uuid.uuid4())
+        try:
+            insert_data = {
+                "project_id": project_id,
+                **task_data,
+                "id": task_id,
+                "created_at": self._now()
+            }
+            return await self._run(self._insert, "tasks", insert_data)
+        except Exception as e:
+            logger.error(f"Error creating task: {e}")
+            return {"error": str(e)}
+
+    async def update_task(
+        self,
+        task_id: str,
+        update_data: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Update a task"""
+        try:
+            update_data["updated_at"] = self._now()
+            return await self._run(self._update, "tasks", task_id, update_data)
+        except Exception as e:
+            logger.error(f"Error updating task: {e}")
+            return None
+
+    async def create_tasks(
+        self,
+        project_id: str,
+        tasks: List[Dict[str, Any]],
+        chunk_size: int = TASK_INSERT_CHUNK
+    ) -> Dict[str, Any]:
+        """Create many tasks (same contract as SupabaseService.create_tasks)"""
+        rows, ids, errors = prepare_task_rows(project_id, tasks)
+        created: Dict[int, Dict[str, Any]] = {}
+
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                await self._run(self._insert_many, "tasks", [row for _, row in chunk])
+                for index, row in chunk:
+                    created[index] = row
+            except Exception as e:
+                logger.warning(f"Error creating task chunk ({len(chunk)} rows), retrying per row: {e}")
+                for index, row in chunk:
+                    try:
+                        created[index] = await self._run(self._insert, "tasks", row)
+                    except Exception as row_error:
+                        errors.append({"index": index, "error": str(row_error)})
+                        ids[index] = None
+
+        errors.sort(key=lambda e: e["index"])
+        return {"data": [created[i] for i in sorted(created)], "ids": ids, "errors": errors}
+
+    async def update_tasks(self, updates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply per-task updates (same contract as SupabaseService.update_tasks)"""
+        groups, errors = group_task_updates(updates)
+        updated: List[Dict[str, Any]] = []
+        missing: List[str] = []
+        timestamp = self._now()
+
+        for payload, task_ids in groups.values():
+            try:
+                rows = await self._run(self._update_many, "tasks", task_ids, {**payload, "updated_at": timestamp})
+                found = {r["id"] for r in rows}
+                updated.extend(rows)
+                missing.extend(i for i in task_ids if i not in found)
+            except Exception as e:
+                logger.error(f"Error updating {len(task_ids)} tasks: {e}")
+                errors.append({"ids": task_ids, "error": str(e)})
+
+        return {"data": updated, "missing": missing, "errors": errors}
+
+    # ==================== Raw Writes ====================
+
+    async def write_rows(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        on_conflict: str = "id",
+        ignore_duplicates: bool = False
+    ) -> bool:
+        """
+        Idempotent bulk upsert used by the write-behind queue. With
+        ignore_duplicates existing rows are left untouched (insert-only).
+        """
+        if not rows:
+            return True
+        try:
+            rows = [row if row.get("id") else {"id": str(uuid.uuid4()), **row} for row in rows]
+            await self._run(self._insert_many, table, rows, on_conflict, ignore_duplicates)
+            return True
+        except Exception as e:
+            logger.error(f"Error writing {len(rows)} rows to {table}: {e}")
+            return False
+
+    # ==================== Analysis Reports ====================
+
+    async def save_analysis_report(
+        self,
+        project_id: str,
+        report_type: str,
+        data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Save an analysis report (gap analysis, deep audit, etc)"""
+        try:
+            insert_data = build_analysis_report_row(project_id, report_type, data)
+            return await self._run(self._insert, "analysis_reports", insert_data)
+        except Exception as e:
+            logger.error(f"Error saving analysis report: {e}")
+            return {"error": str(e)}
+
+    async def get_analysis_reports(
+        self,
+        project_id: str,
+        limit: int = 10,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get analysis reports for a project"""
+        try:
+            return await self._run(self._select_project_rows, "analysis_reports", project_id, fields, cursor, limit)
+        except Exception as e:
+            logger.error(f"Error getting analysis reports: {e}")
+            return []
+
+    async def get_analysis_report(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single analysis report with its full data"""
+        try:
+            return await self._run(self._get_row, "analysis_reports", report_id)
+        except Exception as e:
+            logger.error(f"Error getting analysis report {report_id}: {e}")
+            return None
+
+    # ==================== Keywords ====================
+
+    async def save_keywords(
+        self,
+        project_id: str,
+        keywords: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Save a batch of keywords (upsert on project_id + keyword)"""
+        if not keywords:
+            return []
+        try:
+            rows = [{"id": str(uuid.uuid4()), **row} for row in build_keyword_rows(project_id, keywords)]
+            if not rows:
+                return []
+            await self._run(self._insert_many, "generated_keywords", rows, "project_id,keyword")
+            # Conflicting rows keep their original id, so return what is stored
+            placeholders = ", ".join("?" for _ in rows)
+            return await self._run(
+                self._execute,
+                f"SELECT * FROM generated_keywords WHERE project_id = ? AND keyword IN ({placeholders})",
+                (project_id, *(row["keyword"] for row in rows))
+            )
+        except Exception as e:
+            logger.error(f"Error saving keywords: {e}")
+            return []
+
+    async def get_keywords(
+        self,
+        project_id: str,
+        limit: int = 500,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get saved keywords for a project"""
+        try:
+            return await self._run(self._select_project_rows, "generated_keywords", project_id, fields, cursor, limit)
+        except Exception as e:
+            logger.error(f"Error getting keywords: {e}")
+            return []
+
+    # ==================== Content Posts ====================
+
+    async def save_content_post(
+        self,
+        project_id: str,
+        post_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Save a generated content post"""
+        try:
+            insert_data = build_content_post_row(project_id, post_data)
+            return await self._run(self._insert, "content_posts", insert_data)
+        except Exception as e:
+            logger.error(f"Error saving content post: {e}")
+            return {"error": str(e)}
+
+    async def get_content_posts(
+        self,
+        project_id: str,
+        limit: int = 50,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get content posts for a project"""
+        try:
+            return await self._run(self._select_project_rows, "content_posts", project_id, fields, cursor, limit)
+        except Exception as e:
+            logger.error(f"Error getting content posts: {e}")
+            return []
+
+    async def get_content_post(self, post_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single content post with its full content"""
+        try:
+            return await self._run(self._get_row, "content_posts", post_id)
+        except Exception as e:
+            logger.error(f"Error getting content post {post_id}: {e}")
+            return None
+
+    async def get_content_posts_by_ids(self, post_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get several content posts (full rows) in one query"""
+        if not post_ids:
+            return []
+        try:
+            placeholders = ", ".join("?" for _ in post_ids)
+            return await self._run(
+                self._execute, f"SELECT * FROM content_posts WHERE id IN ({placeholders})", tuple(post_ids)
+            )
+        except Exception as e:
+            logger.error(f"Error getting content posts by id: {e}")
+            return []
+
+    async def update_content_post(
+        self,
+        post_id: str,
+        update_data: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Update a content post"""
+        try:
+            update_data["updated_at"] = self._now()
+            return await self._run(self._update, "content_posts", post_id, update_data)
+        except Exception as e:
+            logger.error(f"Error updating content post {post_id}: {e}")
+            return None
+
+    # ==================== WordPress Media ====================
+
+    async def get_wordpress_media(self, site: str, image_hash: str) -> Optional[int]:
+        """Media id of an image already uploaded to a WordPress site"""
+        try:
+            rows = await self._run(
+                self._execute,
+                "SELECT media_id FROM wordpress_media WHERE site = ? AND image_hash = ? LIMIT 1",
+                (site, image_hash)
+            )
+            return rows[0]["media_id"] if rows else None
+        except Exception as e:
+            logger.error(f"Error getting WordPress media: {e}")
+            return None
+
+    async def save_wordpress_media(self, site: str, image_hash: str, media_id: int, source_url: str) -> None:
+        """Remember the media id an image got on a WordPress site"""
+        try:
+            row = {"site": site, "image_hash": image_hash, "media_id": media_id,
+                   "source_url": source_url, "created_at": self._now()}
+            await self._run(self._insert_many, "wordpress_media", [row], "site,image_hash")
+        except Exception as e:
+            logger.error(f"Error saving WordPress media: {e}")
+
+    # ==================== Scheduled Posts ====================
+
+    async def save_scheduled_posts(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert schedule entries (rows from build_scheduled_post_row)"""
+        if not rows:
+            return []
+        try:
+            await self._run(self._insert_many, "scheduled_posts", rows)
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error saving scheduled posts: {e}")
+            return []
+
+    async def get_scheduled_posts(
+        self,
+        project_id: str,
+        limit: int = 100,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Schedule entries of a project, newest first"""
+        try:
+            return await self._run(self._select_project_rows, "scheduled_posts", project_id, fields, cursor, limit)
+        except Exception as e:
+            logger.error(f"Error getting scheduled posts: {e}")
+            return []
+
+    async def get_pending_schedule(self) -> List[Dict[str, Any]]:
+        """id and publish_at of every pending entry (for the scheduler's timer heap)"""
+        try:
+            return await self._run(
+                self._execute, "SELECT id, publish_at FROM scheduled_posts WHERE status = 'pending'"
+            )
+        except Exception as e:
+            logger.error(f"Error loading pending schedule: {e}")
+            return []
+
+    async def transition_scheduled_posts(
+        self,
+        schedule_ids: List[str],
+        from_status: str,
+        update_data: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Update entries still in from_status and return the ones changed.
+        Concurrent callers cannot both move the same entry (used to claim).
+        """
+        if not schedule_ids:
+            return []
+        try:
+            update_data["updated_at"] = self._now()
+            self._check_columns("scheduled_posts", update_data.keys())
+            assignments = ", ".join(f"{k} = ?" for k in update_data)
+            placeholders = ", ".join("?" for _ in schedule_ids)
+            params = tuple(self._encode(k, v) for k, v in update_data.items()) + tuple(schedule_ids) + (from_status,)
+            return await self._run(
+                self._execute,
+                f"UPDATE scheduled_posts SET {assignments} WHERE id IN ({placeholders}) AND status = ? RETURNING *",
+                params
+            )
+        except Exception as e:
+            logger.error(f"Error updating scheduled posts: {e}")
+            return []
+
+    async def release_stale_scheduled_posts(self, claimed_before: str) -> int:
+        """Return entries claimed before the cutoff (their worker died) to pending"""
+        try:
+            rows = await self._run(
+                self._execute,
+                "UPDATE scheduled_posts SET status = 'pending', updated_at = ? "
+                "WHERE status = 'claimed' AND claimed_at < ? RETURNING id",
+                (self._now(), claimed_before)
+            )
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Error releasing stale scheduled posts: {e}")
+            return 0
@@ -0,0 +1,206 @@
+"""
+Media Service - Stores generated images and their web-sized variants
+
+For each image (keyed by content hash) three files are stored:
+- <key>.png         the original (1024x1024 from DALL-E)
+- <key>.webp        WebP at full size, a fraction of the PNG's weight
+- <key>-thumb.webp  WebP thumbnail for lists and cards
+
+Decoding and encoding are CPU-bound, so variants are derived in a process
+pool and the event loop stays free. Storage is either a local directory
+(MEDIA_STORAGE=local, served by the production router) or a Supabase
+Storage bucket (MEDIA_STORAGE=supabase) with public URLs.
+Image URLs are saved with posts and published to other sites, so local
+storage needs PUBLIC_BASE_URL to build absolute URLs; only the local SQLite
+development setup may use same-origin URLs.
+Pillow is optional: without it only the original is stored.
+"""
+
+import asyncio
+import io
+import multiprocessing
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Tuple
+
+from api.config import get_settings
+from api.logging_config import get_logger
+from api.metrics import track_upstream
+from api.tracing import trace_service
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = get_logger(__name__)
+
+# variant -> (file suffix, content type)
+VARIANTS: Dict[str, Tuple[str, str]] = {
+    "original": (".png", "image/png"),
+    "webp": (".webp", "image/webp"),
+    "thumbnail": ("-thumb.webp", "image/webp"),
+}
+
+MEDIA_NAME_RE = re.compile(r"^[0-9a-f]{32}(?:\.png|\.webp|-thumb\.webp)$")
+
+
+def derive_variants(data: bytes, thumbnail_size: int, quality: int) -> Dict[str, bytes]:
+    """WebP and thumbnail encodings of an image (runs in a worker process)"""
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        webp = io.BytesIO()
+        image.save(webp, "WEBP", quality=quality, method=4)
+
+        image.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
+        thumb = io.BytesIO()
+        image.save(thumb, "WEBP", quality=quality, method=4)
+    return {"webp": webp.getvalue(), "thumbnail": thumb.getvalue()}
+
+
+def media_content_type(name: str) -> str:
+    return "image/png" if name.endswith(".png") else "image/webp"
+
+
+@trace_service
+class MediaService:
+    """Stores images and their variants; returns stable public URLs"""
+
+    def __init__(self):
+        settings = get_settings()
+        self.public_base_url = settings.public_base_url.rstrip("/")
+        self.local_dev = settings.db_backend.lower() == "sqlite"
+        self.storage = settings.media_storage.lower() or (
+            "local" if self.public_base_url or self.local_dev else "supabase"
+        )
+        self.media_dir = settings.image_dir
+        self.bucket = settings.media_bucket
+        self.workers = max(1, settings.media_workers)
+        self.thumbnail_size = settings.media_thumbnail_size
+        self.quality = settings.media_webp_quality
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._bucket_api = None
+
+        if Image is None:
+            logger.warning("Pillow is not installed; images are stored without WebP/thumbnail variants")
+
+    # ==================== Public API ====================
+
+    async def store_image(self, key: str, data: bytes) -> Dict[str, str]:
+        """Store an original PNG and its derived variants; returns variant -> URL"""
+        stored = {"original": data}
+        if Image is not None:
+            try:
+                loop = asyncio.get_running_loop()
+                stored.update(await loop.run_in_executor(
+                    self._get_pool(), derive_variants, data, self.thumbnail_size, self.quality
+                ))
+            except Exception as e:
+                # Serve the original rather than fail the post
+                logger.warning(f"[Media] Could not derive variants for {key}: {e}")
+
+        # Variants first: the original's presence marks the set as complete
+        for variant in sorted(stored, key=lambda v: v == "original"):
+            await self._put(self.media_name(key, variant), stored[variant])
+        return {variant: self.media_url(key, variant) for variant in stored}
+
+    async def lookup(self, key: str) -> Optional[Dict[str, str]]:
+        """URLs of an already stored image, or None"""
+        if not await self._exists(self.media_name(key, "original")):
+            return None
+        urls = {"original": self.media_url(key, "original")}
+        if Image is not None:
+            for variant in ("webp", "thumbnail"):
+                if await self._exists(self.media_name(key, variant)):
+                    urls[variant] = self.media_url(key, variant)
+        return urls
+
+    def media_name(self, key: str, variant: str) -> str:
+        return f"{key}{VARIANTS[variant][0]}"
+
+    def media_url(self, key: str, variant: str) -> str:
+        name = self.media_name(key, variant)
+        if self.storage == "supabase":
+            return self._bucket().get_public_url(name)
+        return f"{self.public_base_url}/api/production/images/{name}"
+
+    def local_path(self, name: str) -> str:
+        return os.path.join(self.media_dir, name)
+
+    def check_config(self) -> None:
+        """Fail at startup on a storage setup that would save unusable URLs"""
+        if self.storage not in ("local", "supabase"):
+            raise ValueError(f"Unknown MEDIA_STORAGE: {self.storage}")
+        if self.storage == "local" and not self.public_base_url and not self.local_dev:
+            raise ValueError(
+                "MEDIA_STORAGE=local needs PUBLIC_BASE_URL: image URLs are saved and "
+                "published, so they must be absolute (or use MEDIA_STORAGE=supabase)"
+            )
+        logger.info(f"[Media] Storing images in {self.storage} storage")
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # ==================== Storage ====================
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs the event loop, threads and
+            # open connections copies their state into the workers
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def _bucket(self):
+        if self._bucket_api is None:
+            from api.services.supabase_service import get_supabase_service
+            self._bucket_api = get_supabase_service().client.storage.from_(self.bucket)
+        return self._bucket_api
+
+    async def _exists(self, name: str) -> bool:
+        if self.storage == "supabase":
+            with track_upstream("supabase", "storage.exists"):
+                return await asyncio.to_thread(self._bucket().exists, name)
+        return os.path.exists(self.local_path(name))
+
+    async def _put(self, name: str, data: bytes) -> None:
+        if self.storage == "supabase":
+            options = {
+                "content-type": media_content_type(name),
+                "cache-control": "31536000",
+                "upsert": "true",
+            }
+            with track_upstream("supabase", "storage.upload"):
+                await asyncio.to_thread(self._bucket().upload, name, data, options)
+            return
+        await asyncio.to_thread(self._write_local, name, data)
+
+    def _write_local(self, name: str, data: bytes) -> None:
+        """Atomic write, so a concurrent reader never sees a partial file"""
+        os.makedirs(self.media_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.media_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # mkstemp creates 0600; media is public
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.local_path(name))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+# Singleton instance
+_media_service: Optional[MediaService] = None
+
+def get_media_service() -> MediaService:
+    """Get or create media service instance"""
+    global _media_service
+    if _media_service is None:
+        _media_service = MediaService()
+    return _media_service
@@ -0,0 +1,226 @@
+"""
+Normalizer Service - Strips boilerplate from scraped markdown before LLM calls
+
+Firecrawl markdown carries navigation, footers, link lists and image tags that
+eat most of the prompt budget. This service:
+1. Removes image tags, link targets, HTML remnants and bare URLs
+2. Drops link-list lines (menus, breadcrumbs, footer columns)
+3. Learns repeated site chrome per domain and strips it from every page
+4. Collapses whitespace and duplicate lines
+
+Chrome is counted per distinct URL: scraping the same page again does not
+make its own lines look repeated, and a page is never stripped to nothing.
+"""
+
+import re
+import hashlib
+from collections import Counter, OrderedDict
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlparse
+
+
+# Markup patterns (compiled once, applied per line)
+_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_LINK_RE = re.compile(r"\[([^\]]*)\]\((?:[^()]|\([^)]*\))*\)")
+_REF_LINK_RE = re.compile(r"^\s*\[[^\]]+\]:\s*\S+.*$")
+_HTML_TAG_RE = re.compile(r"<[^>]{1,200}>")
+_BARE_URL_RE = re.compile(r"https?://\S+")
+_LIST_MARKER_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+_RULE_RE = re.compile(r"^\s*(?:[-*_=]\s*){3,}$")
+_SPACES_RE = re.compile(r"[ \t\u00a0\u3000]+")
+_FINGERPRINT_STRIP_RE = re.compile(r"[\W\d_]+", re.UNICODE)
+# Separator / decoration only: empty bullets, bare heading or quote marks
+_DECORATION_RE = re.compile(r"^[-=*_|#>+~•·\s]*$")
+
+
+class NormalizerService:
+    """Fast, dependency-free markdown cleaner with per-domain chrome detection"""
+
+    def __init__(
+        self,
+        min_pages: int = 3,
+        chrome_ratio: float = 0.6,
+        max_domains: int = 256,
+        max_lines_per_domain: int = 5000,
+        max_pages_per_domain: int = 2000
+    ):
+        # A line is chrome once it has appeared on `chrome_ratio` of at least
+        # `min_pages` distinct pages (URLs) from the same domain
+        self.min_pages = min_pages
+        self.chrome_ratio = chrome_ratio
+        self.max_domains = max_domains
+        self.max_lines_per_domain = max_lines_per_domain
+        self.max_pages_per_domain = max_pages_per_domain
+        # domain -> digests of the URLs learned from
+        self._domain_pages: "OrderedDict[str, set]" = OrderedDict()
+        self._domain_lines: Dict[str, Counter] = {}
+
+    # ==================== Public API ====================
+
+    def normalize(self, markdown: Optional[str], url: Optional[str] = None) -> str:
+        """
+        Clean a single scraped page.
+        The page is also recorded for chrome detection on its domain.
+        """
+        if not markdown:
+            return ""
+        lines = self._clean_lines(markdown)
+        domain = self._domain(url)
+        if domain:
+            self._learn(domain, url, lines)
+            lines = self._strip_chrome(domain, lines)
+        return self._join(lines)
+
+    def normalize_pages(self, pages: List[Dict[str, Any]]) -> List[str]:
+        """
+        Clean a batch of pages ({"url", "content"}) from one crawl.
+        All pages are learned before any is stripped, so chrome is detected
+        even on the first page of the batch.
+        """
+        cleaned = []
+        for page in pages:
+            lines = self._clean_lines(page.get("content") or "")
+            domain = self._domain(page.get("url"))
+            if domain:
+                self._learn(domain, page["url"], lines)
+            cleaned.append((domain, lines))
+
+        return [
+            self._join(self._strip_chrome(domain, lines) if domain else lines)
+            for domain, lines in cleaned
+        ]
+
+    # ==================== Markup Cleaning ====================
+
+    def _clean_lines(self, markdown: str) -> List[str]:
+        result: List[str] = []
+        previous = None
+        for raw in markdown.splitlines():
+            if _REF_LINK_RE.match(raw):
+                continue
+
+            line = _IMAGE_RE.sub("", raw)
+            if self._is_link_list(line):
+                continue
+
+            line = _LINK_RE.sub(lambda m: m.group(1), line)
+            line = _HTML_TAG_RE.sub("", line)
+            line = _BARE_URL_RE.sub("", line)
+            line = _SPACES_RE.sub(" ", line).strip()
+
+            # Drop rules, empty list bullets and other decoration-only lines;
+            # numbers and prices ("2024", "$49/mo", "99.9%") are content
+            # (table rows and code fences are structural, keep them)
+            if not line.startswith(("|", "```")) and (_RULE_RE.match(line) or _DECORATION_RE.match(line)):
+                line = ""
+
+            # Collapse runs of blank lines and consecutive duplicates
+            if line == previous:
+                continue
+            if not line and (not result or not result[-1]):
+                previous = line
+                continue
+            result.append(line)
+            previous = line
+
+        while result and not result[-1]:
+            result.pop()
+        return result
+
+    def _is_link_list(self, line: str) -> bool:
+        """True for lines that are mostly link text (menus, breadcrumbs, footers)"""
+        links = _LINK_RE.findall(line)
+        if not links:
+            return False
+        if len(links) >= 3:
+            return True
+
+        remainder = _LINK_RE.sub("", line)
+        remainder = _LIST_MARKER_RE.sub("", remainder)
+        remainder = _FINGERPRINT_STRIP_RE.sub("", remainder)
+        link_text = sum(len(t) for t in links)
+        # A bullet that is just a short link is navigation, not content
+        return len(remainder) == 0 and link_text < 60
+
+    # ==================== Chrome Detection ====================
+
+    def _learn(self, domain: str, url: str, lines: List[str]) -> None:
+        if domain in self._domain_pages:
+            self._domain_pages.move_to_end(domain)
+        else:
+            if len(self._domain_pages) >= self.max_domains:
+                evicted, _ = self._domain_pages.popitem(last=False)
+                self._domain_lines.pop(evicted, None)
+            self._domain_pages[domain] = set()
+            self._domain_lines[domain] = Counter()
+
+        # Each URL's lines are counted once, however often it is scraped
+        pages = self._domain_pages[domain]
+        page = self._page_key(url)
+        if page in pages or len(pages) >= self.max_pages_per_domain:
+            return
+        pages.add(page)
+        counter = self._domain_lines[domain]
+        for fp in {self._fingerprint(line) for line in lines if line}:
+            if not fp:
+                continue
+            if fp in counter or len(counter) < self.max_lines_per_domain:
+                counter[fp] += 1
+
+    def _strip_chrome(self, domain: str, lines: List[str]) -> List[str]:
+        pages = len(self._domain_pages.get(domain, ()))
+        if pages < self.min_pages:
+            return lines
+
+        counter = self._domain_lines[domain]
+        threshold = max(2, pages * self.chrome_ratio)
+        kept = [
+            line for line in lines
+            if not line or counter.get(self._fingerprint(line), 0) < threshold
+        ]
+        # Re-collapse blank lines left behind by removed chrome
+        result: List[str] = []
+        for line in kept:
+            if not line and (not result or not result[-1]):
+                continue
+            result.append(line)
+        while result and not result[-1]:
+            result.pop()
+        # A page made only of lines seen elsewhere is still content
+        return result or lines
+
+    def _fingerprint(self, line: str) -> str:
+        # Ignore case, digits and punctuation so "© 2024" and "© 2025" match
+        key = _FINGERPRINT_STRIP_RE.sub("", line.lower())
+        if not key:
+            return ""
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+    # ==================== Helpers ====================
+
+    def _domain(self, url: Optional[str]) -> str:
+        if not url:
+            return ""
+        try:
+            return urlparse(url if "://" in url else f"https://{url}").netloc.lower().replace("www.", "")
+        except Exception:
+            return ""
+
+    def _page_key(self, url: str) -> bytes:
+        """Digest of a URL with its fragment and trailing slash dropped"""
+        page = url.split("#", 1)[0].rstrip("/").lower()
+        return hashlib.blake2b(page.encode("utf-8"), digest_size=8).digest()
+
+    def _join(self, lines: List[str]) -> str:
+        return "\n".join(lines).strip()
+
+
+# Singleton instance
+_normalizer_service: Optional[NormalizerService] = None
+
+def get_normalizer_service() -> NormalizerService:
+    """Get or create Normalizer service instance"""
+    global _normalizer_service
+    if _normalizer_service is None:
+        _normalizer_service = NormalizerService()
+    return _normalizer_service
@@ -5,14 +5,40 @@ This service uses Perplexity's Sonar API to:
 1. Test which sources are actually cited by AI
 2. Extract citation URLs for learning targets
 3. Analyze competitor content quality
+
+Social trends and deep research are reusable for hours, so they are cached
+per normalized topic (PERPLEXITY_TRENDS_TTL / PERPLEXITY_RESEARCH_TTL).
+Past its TTL a result is still served for PERPLEXITY_STALE_TTL while one
+background call refreshes it; concurrent misses share one call, and only
+successful results are cached.
 """
 
+import asyncio
+import re
+import time
+import unicodedata
 import httpx
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
 import json
 from api.config import get_settings
+from api.logging_config import get_logger
+from api.metrics import tracked_transport
+from api.tracing import trace_service, record_llm_usage, set_span_attributes
+from api.services.cache_service import get_cache_service
+
+logger = get_logger(__name__)
+
+_TOPIC_SPACE_RE = re.compile(r"\s+")
+_TOPIC_EDGE_CHARS = " \t\n\"'`.,;:!?()[]{}“”‘’「」。，！？"
 
 
+def normalize_topic(topic: str) -> str:
+    """Cache key for a research topic: width/case-folded, whitespace collapsed"""
+    text = unicodedata.normalize("NFKC", topic or "").casefold()
+    return _TOPIC_SPACE_RE.sub(" ", text).strip(_TOPIC_EDGE_CHARS)
+
+
+@trace_service
 class PerplexityService:
     """Service for Perplexity AI citation testing"""
     
@@ -23,9 +49,80 @@ class PerplexityService:
         self.model = "sonar"  # Sonar model returns citations
         
         if self.api_key:
-            print(f"Perplexity Service initialized with Key: {self.api_key[:8]}...")
+            logger.info(f"Perplexity Service initialized with Key: {self.api_key[:8]}...")
         else:
-            print("Perplexity Service initialized WITHOUT API Key")
+            logger.warning("Perplexity Service initialized WITHOUT API Key")
+
+        # method -> fresh TTL; entries live in the cache for TTL + stale window
+        self._fresh_ttls = {
+            "social_trends": settings.perplexity_trends_ttl,
+            "deep_research": settings.perplexity_research_ttl,
+        }
+        self._stale_ttl = max(0.0, settings.perplexity_stale_ttl)
+        self._research_caches = {
+            method: get_cache_service().get_cache(
+                f"perplexity_{method}", ttl + self._stale_ttl if ttl > 0 else 0, max_size=512
+            )
+            for method, ttl in self._fresh_ttls.items()
+        }
+        self._refreshing: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.cache_stats = {"fresh": 0, "stale": 0, "miss": 0, "joined": 0}
+
+    # ==================== Research cache ====================
+
+    async def _cached(
+        self,
+        method: str,
+        topic: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Serve a cached result (refreshing it in the background once stale) or fetch it"""
+        cache = self._research_caches[method]
+        if not cache.enabled:
+            return await fetch()
+
+        key = normalize_topic(topic)
+        entry = cache.get(key)
+        if entry is not None:
+            if time.time() - entry["fetched_at"] < self._fresh_ttls[method]:
+                state = "fresh"
+            else:
+                state = "stale"
+                self._refresh(method, key, fetch)
+            self.cache_stats[state] += 1
+            set_span_attributes(**{"research.cache": state})
+            return entry["result"]
+
+        joined = (method, key) in self._refreshing
+        self.cache_stats["joined" if joined else "miss"] += 1
+        set_span_attributes(**{"research.cache": "joined" if joined else "miss"})
+        # Shielded: a cancelled caller must not cancel a fetch others await
+        return await asyncio.shield(self._refresh(method, key, fetch))
+
+    def _refresh(
+        self,
+        method: str,
+        key: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> asyncio.Task:
+        """The in-flight fetch for a topic, starting one if there is none"""
+        task = self._refreshing.get((method, key))
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_store(method, key, fetch))
+            self._refreshing[(method, key)] = task
+            task.add_done_callback(lambda _: self._refreshing.pop((method, key), None))
+        return task
+
+    async def _fetch_and_store(
+        self,
+        method: str,
+        key: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        result = await fetch()
+        if result.get("success"):
+            self._research_caches[method].set(key, {"fetched_at": time.time(), "result": result})
+        return result
     
     async def search_brand_info(self, brand_name: str, domain: str = "") -> Dict[str, Any]:
         """
@@ -77,8 +174,8 @@ class PerplexityService:
         }
         
         try:
-            print(f"[Perplexity Fallback] Searching brand info: {brand_name}")
-            async with httpx.AsyncClient(timeout=60.0, verify=False) as client:
+            logger.info(f"[Perplexity Fallback] Searching brand info: {brand_name}")
+            async with httpx.AsyncClient(timeout=60.0, transport=tracked_transport("perplexity", verify=False)) as client:
                 response = await client.post(
                     f"{self.base_url}/chat/completions",
                     headers=headers,
@@ -86,7 +183,7 @@ class PerplexityService:
                 )
                 
                 if response.status_code != 200:
-                    print(f"[Perplexity Fallback] API error: {response.status_code}")
+                    logger.warning(f"[Perplexity Fallback] API error: {response.status_code}")
                     return {
                         "success": False,
                         "error": f"Perplexity API error: {response.status_code} - {response.text}",
@@ -96,6 +193,8 @@ class PerplexityService:
                 
                 data = response.json()
                 
+                record_llm_usage(data)
+                
                 # Extract the answer
                 answer = data.get("choices", [{}])[0].get("message", {}).get("content", "")
                 
@@ -104,7 +203,7 @@ class PerplexityService:
                 if citations and isinstance(citations[0], str):
                     citations = [{"url": url, "title": ""} for url in citations]
                 
-                print(f"[Perplexity Fallback] Got {len(answer)} chars, {len(citations)} citations")
+                logger.info(f"[Perplexity Fallback] Got {len(answer)} chars, {len(citations)} citations")
                 
                 return {
                     "success": True,
@@ -115,10 +214,8 @@ class PerplexityService:
                 }
                 
         except Exception as e:
-            import traceback
-            traceback.print_exc()
             error_msg = str(e) or f"{type(e).__name__}: {repr(e)}"
-            print(f"[Perplexity Fallback] Error: {error_msg}")
+            logger.warning(f"[Perplexity Fallback] Error: {error_msg}", exc_info=True)
             return {
                 "success": False,
                 "error": error_msg,
@@ -130,11 +227,15 @@ class PerplexityService:
         """
         Search for real-time social media trends and viral hooks in a niche.
         Targeting platforms: Instagram, TikTok, LinkedIn, Twitter (X).
+        Cached per niche (see module docstring).
         """
+        return await self._cached("social_trends", niche, lambda: self._fetch_social_trends(niche))
+
+    async def _fetch_social_trends(self, niche: str) -> Dict[str, Any]:
         query = f"What are the trending topics, viral hooks, and hot discussions in the {niche} niche on social media (Instagram, TikTok, LinkedIn) this week? Give examples of viral post structures."
         
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with httpx.AsyncClient(timeout=60.0, transport=tracked_transport("perplexity")) as client:
                 response = await client.post(
                     f"{self.base_url}/chat/completions",
                     headers={
@@ -157,6 +258,8 @@ class PerplexityService:
                     return {"success": False, "error": f"API Error: {response.status_code}"}
                     
                 data = response.json()
+                    
+                record_llm_usage(data)
                 return {
                     "success": True,
                     "content": data["choices"][0]["message"]["content"],
@@ -183,7 +286,7 @@ class PerplexityService:
                 "sources": []
             }
             
-        print(f"[Perplexity] Calculating citation score for {brand_name} in {niche}...")
+        logger.info(f"[Perplexity] Calculating citation score for {brand_name} in {niche}...")
         
         # Query 1: Market Presence (Share of Voice)
         presence_query = f"Who are the top 10 most recommended {niche} brands/tools in 2025? List them."
@@ -195,7 +298,7 @@ class PerplexityService:
         
         try:
             # We use a shorter timeout for this check
-            async with httpx.AsyncClient(timeout=45.0) as client:
+            async with httpx.AsyncClient(timeout=45.0, transport=tracked_transport("perplexity")) as client:
                 headers = {
                     "Authorization": f"Bearer {self.api_key}",
                     "Content-Type": "application/json"
@@ -213,6 +316,7 @@ class PerplexityService:
                 
                 if response.status_code == 200:
                     data = response.json()
+                    record_llm_usage(data)
                     content = data["choices"][0]["message"]["content"]
                     sources = data.get("citations", [])
                     
@@ -244,6 +348,7 @@ class PerplexityService:
                         
                         if rep_response.status_code == 200:
                             rep_data = rep_response.json()
+                            record_llm_usage(rep_data)
                             rep_content = rep_data["choices"][0]["message"]["content"].lower()
                             
                             # Simple keyword sentiment analysis
@@ -275,7 +380,7 @@ class PerplexityService:
                 }
                 
         except Exception as e:
-            print(f"[Perplexity] Citation check failed: {e}")
+            logger.warning(f"[Perplexity] Citation check failed: {e}")
             return {
                 "score": 0,
                 "citation_rate": "Error",
@@ -287,11 +392,15 @@ class PerplexityService:
         """
         Conduct deep research on a topic to find authoritative data, 
         statistics, and expert quotes for high-quality articles.
+        Cached per topic (see module docstring).
         """
+        return await self._cached("deep_research", topic, lambda: self._fetch_deep_research(topic))
+
+    async def _fetch_deep_research(self, topic: str) -> Dict[str, Any]:
         query = f"Research detailed statistics, case studies, academic perspectives, and authority expert quotes regarding: '{topic}'. Focus on recent data (2024-2025)."
         
         try:
-            async with httpx.AsyncClient(timeout=90.0) as client:
+            async with httpx.AsyncClient(timeout=90.0, transport=tracked_transport("perplexity")) as client:
                 response = await client.post(
                     f"{self.base_url}/chat/completions",
                     headers={
@@ -314,6 +423,8 @@ class PerplexityService:
                     return {"success": False, "error": f"API Error: {response.status_code}"}
                     
                 data = response.json()
+                    
+                record_llm_usage(data)
                 return {
                     "success": True,
                     "content": data["choices"][0]["message"]["content"],
@@ -364,7 +475,7 @@ class PerplexityService:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with httpx.AsyncClient(timeout=60.0, transport=tracked_transport("perplexity")) as client:
                 response = await client.post(
                     f"{self.base_url}/chat/completions",
                     headers=headers,
@@ -380,6 +491,8 @@ class PerplexityService:
                 
                 data = response.json()
                 
+                record_llm_usage(data)
+                
                 # Extract the answer
                 answer = data.get("choices", [{}])[0].get("message", {}).get("content", "")
                 
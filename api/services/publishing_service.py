@@ -1,61 +1,176 @@
 """
 Publishing Service - Multi-mode publishing (WordPress, Social, Export)
+
+WordPress calls share one pooled HTTP client. Per site:
+- At most WORDPRESS_SITE_CONCURRENCY requests are in flight
+- 429/5xx responses and network errors are retried with exponential
+  backoff (honouring Retry-After), up to WORDPRESS_MAX_RETRIES times
+
+Bulk publishing is idempotent. Each content post gets a deterministic
+slug (its idempotency key). The slug is looked up before creating, and
+again before any retry of a create whose outcome is unknown, so a retry
+adopts the post a timed-out attempt already made. Concurrent publishes of
+the same slug to a site share one lookup and create. Results are recorded in
+content_posts.meta_data["wordpress"][<site>], and posts already recorded
+for a site are skipped.
+
+Featured images are streamed into the media endpoint (from local media
+storage or relayed from their URL) without being held in memory, and
+their media ids are cached per site and image hash (wordpress_media), so
+an image is uploaded to a site at most once. The uploaded filename carries
+the image hash, and a failed upload is looked up by it before retrying.
 """
 
+import asyncio
 import base64
+import hashlib
+import os
+import random
+import re
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Callable, Awaitable, AsyncIterator, Tuple
+from urllib.parse import urlparse
+
 import httpx
-from typing import Optional, Dict, Any, List
 
+from api.config import get_settings
+from api.logging_config import get_logger
+from api.metrics import tracked_transport
+from api.tracing import trace_service
+from api.services.media_service import get_media_service, MEDIA_NAME_RE, media_content_type
+from api.services.supabase_service import get_supabase_service
+
+logger = get_logger(__name__)
+
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 30.0
+UPLOAD_CHUNK_BYTES = 64 * 1024
+LOCAL_MEDIA_PREFIX = "/api/production/images/"
+
+_SLUG_STRIP_RE = re.compile(r"[^a-z0-9]+")
+
+
+class WordPressError(Exception):
+    """A failed WordPress REST call"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+
+def site_key(wp_url: str) -> str:
+    """Normalized site identity: host plus path, no scheme or trailing slash"""
+    parsed = urlparse(wp_url if "://" in wp_url else f"https://{wp_url}")
+    return f"{parsed.netloc.lower()}{parsed.path.rstrip('/')}"
+
+
+def post_slug(post: Dict[str, Any]) -> str:
+    """Deterministic slug for a content post; doubles as its idempotency key"""
+    title = _SLUG_STRIP_RE.sub("-", (post.get("title") or "").lower()).strip("-")[:60].rstrip("-")
+    suffix = str(post["id"]).replace("-", "")[:8]
+    return f"{title}-{suffix}" if title else f"post-{suffix}"
+
+
+def _auth_header(username: str, app_password: str) -> str:
+    token = base64.b64encode(f"{username}:{app_password}".encode()).decode()
+    return f"Basic {token}"
+
+
+def image_hash(image_url: str) -> str:
+    """
+    Identity of an image for the per-site media cache. Our own media names
+    are content hashes already; other images are identified by URL.
+    """
+    name = os.path.basename(urlparse(image_url).path)
+    if MEDIA_NAME_RE.match(name):
+        return name
+    return hashlib.sha256(image_url.encode("utf-8")).hexdigest()[:32]
+
+
+def media_filename(image_url: str, digest: str) -> Tuple[str, str]:
+    """
+    Upload filename for an image and the token (from its hash) it contains,
+    so an upload can be found again on the site
+    """
+    name = os.path.basename(urlparse(image_url).path) or "image"
+    token = re.sub(r"[^0-9a-z]", "", digest.lower())[:16]
+    if token in name.lower():
+        return name, token
+    stem, ext = os.path.splitext(name)
+    return f"{stem or 'image'}-{token}{ext}", token
+
+
+def local_media_path(image_url: str, public_base_url: str = "") -> Optional[str]:
+    """Disk path of an image served from local media storage, else None"""
+    parsed = urlparse(image_url)
+    name = os.path.basename(parsed.path)
+    own_origin = not parsed.netloc or (public_base_url and image_url.startswith(public_base_url))
+    if not (own_origin and parsed.path.startswith(LOCAL_MEDIA_PREFIX) and MEDIA_NAME_RE.match(name)):
+        return None
+    path = get_media_service().local_path(name)
+    return path if os.path.exists(path) else None
+
+
+async def _file_chunks(path: str) -> AsyncIterator[bytes]:
+    """Read a file in chunks off the event loop"""
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        while True:
+            chunk = await asyncio.to_thread(f.read, UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
+
+
+@trace_service
 class PublishingService:
     def __init__(self):
-        # In a real app, these should come from DB/User settings
-        # For MVP, we use env vars or passed credentials
-        pass
-
-    async def publish_to_wordpress(self, 
-                                   wp_url: str, 
-                                   username: str, 
-                                   app_password: str, 
-                                   title: str, 
-                                   content: str, 
+        settings = get_settings()
+        self.site_concurrency = max(1, settings.wordpress_site_concurrency)
+        self.max_retries = max(0, settings.wordpress_max_retries)
+        self.timeout = settings.wordpress_timeout
+        self.public_base_url = settings.public_base_url.rstrip("/")
+        self._client: Optional[httpx.AsyncClient] = None
+        self._fetch_client: Optional[httpx.AsyncClient] = None
+        self._media_inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._post_inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._site_limits: Dict[str, asyncio.Semaphore] = {}
+
+    # ==================== Single post ====================
+
+    async def publish_to_wordpress(self,
+                                   wp_url: str,
+                                   username: str,
+                                   app_password: str,
+                                   title: str,
+                                   content: str,
                                    status: str = "draft",
                                    featured_media_id: Optional[int] = None) -> Dict[str, Any]:
         """
         Publish post to WordPress via REST API
         """
-        if not wp_url.endswith("/"):
-            wp_url += "/"
-        
-        endpoint = f"{wp_url}wp-json/wp/v2/posts"
-        
-        # Basic Auth
-        credentials = f"{username}:{app_password}"
-        token = base64.b64encode(credentials.encode()).decode()
-        headers = {
-            "Authorization": f"Basic {token}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "title": title,
             "content": content,
-            "status": status, 
+            "status": status,
         }
-        
+
         if featured_media_id:
             payload["featured_media"] = featured_media_id
 
-        async with httpx.AsyncClient() as client:
-            try:
-                # 1. Check if we have an image to upload first? 
-                # (Skipped for MVP, assuming text only or external image handling separately)
-                
-                response = await client.post(endpoint, json=payload, headers=headers, timeout=30.0)
-                response.raise_for_status()
-                return {"success": True, "data": response.json()}
-            except Exception as e:
-                print(f"WordPress Publish Error: {e}")
-                return {"success": False, "error": str(e)}
+        try:
+            data = await self._request(
+                wp_url, _auth_header(username, app_password), "POST", "posts",
+                json=payload, retry_unsafe=False
+            )
+            return {"success": True, "data": data}
+        except WordPressError as e:
+            logger.error(f"WordPress Publish Error: {e}")
+            return {"success": False, "error": str(e)}
 
     async def upload_media_to_wordpress(self,
                                       wp_url: str,
@@ -66,18 +181,308 @@ class PublishingService:
         Upload an image from a URL to WordPress Media Library
         Returns media ID
         """
-        # This is a bit complex as we need to download image first then upload
-        # For MVP, we might skip this or implement if time permits
+        return await self._upload_media(wp_url, _auth_header(username, app_password), image_url)
+
+    # ==================== Bulk ====================
+
+    async def bulk_publish_to_wordpress(
+        self,
+        post_ids: List[str],
+        wp_url: str,
+        username: str,
+        app_password: str,
+        status: str = "draft",
+        upload_images: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Publish many content posts to one site. Each post uploads its image
+        and then creates the WordPress post; posts run concurrently, bounded
+        by the per-site limit, so uploads and creates overlap across posts.
+        """
+        db = get_supabase_service()
+
+        unique_ids = list(dict.fromkeys(post_ids))
+        posts = {str(p["id"]): p for p in await db.get_content_posts_by_ids(unique_ids)}
+        auth = _auth_header(username, app_password)
+        site = site_key(wp_url)
+
+        async def publish_one(post_id: str) -> Dict[str, Any]:
+            post = posts.get(post_id)
+            if post is None:
+                return {"post_id": post_id, "success": False, "error": "Content post not found"}
+            try:
+                return await self._publish_post(db, post, wp_url, site, auth, status, upload_images)
+            except Exception as e:
+                logger.warning(f"[Publishing] Post {post_id} failed on {site}: {e}")
+                return {"post_id": post_id, "success": False, "error": str(e)}
+
+        results = await asyncio.gather(*(publish_one(post_id) for post_id in unique_ids))
+        failed = sum(1 for r in results if not r["success"])
+        return {
+            "success": failed == 0,
+            "site": site,
+            "published": len(results) - failed,
+            "failed": failed,
+            "results": results,
+        }
+
+    async def _publish_post(
+        self,
+        db,
+        post: Dict[str, Any],
+        wp_url: str,
+        site: str,
+        auth: str,
+        status: str,
+        upload_images: bool
+    ) -> Dict[str, Any]:
+        meta = post.get("meta_data") or {}
+        record = (meta.get("wordpress") or {}).get(site)
+        if record and record.get("id"):
+            return {"post_id": post["id"], "success": True, "skipped": True, **record}
+
+        slug = post_slug(post)
+        key = (site, slug)
+        task = self._post_inflight.get(key)
+        if task is None:
+            # Lookup and create are one unit: two publishes of a slug would both miss the lookup
+            task = asyncio.create_task(self._create_post_once(post, wp_url, auth, slug, status, upload_images))
+            self._post_inflight[key] = task
+            task.add_done_callback(lambda _: self._post_inflight.pop(key, None))
+        existing = await asyncio.shield(task)
+
+        record = {
+            "id": existing.get("id"),
+            "link": existing.get("link"),
+            "status": existing.get("status"),
+            "slug": slug,
+            "featured_media": existing.get("featured_media") or None,
+            "published_at": datetime.utcnow().isoformat(),
+        }
+        meta = {**meta, "wordpress": {**(meta.get("wordpress") or {}), site: record}}
+        update = {"meta_data": meta}
+        if record["status"] == "publish":
+            update["status"] = "PUBLISHED"
+        await db.update_content_post(post["id"], update)
+        return {"post_id": post["id"], "success": True, "skipped": False, **record}
+
+    async def _create_post_once(
+        self,
+        post: Dict[str, Any],
+        wp_url: str,
+        auth: str,
+        slug: str,
+        status: str,
+        upload_images: bool
+    ) -> Dict[str, Any]:
+        existing = await self._find_post_by_slug(wp_url, auth, slug)
+        if existing is not None:
+            return existing
+
+        media_id = None
+        if upload_images and post.get("image_url"):
+            media_id = await self._upload_media(wp_url, auth, post["image_url"])
+        payload = {
+            "title": post.get("title") or "",
+            "content": post.get("content") or "",
+            "status": status,
+            "slug": slug,
+        }
+        if media_id:
+            payload["featured_media"] = media_id
+        return await self._request(
+            wp_url, auth, "POST", "posts", json=payload,
+            # Outcome of a failed create is unknown: adopt it if it landed
+            before_retry=lambda: self._find_post_by_slug(wp_url, auth, slug)
+        )
+
+    async def _find_post_by_slug(self, wp_url: str, auth: str, slug: str) -> Optional[Dict[str, Any]]:
+        # Drafts are only listed with status=any, which needs the edit context
+        found = await self._request(
+            wp_url, auth, "GET", "posts",
+            params={"slug": slug, "status": "any", "context": "edit", "_fields": "id,link,status,featured_media"}
+        )
+        return found[0] if found else None
+
+    async def _upload_media(self, wp_url: str, auth: str, image_url: str) -> Optional[int]:
+        """
+        Media id of an image on a site, uploading it only if this site has
+        not received the same image before (cached per site and image hash)
+        """
+        site = site_key(wp_url)
+        digest = image_hash(image_url)
+        key = (site, digest)
+        task = self._media_inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._upload_media_once(wp_url, auth, image_url, site, digest))
+            self._media_inflight[key] = task
+            task.add_done_callback(lambda _: self._media_inflight.pop(key, None))
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            # Publish without a featured image rather than not at all
+            logger.warning(f"WordPress media upload failed for {image_url}: {e}")
+            return None
+
+    async def _upload_media_once(self, wp_url: str, auth: str, image_url: str, site: str, digest: str) -> Optional[int]:
+        db = get_supabase_service()
+        media_id = await db.get_wordpress_media(site, digest)
+        if media_id:
+            return media_id
+
+        filename, token = media_filename(image_url, digest)
+        media = await self._request(
+            wp_url, auth, "POST", "media",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+            open_body=lambda: self._open_image(image_url),
+            # Outcome of a failed upload is unknown: adopt it if it landed
+            before_retry=lambda: self._find_media(wp_url, auth, token),
+        )
+        media_id = media.get("id")
+        if media_id:
+            await db.save_wordpress_media(site, digest, media_id, image_url)
+        return media_id
+
+    async def _find_media(self, wp_url: str, auth: str, token: str) -> Optional[Dict[str, Any]]:
+        # Media titles (and so slugs) are taken from the uploaded filename
+        found = await self._request(
+            wp_url, auth, "GET", "media",
+            params={"search": token, "context": "edit", "_fields": "id,slug,source_url"}
+        )
+        for media in found or []:
+            if token in (media.get("slug") or "") or token in (media.get("source_url") or ""):
+                return media
         return None
 
+    @asynccontextmanager
+    async def _open_image(self, image_url: str):
+        """
+        Yields (chunks, headers) to stream an image into a request body without
+        holding it in memory: read from disk when we host it, else relayed
+        from its URL. Content-Length is sent when known, else the body goes
+        out with chunked transfer encoding.
+        """
+        local_path = local_media_path(image_url, self.public_base_url)
+        if local_path is not None:
+            headers = {
+                "Content-Type": media_content_type(local_path),
+                "Content-Length": str(os.path.getsize(local_path)),
+            }
+            yield _file_chunks(local_path), headers
+            return
+
+        async with self._get_fetch_client().stream("GET", image_url, follow_redirects=True) as response:
+            response.raise_for_status()
+            headers = {"Content-Type": response.headers.get("content-type") or "application/octet-stream"}
+            # aiter_bytes() decodes any content-encoding, so the upstream length only holds without one
+            if "content-length" in response.headers and "content-encoding" not in response.headers:
+                headers["Content-Length"] = response.headers["content-length"]
+            yield response.aiter_bytes(UPLOAD_CHUNK_BYTES), headers
+
+    # ==================== HTTP ====================
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                # Limits belong to the transport when one is supplied
+                transport=tracked_transport(
+                    "wordpress", limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+                ),
+            )
+        return self._client
+
+    def _get_fetch_client(self) -> httpx.AsyncClient:
+        """Client for downloading source images from other hosts"""
+        if self._fetch_client is None or self._fetch_client.is_closed:
+            self._fetch_client = httpx.AsyncClient(timeout=self.timeout, transport=tracked_transport("image_host"))
+        return self._fetch_client
+
+    def _site_limit(self, site: str) -> asyncio.Semaphore:
+        semaphore = self._site_limits.get(site)
+        if semaphore is None:
+            semaphore = self._site_limits[site] = asyncio.Semaphore(self.site_concurrency)
+        return semaphore
+
+    async def _request(
+        self,
+        wp_url: str,
+        auth: str,
+        method: str,
+        route: str,
+        headers: Optional[Dict[str, str]] = None,
+        retry_unsafe: bool = True,
+        before_retry: Optional[Callable[[], Awaitable[Optional[Any]]]] = None,
+        open_body: Optional[Callable[[], Any]] = None,
+        **kwargs
+    ) -> Any:
+        """
+        One WordPress REST call (wp-json/wp/v2/<route>) with per-site limits
+        and retries. Returns the decoded JSON body. A POST is only retried
+        when retry_unsafe is set; before_retry may return a result to use
+        instead of retrying (e.g. the post an earlier attempt created).
+        open_body streams the request body: it is called per attempt and
+        returns an async context manager yielding (chunks, headers).
+        """
+        site = site_key(wp_url)
+        url = f"{wp_url.rstrip('/')}/wp-json/wp/v2/{route}"
+        request_headers = {"Authorization": auth, **(headers or {})}
+        may_retry = method == "GET" or retry_unsafe
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self._site_limit(site):
+                    if open_body is None:
+                        response = await self._get_client().request(method, url, headers=request_headers, **kwargs)
+                    else:
+                        async with open_body() as (content, body_headers):
+                            response = await self._get_client().request(
+                                method, url, headers={**request_headers, **body_headers}, content=content, **kwargs
+                            )
+            except httpx.TransportError as e:
+                error = WordPressError(f"{method} {route}: {e!r}", retryable=True)
+            else:
+                if response.status_code < 400:
+                    return response.json()
+                error = WordPressError(
+                    f"{method} {route}: HTTP {response.status_code} {response.text[:200]}",
+                    status=response.status_code,
+                    retryable=response.status_code in RETRY_STATUSES,
+                )
+                retry_after = response.headers.get("retry-after")
+
+            if not (may_retry and error.retryable) or attempt == self.max_retries:
+                raise error
+            delay = self._backoff(attempt, retry_after)
+            logger.info(f"[Publishing] {site}: {error}; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            if before_retry is not None:
+                found = await before_retry()
+                if found is not None:
+                    return found
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF_SECONDS)
+        return min(0.5 * (2 ** attempt), MAX_BACKOFF_SECONDS) * random.uniform(0.8, 1.2)
+
+    async def close(self) -> None:
+        for client in (self._client, self._fetch_client):
+            if client is not None:
+                await client.aclose()
+        self._client = self._fetch_client = None
+
+    # ==================== Social ====================
+
     async def simulate_social_publish(self, platform: str, content: str, image_url: Optional[str] = None) -> Dict[str, Any]:
         """
         Simulate publishing to Social Media (Twitter/LinkedIn)
         """
         # Mock delay
-        import asyncio
         await asyncio.sleep(1.5)
-        
+
         return {
             "success": True,
             "platform": platform,
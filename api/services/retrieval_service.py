@@ -0,0 +1,361 @@
+"""
+Retrieval Service - Per-project BM25 index over crawl results
+
+Replaces "first N characters of the first M pages" with relevance ranking:
+1. Crawled pages are split into paragraph-aligned chunks
+2. Chunks are persisted to the crawl_chunks table next to crawl_results
+3. An in-memory BM25 index (NumPy scoring) is built per project on first use
+   and updated incrementally as new pages are crawled
+
+Each worker holds its own indexes. A worker that indexes new pages announces
+it on the cache invalidation bus, and the other workers drop their copy of
+that project's index and reload it from crawl_chunks on next use.
+"""
+
+import asyncio
+import os
+import re
+import math
+import hashlib
+import json
+from collections import Counter, OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+from api.services.supabase_service import get_supabase_service
+from api.services.cache_service import get_cache_service, InvalidationBus
+from api.logging_config import get_logger
+from api.tracing import trace_service
+
+logger = get_logger(__name__)
+
+
+# Latin words / numbers, and runs of CJK ideographs (indexed as bigrams)
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9\-']+")
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_SENTENCE_RE = re.compile(r"(?<=[。！？!?.;；])\s*")
+
+_STOPWORDS = {
+    "the", "and", "for", "are", "with", "that", "this", "from", "you", "your",
+    "our", "was", "were", "has", "have", "had", "not", "but", "all", "can",
+    "will", "its", "into", "than", "then", "they", "them", "their", "what",
+    "which", "who", "how", "when", "where", "more", "also", "any", "may",
+}
+
+# Namespace of index invalidations on the cache bus
+BUS_NAMESPACE = "retrieval_index"
+
+# Dimensions the deep gap audit scores on; each becomes a retrieval query
+GAP_DIMENSIONS = [
+    "pricing plans price comparison 价格 套餐 收费",
+    "FAQ frequently asked questions 常见问题 问答",
+    "case study customer success story 案例 客户 成功",
+    "reviews testimonials ratings 评价 口碑 推荐",
+    "features specifications product details 功能 参数 产品",
+    "integrations partners ecosystem 集成 合作伙伴 生态",
+    "certifications awards compliance 认证 奖项 资质",
+    "statistics research data report 数据 研究 报告",
+]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens plus CJK character bigrams"""
+    if not text:
+        return []
+    text = text.lower()
+    tokens = [w for w in _WORD_RE.findall(text) if w not in _STOPWORDS]
+    for run in _CJK_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def chunk_text(text: str, max_chars: int = 800) -> List[str]:
+    """
+    Split markdown into paragraph-aligned chunks of at most ~max_chars.
+    Each chunk is prefixed with the nearest preceding heading for context.
+    """
+    if not text:
+        return []
+
+    chunks: List[str] = []
+    heading = ""
+    buffer = ""
+
+    def flush():
+        nonlocal buffer
+        body = buffer.strip()
+        if body:
+            chunks.append(f"{heading}\n{body}" if heading and not body.startswith(heading) else body)
+        buffer = ""
+
+    for para in re.split(r"\n\s*\n", text):
+        para = para.strip()
+        if not para:
+            continue
+        if para.startswith("#") and "\n" not in para:
+            flush()
+            heading = para
+            continue
+
+        pieces = [para]
+        if len(para) > max_chars:
+            # Long paragraph: fall back to sentence boundaries, then hard cuts
+            pieces, current = [], ""
+            for sentence in _SENTENCE_RE.split(para):
+                while len(sentence) > max_chars:
+                    pieces.append(sentence[:max_chars])
+                    sentence = sentence[max_chars:]
+                if current and len(current) + len(sentence) > max_chars:
+                    pieces.append(current)
+                    current = ""
+                current += sentence
+            if current:
+                pieces.append(current)
+
+        for piece in pieces:
+            if buffer and len(buffer) + len(piece) > max_chars:
+                flush()
+            buffer += piece + "\n\n"
+
+    flush()
+    return chunks
+
+
+class ChunkIndex:
+    """Append-only BM25 index for one project's chunks"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.chunks: List[Dict[str, Any]] = []
+        self._seen: set = set()
+        self._doc_len: List[int] = []
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        # term -> (ids, tfs) as arrays, valid while the posting length is unchanged
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add(self, chunk: Dict[str, Any]) -> bool:
+        """Add a chunk ({"url", "content", ...}); duplicates are skipped"""
+        content = chunk.get("content") or ""
+        digest = hashlib.blake2b(content.encode("utf-8"), digest_size=12).digest()
+        if not content or digest in self._seen:
+            return False
+        self._seen.add(digest)
+
+        doc_id = len(self.chunks)
+        tokens = tokenize(content)
+        for term, tf in Counter(tokens).items():
+            ids, tfs = self._postings.setdefault(term, ([], []))
+            ids.append(doc_id)
+            tfs.append(tf)
+        self.chunks.append(chunk)
+        self._doc_len.append(len(tokens))
+        return True
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return up to k (score, chunk) pairs ranked by BM25"""
+        n = len(self.chunks)
+        if n == 0:
+            return []
+
+        doc_len = np.asarray(self._doc_len, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * doc_len / max(doc_len.mean(), 1.0))
+        scores = np.zeros(n, dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            ids, tfs = self._posting_arrays(term, posting)
+            df = len(ids)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + norm[ids])
+
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.chunks[i]) for i in top if scores[i] > 0]
+
+    def _posting_arrays(self, term: str, posting: Tuple[List[int], List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+        cached = self._arrays.get(term)
+        if cached is None or len(cached[0]) != len(posting[0]):
+            cached = (
+                np.asarray(posting[0], dtype=np.int64),
+                np.asarray(posting[1], dtype=np.float32),
+            )
+            self._arrays[term] = cached
+        return cached
+
+
+@trace_service
+class RetrievalService:
+    """Builds, persists and queries per-project chunk indexes"""
+
+    def __init__(self, max_projects: int = 32, chunk_chars: int = 800):
+        self.db = get_supabase_service()
+        self.max_projects = max_projects
+        self.chunk_chars = chunk_chars
+        self._indexes: "OrderedDict[str, ChunkIndex]" = OrderedDict()
+        # One load (and backfill) per project at a time
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        self._bus = InvalidationBus(get_cache_service().bus_path)
+        self._worker = str(os.getpid())
+
+    async def index_page(self, project_id: str, crawl_result: Dict[str, Any]) -> int:
+        """
+        Chunk a freshly saved crawl result, persist its chunks and add them
+        to the loaded index (if any). Returns the number of chunks stored.
+        """
+        chunks = self._chunk_result(project_id, crawl_result)
+        if not chunks:
+            return 0
+        await self.db.save_crawl_chunks(chunks)
+
+        self._sync()
+        index = self._indexes.get(project_id)
+        if index is not None:
+            for chunk in chunks:
+                index.add(chunk)
+        self._bus.publish(BUS_NAMESPACE, f"{self._worker}:{project_id}")
+        return len(chunks)
+
+    async def get_index(self, project_id: str) -> ChunkIndex:
+        """Load a project's index from crawl_chunks, backfilling pages crawled before indexing existed"""
+        self._sync()
+        index = self._indexes.get(project_id)
+        if index is not None:
+            self._indexes.move_to_end(project_id)
+            return index
+
+        lock = self._load_locks.setdefault(project_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(project_id)
+            if index is None:
+                index = await self._load_index(project_id)
+                self._indexes[project_id] = index
+                if len(self._indexes) > self.max_projects:
+                    evicted, _ = self._indexes.popitem(last=False)
+                    self._load_locks.pop(evicted, None)
+        return index
+
+    async def _load_index(self, project_id: str) -> ChunkIndex:
+        index = ChunkIndex()
+        stored = await self.db.get_crawl_chunks(project_id)
+        indexed_results = set()
+        for chunk in stored:
+            index.add(chunk)
+            indexed_results.add(chunk.get("crawl_result_id"))
+
+        missing = [
+            r for r in await self.db.get_crawl_results(project_id)
+            if r.get("id") not in indexed_results
+        ]
+        if missing:
+            logger.info(f"[Retrieval] Backfilling {len(missing)} pages for project {project_id}")
+            backfill: List[Dict[str, Any]] = []
+            for result in missing:
+                backfill.extend(self._chunk_result(project_id, result))
+            if backfill:
+                await self.db.save_crawl_chunks(backfill)
+            for chunk in backfill:
+                index.add(chunk)
+        return index
+
+    async def retrieve_for_gap_analysis(
+        self,
+        project_id: str,
+        company_profile: Dict[str, Any],
+        k_per_query: int = 4,
+        max_chars: int = 20000
+    ) -> List[Dict[str, Any]]:
+        """
+        Pick the chunks most relevant to the company profile and to each
+        gap dimension, interleaved so every dimension gets coverage.
+        """
+        index = await self.get_index(project_id)
+        if not len(index):
+            return []
+
+        profile_query = self._profile_query(company_profile)
+        queries = [profile_query] + [f"{dim} {profile_query[:300]}" for dim in GAP_DIMENSIONS]
+        ranked = [index.search(q, k_per_query) for q in queries]
+
+        selected: List[Dict[str, Any]] = []
+        seen = set()
+        total = 0
+        for rank in range(k_per_query):
+            for hits in ranked:
+                if rank >= len(hits):
+                    continue
+                score, chunk = hits[rank]
+                key = id(chunk)
+                if key in seen:
+                    continue
+                if total + len(chunk["content"]) > max_chars:
+                    continue
+                seen.add(key)
+                total += len(chunk["content"])
+                selected.append({**chunk, "score": round(score, 3)})
+        return selected
+
+    # ==================== Helpers ====================
+
+    def _sync(self) -> None:
+        """Drop indexes another worker has added pages to since the last check"""
+        events = self._bus.poll()
+        if events is None:
+            self._indexes.clear()
+            return
+        for namespace, key in events:
+            worker, _, project_id = key.partition(":")
+            if namespace == BUS_NAMESPACE and worker != self._worker:
+                self._indexes.pop(project_id, None)
+
+    def _chunk_result(self, project_id: str, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "project_id": project_id,
+                "crawl_result_id": result.get("id"),
+                "url": result.get("url", ""),
+                "chunk_index": i,
+                "content": text
+            }
+            for i, text in enumerate(chunk_text(result.get("content") or "", self.chunk_chars))
+        ]
+
+    def _profile_query(self, profile: Any) -> str:
+        """Flatten the (free-form) company profile into a query string"""
+        if isinstance(profile, str):
+            return profile[:2000]
+        parts: List[str] = []
+
+        def walk(value: Any):
+            if isinstance(value, dict):
+                for v in value.values():
+                    walk(v)
+            elif isinstance(value, list):
+                for v in value:
+                    walk(v)
+            elif isinstance(value, str):
+                parts.append(value)
+
+        walk(profile or {})
+        return " ".join(parts)[:2000] or json.dumps(profile, ensure_ascii=False)[:2000]
+
+
+# Singleton
+_retrieval_service: Optional[RetrievalService] = None
+
+def get_retrieval_service() -> RetrievalService:
+    """Get or create Retrieval service instance"""
+    global _retrieval_service
+    if _retrieval_service is None:
+        _retrieval_service = RetrievalService()
+    return _retrieval_service
@@ -0,0 +1,360 @@
+"""
+Scheduler Service - Publishes content posts at their scheduled time
+
+Schedule entries live in scheduled_posts (durable); each worker keeps only
+(publish_at, id) pairs in a min-heap and sleeps until the earliest one is
+due, so the DB is not polled while nothing is due:
+1. Due entries are claimed in batches (pending -> claimed, a compare-and-set,
+   so with several workers each entry is dispatched once)
+2. WordPress entries are grouped per site and sent through the idempotent
+   bulk publisher; social entries go to the social adapter
+3. Outcomes are recorded: published, or back to pending with a backoff,
+   or failed after SCHEDULER_MAX_ATTEMPTS
+
+The heap is rebuilt from the DB on start and every SCHEDULER_RESYNC_INTERVAL
+seconds (picking up entries scheduled by other workers). Entries whose time
+passed while no worker ran are due at once on start, and entries claimed
+by a worker that died are released by the first resync after
+SCHEDULER_CLAIM_TIMEOUT.
+
+Entries never store WordPress credentials, only the site they were
+scheduled for; the credentials are read from the project's WordPress
+connection at dispatch.
+"""
+
+import asyncio
+import heapq
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+
+from api.config import get_settings
+from api.logging_config import get_logger
+from api.tracing import trace_service
+from api.services.supabase_service import get_supabase_service, build_scheduled_post_row
+from api.services.publishing_service import get_publishing_service, site_key
+
+logger = get_logger(__name__)
+
+PLATFORMS = {"wordpress", "twitter", "linkedin"}
+MAX_RETRY_DELAY = 3600.0
+STOP_TIMEOUT = 10.0
+
+
+def to_utc(value: Any) -> datetime:
+    """Aware UTC datetime from a datetime or ISO string (naive means UTC)"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def wordpress_credentials(target: Dict[str, Any], project: Optional[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+    """
+    Site credentials from the project's WordPress connection, as long as it
+    still points at the site the entry was scheduled for. Entries stored
+    before credentials moved to the project carry their own config.
+    """
+    config = target.get("config") or (project or {}).get("wp_connection") or {}
+    password = config.get("app_password") or config.get("appPassword")
+    if not (config.get("url") and config.get("username") and password):
+        return None
+    if target.get("site") and site_key(config["url"]) != target["site"]:
+        return None
+    return {"url": config["url"], "username": config["username"], "app_password": password}
+
+
+@trace_service
+class SchedulerService:
+    """Durable publish schedule with a single in-process timer loop"""
+
+    def __init__(self):
+        settings = get_settings()
+        self.db = get_supabase_service()
+        self.enabled = settings.scheduler_enabled
+        self.batch_size = max(1, settings.scheduler_batch_size)
+        self.resync_interval = settings.scheduler_resync_interval
+        self.claim_timeout = settings.scheduler_claim_timeout
+        self.max_attempts = max(1, settings.scheduler_max_attempts)
+
+        # (due timestamp, schedule id); _due_at holds the live timestamp per
+        # id, and heap entries that no longer match it are skipped
+        self._heap: List[Tuple[float, str]] = []
+        self._due_at: Dict[str, float] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._next_resync = 0.0
+        self.stats = {"scheduled": 0, "dispatched": 0, "published": 0, "retried": 0, "failed": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    # ==================== Public API ====================
+
+    async def schedule(
+        self,
+        project_id: str,
+        items: List[Dict[str, Any]],
+        target: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Schedule content posts. Each item has post_id, publish_at (datetime
+        or ISO string) and platform; target holds publish options shared by
+        the items (post status and WordPress site, never credentials).
+        """
+        rows = [
+            build_scheduled_post_row(
+                project_id, item["post_id"], item["platform"],
+                to_utc(item["publish_at"]).isoformat(), target
+            )
+            for item in items
+        ]
+        saved = await self.db.save_scheduled_posts(rows)
+        for row in saved:
+            self._push(row["id"], row["publish_at"])
+        self.stats["scheduled"] += len(saved)
+        if saved and self._wake is not None:
+            self._wake.set()
+        return saved
+
+    async def cancel(self, schedule_id: str) -> bool:
+        """Cancel a pending entry; False if it is no longer pending"""
+        cancelled = await self.db.transition_scheduled_posts([schedule_id], "pending", {"status": "cancelled"})
+        self._due_at.pop(schedule_id, None)
+        return bool(cancelled)
+
+    async def list_scheduled(
+        self,
+        project_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        return await self.db.get_scheduled_posts(project_id, limit=limit, cursor=cursor)
+
+    # ==================== Lifecycle ====================
+
+    async def start(self) -> None:
+        """Release stale claims, load pending entries and start the timer loop"""
+        if not self.enabled or self.running:
+            return
+        released = await self._resync()
+
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        overdue = sum(1 for due in self._due_at.values() if due <= time.time())
+        logger.info(
+            f"[Scheduler] Started ({len(self._due_at)} pending, {overdue} overdue, "
+            f"{released} stale claims released)"
+        )
+
+    async def stop(self) -> None:
+        """Stop the timer loop, letting an in-progress batch finish"""
+        if not self.running:
+            return
+        self._stopping = True
+        self._wake.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            # Its claims are released by the next resync after SCHEDULER_CLAIM_TIMEOUT
+            logger.warning("[Scheduler] Batch still running at shutdown; cancelled")
+        self._task = None
+        logger.info("[Scheduler] Stopped")
+
+    # ==================== Timer ====================
+
+    def _push(self, schedule_id: str, publish_at: Any) -> None:
+        due = to_utc(publish_at).timestamp()
+        if self._due_at.get(schedule_id) == due:
+            return
+        self._due_at[schedule_id] = due
+        heapq.heappush(self._heap, (due, schedule_id))
+
+    def _pop_due(self, now: float) -> List[str]:
+        due_ids: List[str] = []
+        while self._heap and len(due_ids) < self.batch_size:
+            due, schedule_id = self._heap[0]
+            if self._due_at.get(schedule_id) != due:
+                heapq.heappop(self._heap)
+                continue
+            if due > now:
+                break
+            heapq.heappop(self._heap)
+            del self._due_at[schedule_id]
+            due_ids.append(schedule_id)
+        return due_ids
+
+    def _next_due(self) -> Optional[float]:
+        while self._heap and self._due_at.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    async def _resync(self) -> int:
+        """
+        Release claims older than SCHEDULER_CLAIM_TIMEOUT (a worker died
+        mid-publish), then merge pending entries from the DB into the heap
+        (adds, never drops). Returns the number of claims released.
+        """
+        cutoff = (utc_now() - timedelta(seconds=self.claim_timeout)).isoformat()
+        released = await self.db.release_stale_scheduled_posts(cutoff)
+        if released and self.running:
+            logger.warning(f"[Scheduler] Released {released} stale claims")
+        for row in await self.db.get_pending_schedule():
+            try:
+                self._push(row["id"], row["publish_at"])
+            except (TypeError, ValueError):
+                logger.warning(f"[Scheduler] Entry {row.get('id')} has an invalid publish_at")
+        self._next_resync = time.time() + self.resync_interval
+        return released
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                now = time.time()
+                if now >= self._next_resync:
+                    await self._resync()
+
+                due_ids = self._pop_due(now)
+                if due_ids:
+                    await self._dispatch(due_ids)
+                    continue
+
+                next_due = self._next_due()
+                wake_at = self._next_resync if next_due is None else min(next_due, self._next_resync)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, wake_at - time.time()))
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+            except Exception as e:
+                logger.warning(f"[Scheduler] Loop error: {e}")
+                await asyncio.sleep(1.0)
+
+    # ==================== Dispatch ====================
+
+    async def _dispatch(self, schedule_ids: List[str]) -> None:
+        claimed = await self.db.transition_scheduled_posts(
+            schedule_ids, "pending", {"status": "claimed", "claimed_at": utc_now().isoformat()}
+        )
+        if not claimed:
+            return
+        self.stats["dispatched"] += len(claimed)
+
+        wordpress: Dict[Tuple[str, str, str, str], List[Dict[str, Any]]] = {}
+        social: List[Dict[str, Any]] = []
+        outcomes: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        projects: Dict[str, Optional[Dict[str, Any]]] = {}
+
+        for row in claimed:
+            target = row.get("target") or {}
+            if row["platform"] != "wordpress":
+                social.append(row)
+                continue
+            project_id = row.get("project_id")
+            if project_id not in projects:
+                projects[project_id] = await self.db.get_project(project_id) if project_id else None
+            creds = wordpress_credentials(target, projects[project_id])
+            if creds is None:
+                outcomes.append((row, {
+                    "success": False,
+                    "error": "Project's WordPress connection is missing or no longer points at the scheduled site",
+                    "final": True
+                }))
+                continue
+            group = (creds["url"], creds["username"], creds["app_password"], target.get("status") or "publish")
+            wordpress.setdefault(group, []).append(row)
+
+        groups = [self._publish_wordpress(group, rows) for group, rows in wordpress.items()]
+        if social:
+            groups.append(self._publish_social(social))
+        for group_outcomes in await asyncio.gather(*groups):
+            outcomes.extend(group_outcomes)
+
+        await asyncio.gather(*(self._record(row, outcome) for row, outcome in outcomes))
+
+    async def _publish_wordpress(
+        self,
+        group: Tuple[str, str, str, str],
+        rows: List[Dict[str, Any]]
+    ) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        wp_url, username, app_password, status = group
+        try:
+            # Idempotent per post and site, so a re-dispatched entry never duplicates
+            summary = await get_publishing_service().bulk_publish_to_wordpress(
+                [row["post_id"] for row in rows], wp_url, username, app_password, status=status
+            )
+        except Exception as e:
+            return [(row, {"success": False, "error": str(e)}) for row in rows]
+        results = {str(r["post_id"]): r for r in summary["results"]}
+        return [
+            (row, results.get(str(row["post_id"])) or {"success": False, "error": "No result"})
+            for row in rows
+        ]
+
+    async def _publish_social(self, rows: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        posts = {str(p["id"]): p for p in await self.db.get_content_posts_by_ids([row["post_id"] for row in rows])}
+        publisher = get_publishing_service()
+
+        async def publish_one(row: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+            post = posts.get(str(row["post_id"]))
+            if post is None:
+                return row, {"success": False, "error": "Content post not found", "final": True}
+            try:
+                return row, await publisher.simulate_social_publish(
+                    row["platform"], post.get("content") or "", post.get("image_url")
+                )
+            except Exception as e:
+                return row, {"success": False, "error": str(e)}
+
+        return list(await asyncio.gather(*(publish_one(row) for row in rows)))
+
+    async def _record(self, row: Dict[str, Any], outcome: Dict[str, Any]) -> None:
+        if outcome.get("success"):
+            self.stats["published"] += 1
+            await self.db.transition_scheduled_posts([row["id"]], "claimed", {
+                "status": "published",
+                "result": outcome,
+                "last_error": None,
+                "published_at": utc_now().isoformat(),
+            })
+            return
+
+        attempts = (row.get("attempts") or 0) + 1
+        error = str(outcome.get("error") or "Publishing failed")
+        if outcome.get("final") or attempts >= self.max_attempts:
+            self.stats["failed"] += 1
+            logger.warning(f"[Scheduler] Entry {row['id']} failed after {attempts} attempt(s): {error}")
+            await self.db.transition_scheduled_posts([row["id"]], "claimed", {
+                "status": "failed", "attempts": attempts, "last_error": error
+            })
+            return
+
+        self.stats["retried"] += 1
+        retry_at = utc_now() + timedelta(seconds=min(60.0 * 2 ** (attempts - 1), MAX_RETRY_DELAY))
+        updated = await self.db.transition_scheduled_posts([row["id"]], "claimed", {
+            "status": "pending",
+            "attempts": attempts,
+            "last_error": error,
+            "publish_at": retry_at.isoformat(),
+        })
+        if updated:
+            self._push(row["id"], retry_at)
+
+
+# Singleton instance
+_scheduler_service: Optional[SchedulerService] = None
+
+def get_scheduler_service() -> SchedulerService:
+    """Get or create scheduler service instance"""
+    global _scheduler_service
+    if _scheduler_service is None:
+        _scheduler_service = SchedulerService()
+    return _scheduler_service
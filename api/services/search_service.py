@@ -12,7 +12,13 @@ import asyncio
 from api.services.gemini_service import get_gemini_service
 from api.services.perplexity_service import get_perplexity_service
 from api.prompts import get_discovery_prompt, get_hidden_competitor_prompt, SYSTEM_DISCOVERY
+from api.logging_config import get_logger
+from api.metrics import tracked_transport
+from api.tracing import trace_service, record_llm_usage
 
+logger = get_logger(__name__)
+
+@trace_service
 class SearchService:
     """Service to discover competitors using real search (Perplexity) + AI citation validation"""
     
@@ -28,22 +34,22 @@ class SearchService:
         Step 2: AI Citation Validation — test candidates (AND User Brand) across multiple queries
         Step 3: Score & Filter — keep only those with high citation rates
         """
-        print(f"[SearchService] === Starting 3-step competitor discovery for '{niche}' ===")
+        logger.info(f"[SearchService] === Starting 3-step competitor discovery for '{niche}' ===")
         
         # === Step 1: Candidate Discovery ===
-        print(f"[SearchService] Step 1: Discovering candidates...")
+        logger.info(f"[SearchService] Step 1: Discovering candidates...")
         candidates = await self._discover_candidates(niche)
         if not candidates:
-            print(f"[SearchService] Step 1 failed, trying AI fallback")
+            logger.warning(f"[SearchService] Step 1 failed, trying AI fallback")
             candidates = await self._discover_via_ai(niche)
         
         if not candidates and not user_brand_info:
-            print(f"[SearchService] No candidates found at all")
+            logger.info(f"[SearchService] No candidates found at all")
             return []
 
         # Add User Brand to candidates list for validation (marked as 'is_user')
         if user_brand_info:
-            print(f"[SearchService] Adding user brand to validation: {user_brand_info}")
+            logger.info(f"[SearchService] Adding user brand to validation: {user_brand_info}")
             user_candidate = {
                 "name": user_brand_info.get("name", "My Brand"),
                 "url": user_brand_info.get("domain", ""),
@@ -55,16 +61,16 @@ class SearchService:
             candidates.insert(0, user_candidate)
         
         candidate_names = [c.get("name", "") for c in candidates]
-        print(f"[SearchService] Step 1 found {len(candidates)} candidates: {candidate_names}")
+        logger.info(f"[SearchService] Step 1 found {len(candidates)} candidates: {candidate_names}")
         
         # === Step 2: AI Citation Validation ===
         # This now includes the user brand!
-        print(f"[SearchService] Step 2: Validating via AI citation testing...")
+        logger.info(f"[SearchService] Step 2: Validating via AI citation testing...")
         validated = await self._validate_via_citations(niche, candidates)
-        print(f"[SearchService] Step 2 validated {len(validated)} competitors")
+        logger.info(f"[SearchService] Step 2 validated {len(validated)} competitors")
         
         # === Step 3: Score & Filter ===
-        print(f"[SearchService] Step 3: Scoring and filtering...")
+        logger.info(f"[SearchService] Step 3: Scoring and filtering...")
         
         # Separate user brand from competitors for filtering
         user_result = None
@@ -84,7 +90,7 @@ class SearchService:
         
         # If too few pass the threshold, relax and take top 5 anyway
         if len(filtered) < 3 and len(competitor_results) >= 3:
-            print(f"[SearchService] Only {len(filtered)} passed 30% threshold, taking top 5 by score")
+            logger.info(f"[SearchService] Only {len(filtered)} passed 30% threshold, taking top 5 by score")
             filtered = competitor_results[:5]
         else:
              filtered = filtered[:8]
@@ -96,10 +102,10 @@ class SearchService:
              
         final_results.extend(filtered)
         
-        print(f"[SearchService] === Pipeline complete: returning {len(final_results)} items ===")
+        logger.info(f"[SearchService] === Pipeline complete: returning {len(final_results)} items ===")
         for c in final_results:
             is_user = "(USER)" if c.get("is_user_brand") else ""
-            print(f"  - {c.get('name')} {is_user}: score={c.get('ai_citation_score')}%, citations={c.get('ai_citation_count')}")
+            logger.debug(f"  - {c.get('name')} {is_user}: score={c.get('ai_citation_score')}%, citations={c.get('ai_citation_count')}")
         
         return final_results
 
@@ -108,7 +114,7 @@ class SearchService:
         import httpx
         
         if not self.perplexity.api_key:
-            print("[SearchService] No Perplexity API key, skipping real search")
+            logger.warning("[SearchService] No Perplexity API key, skipping real search")
             return []
         
         query = (
@@ -147,7 +153,7 @@ class SearchService:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=60.0, verify=False) as client:
+            async with httpx.AsyncClient(timeout=60.0, transport=tracked_transport("perplexity", verify=False)) as client:
                 response = await client.post(
                     f"{self.perplexity.base_url}/chat/completions",
                     headers=headers,
@@ -155,17 +161,19 @@ class SearchService:
                 )
                 
                 if response.status_code != 200:
-                    print(f"[SearchService] Perplexity API error: {response.status_code}")
+                    logger.warning(f"[SearchService] Perplexity API error: {response.status_code}")
                     return []
                 
                 data = response.json()
+                
+                record_llm_usage(data)
                 answer = data.get("choices", [{}])[0].get("message", {}).get("content", "")
                 citations = data.get("citations", [])
                 
                 if not answer:
                     return []
                 
-                print(f"[SearchService] Perplexity returned {len(answer)} chars, {len(citations)} citations")
+                logger.info(f"[SearchService] Perplexity returned {len(answer)} chars, {len(citations)} citations")
                 
                 # Parse with AI
                 parse_prompt = (
@@ -183,7 +191,7 @@ class SearchService:
                     f"- score 暂时设为 0，后续会通过 AI 引用验证重新计算"
                 )
                 
-                ai_response = await self.ai.client.chat.completions.create(
+                ai_response = await self.ai.chat_completion(
                     model=self.ai.model,
                     messages=[
                         {"role": "system", "content": "你是数据解析专家，只返回有效的 JSON。"},
@@ -200,7 +208,7 @@ class SearchService:
                 
                 return competitors
         except Exception as e:
-            print(f"[SearchService] Candidate discovery failed: {e}")
+            logger.warning(f"[SearchService] Candidate discovery failed: {e}")
             return []
 
     async def _validate_via_citations(self, niche: str, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -231,7 +239,7 @@ class SearchService:
             }
         
         # Run all queries in parallel
-        print(f"[SearchService] Running {len(test_queries)} validation queries...")
+        logger.info(f"[SearchService] Running {len(test_queries)} validation queries...")
         
         tasks = [self.perplexity.test_citation(q) for q in test_queries]
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -240,7 +248,7 @@ class SearchService:
         
         for i, result in enumerate(results):
             if isinstance(result, Exception):
-                print(f"[SearchService] Query {i+1} failed: {result}")
+                logger.warning(f"[SearchService] Query {i+1} failed: {result}")
                 total_queries -= 1
                 continue
             
@@ -265,7 +273,7 @@ class SearchService:
                     info["citation_count"] += 1
         
         if total_queries == 0:
-            print("[SearchService] All validation queries failed, returning candidates as-is")
+            logger.warning("[SearchService] All validation queries failed, returning candidates as-is")
             return candidates
         
         # Calculate scores and attach to candidates
@@ -290,7 +298,7 @@ class SearchService:
             c["data_source"] = "ai_citation_validated"
             
             validated.append(c)
-            print(f"  [{c.get('name')}] mentions={info['mention_count']}/{total_queries}, "
+            logger.debug(f"  [{c.get('name')}] mentions={info['mention_count']}/{total_queries}, "
                   f"citations={info['citation_count']}/{total_queries}, score={combined_score}%")
         
         return validated
@@ -300,7 +308,7 @@ class SearchService:
         prompt = get_discovery_prompt(niche)
         
         try:
-            response = await self.ai.client.chat.completions.create(
+            response = await self.ai.chat_completion(
                 model=self.ai.model,
                 messages=[
                     {"role": "system", "content": SYSTEM_DISCOVERY},
@@ -326,16 +334,15 @@ class SearchService:
             return raw_list or []
             
         except Exception as e:
-            print(f"[SearchService] AI fallback also failed: {e}")
+            logger.warning(f"[SearchService] AI fallback also failed: {e}")
             return []
 
     async def find_hidden_competitors(self, company_profile: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Identify hidden competitors based on company profile"""
-        profile_summary = json.dumps(company_profile, ensure_ascii=False)[:2000]
-        prompt = get_hidden_competitor_prompt(profile_summary)
+        prompt = get_hidden_competitor_prompt(company_profile, model=self.ai.model)
         
         try:
-            response = await self.ai.client.chat.completions.create(
+            response = await self.ai.chat_completion(
                 model=self.ai.model,
                 messages=[
                     {"role": "system", "content": SYSTEM_DISCOVERY},
@@ -355,7 +362,7 @@ class SearchService:
             return hidden_list or []
             
         except Exception as e:
-            print(f"Error in find_hidden_competitors: {e}")
+            logger.error(f"Error in find_hidden_competitors: {e}")
             return []
 
 # Singleton instance
@@ -9,8 +9,14 @@ Integrates with:
 import httpx
 from typing import Dict, Any, Optional
 from api.config import get_settings
+from api.logging_config import get_logger
+from api.metrics import tracked_transport
+from api.tracing import trace_service
 
+logger = get_logger(__name__)
 
+
+@trace_service
 class SEOService:
     """Service for third-party SEO data"""
     
@@ -19,9 +25,9 @@ class SEOService:
         self.serpapi_key = settings.serpapi_key
         
         if self.serpapi_key:
-            print(f"SEO Service initialized with SerpApi Key: {self.serpapi_key[:8]}...")
+            logger.info(f"SEO Service initialized with SerpApi Key: {self.serpapi_key[:8]}...")
         else:
-            print("SEO Service initialized WITHOUT SerpApi Key")
+            logger.warning("SEO Service initialized WITHOUT SerpApi Key")
     
     async def get_serp_rankings(
         self, 
@@ -42,7 +48,7 @@ class SEOService:
             }
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with httpx.AsyncClient(timeout=30.0, transport=tracked_transport("serpapi")) as client:
                 response = await client.get(
                     "https://serpapi.com/search",
                     params={
@@ -97,7 +103,7 @@ class SEOService:
         Returns Core Web Vitals and performance metrics
         """
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with httpx.AsyncClient(timeout=60.0, transport=tracked_transport("pagespeed")) as client:
                 response = await client.get(
                     "https://www.googleapis.com/pagespeedonline/v5/runPagespeed",
                     params={
@@ -163,13 +169,13 @@ class SEOService:
             custom_queries: List of specific queries to run (High Priority)
         """
         if not self.serpapi_key:
-            print("[SEO] No SerpApi key, cannot discover SERP keywords")
+            logger.warning("[SEO] No SerpApi key, cannot discover SERP keywords")
             return []
         
         # Use custom queries if provided (User Simulation Strategy)
         if custom_queries and len(custom_queries) > 0:
             queries = custom_queries
-            print(f"[SEO] Using {len(queries)} custom simulation queries")
+            logger.info(f"[SEO] Using {len(queries)} custom simulation queries")
         else:
             # Fallback to template queries
             queries = [
@@ -185,7 +191,7 @@ class SEOService:
         
         for query in queries:
             try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
+                async with httpx.AsyncClient(timeout=30.0, transport=tracked_transport("serpapi")) as client:
                     response = await client.get(
                         "https://serpapi.com/search",
                         params={
@@ -198,7 +204,7 @@ class SEOService:
                     )
                     
                     if response.status_code != 200:
-                        print(f"[SEO] SerpApi error for '{query}': {response.status_code}")
+                        logger.warning(f"[SEO] SerpApi error for '{query}': {response.status_code}")
                         continue
                     
                     data = response.json()
@@ -256,10 +262,10 @@ class SEOService:
                             })
 
             except Exception as e:
-                print(f"[SEO] SERP query '{query}' failed: {e}")
+                logger.warning(f"[SEO] SERP query '{query}' failed: {e}")
                 continue
         
-        print(f"[SEO] Discovered {len(keywords)} keywords from {len(queries)} SERP queries")
+        logger.info(f"[SEO] Discovered {len(keywords)} keywords from {len(queries)} SERP queries")
         return keywords[:50]  # Cap at 50
 
     async def analyze_domain_seo(
@@ -3,11 +3,275 @@ Supabase Service - Database operations
 """
 
 from supabase import create_client, Client
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 from api.config import get_settings
+from api.services.cache_service import get_cache_service, TTLCache
 
+import re
+import json
+import base64
 import uuid
+from api.logging_config import get_logger
+from api.metrics import track_upstream
+
+logger = get_logger(__name__)
+
+
+# Light projections for list views: everything except large bodies.
+# Pass fields="summary" to use them; full rows come from the detail fetches.
+SUMMARY_FIELDS = {
+    "crawl_results": ["id", "project_id", "url", "metadata", "created_at"],
+    "generated_keywords": ["id", "project_id", "keyword", "source", "created_at"],
+    "content_posts": ["id", "project_id", "title", "content_type", "status", "image_url", "created_at", "updated_at"],
+    "analysis_reports": ["id", "project_id", "report_type", "created_at"],
+    "tasks": ["id", "project_id", "batch_id", "title", "branch", "status", "publish_status", "created_at", "updated_at"],
+}
+
+_FIELD_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def parse_fields(table: str, fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a ?fields= query value ("summary" or comma-separated columns)"""
+    if not fields:
+        return None
+    if fields.strip() == "summary":
+        return list(SUMMARY_FIELDS.get(table, [])) or None
+    return [f.strip() for f in fields.split(",") if f.strip()]
+
+
+def build_projection(fields: Optional[List[str]]) -> str:
+    """Select clause for a projection; id and created_at are always kept for cursors"""
+    if not fields:
+        return "*"
+    columns = [f for f in fields if _FIELD_RE.match(f)]
+    for required in ("created_at", "id"):
+        if required not in columns:
+            columns.insert(0, required)
+    return ", ".join(columns)
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Opaque keyset cursor for the (created_at, id) position of a row"""
+    raw = json.dumps([row.get("created_at"), row.get("id")])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+class InvalidCursor(ValueError):
+    """A pagination cursor that encode_cursor did not produce"""
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Decode a cursor from encode_cursor; None if absent. The position ends up
+    in a PostgREST filter string, so it must be an ISO timestamp and a UUID;
+    anything else raises InvalidCursor.
+    """
+    if not cursor:
+        return None
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        created_at = str(created_at)
+        datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+        return created_at, str(uuid.UUID(str(row_id)))
+    except Exception:
+        raise InvalidCursor("Malformed pagination cursor")
+
+
+def next_cursor(rows: List[Dict[str, Any]], limit: Optional[int]) -> Optional[str]:
+    """Cursor for the page after rows, or None when this was the last page"""
+    if not limit or len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1])
+
+
+def get_project_cache() -> TTLCache:
+    """Read-through cache for project rows, shared by both DB backends"""
+    return get_cache_service().get_cache("projects", get_settings().project_cache_ttl)
+
+
+# Row builders shared by the DB backends and the write-behind queue. Ids are
+# generated client-side so a replayed write upserts the same row.
+def build_content_post_row(project_id: str, post_data: Dict[str, Any]) -> Dict[str, Any]:
+    timestamp = datetime.utcnow().isoformat()
+    return {
+        "id": str(uuid.uuid4()),
+        "project_id": project_id,
+        "title": post_data.get("title"),
+        "content_type": post_data.get("type", "Article"),
+        "status": post_data.get("status", "DRAFT"),
+        "content": post_data.get("full_content", ""),
+        "image_url": post_data.get("image_url"),
+        "meta_data": post_data.get("meta_data", {}),
+        "created_at": timestamp,
+        "updated_at": timestamp
+    }
+
+
+# The scheduler loads its pending ids in pages of this size
+SCHEDULE_PAGE_SIZE = 1000
+
+
+def build_scheduled_post_row(
+    project_id: str,
+    post_id: str,
+    platform: str,
+    publish_at: str,
+    target: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    timestamp = datetime.utcnow().isoformat()
+    return {
+        "id": str(uuid.uuid4()),
+        "project_id": project_id,
+        "post_id": post_id,
+        "platform": platform,
+        "target": target or {},
+        "publish_at": publish_at,
+        "status": "pending",
+        "attempts": 0,
+        "created_at": timestamp,
+        "updated_at": timestamp
+    }
+
+
+def build_analysis_report_row(project_id: str, report_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": str(uuid.uuid4()),
+        "project_id": project_id,
+        "report_type": report_type,
+        "data": data,
+        "created_at": datetime.utcnow().isoformat()
+    }
+
+
+def build_keyword_rows(project_id: str, keywords: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One row per distinct keyword; (project_id, keyword) is unique and one
+    upsert statement cannot touch the same key twice"""
+    rows: Dict[str, Dict[str, Any]] = {}
+    timestamp = datetime.utcnow().isoformat()
+    for k in keywords:
+        if not k.get("keyword"):
+            continue
+        rows[k.get("keyword")] = {
+            "project_id": project_id,
+            "keyword": k.get("keyword"),
+            "data": k,
+            "source": k.get("source", "unknown"),
+            "created_at": timestamp
+        }
+    return list(rows.values())
+
+
+# Bulk task writes
+TASK_COLUMNS = {"id", "batch_id", "title", "branch", "status", "content", "meta_data", "publish_status"}
+TASK_INSERT_CHUNK = 200
+
+
+def prepare_task_rows(
+    project_id: str,
+    tasks: List[Dict[str, Any]]
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Optional[str]], List[Dict[str, Any]]]:
+    """
+    Validate task rows for a bulk insert.
+    Returns ([(input_index, row)], ids in input order (None when rejected),
+    [{"index", "error"}]). Ids that are not UUIDs (e.g. client-side
+    "TASK-xxxx" ids) are replaced with generated ones.
+    """
+    rows: List[Tuple[int, Dict[str, Any]]] = []
+    ids: List[Optional[str]] = []
+    errors: List[Dict[str, Any]] = []
+    seen = set()
+    timestamp = datetime.utcnow().isoformat()
+
+    for index, task in enumerate(tasks):
+        if not isinstance(task, dict):
+            errors.append({"index": index, "error": "Task must be an object"})
+            ids.append(None)
+            continue
+        unknown = set(task) - TASK_COLUMNS
+        title = task.get("title")
+        error = None
+        if unknown:
+            error = f"Unknown field(s): {', '.join(sorted(unknown))}"
+        elif not isinstance(title, str) or not title.strip():
+            error = "title is required"
+
+        task_id = str(task.get("id") or "")
+        try:
+            task_id = str(uuid.UUID(task_id))
+        except ValueError:
+            task_id = str(uuid.uuid4())
+        if not error and task_id in seen:
+            error = f"Duplicate id {task_id}"
+
+        if error:
+            errors.append({"index": index, "error": error})
+            ids.append(None)
+            continue
+        seen.add(task_id)
+        ids.append(task_id)
+        rows.append((index, {
+            "project_id": project_id,
+            **task,
+            "id": task_id,
+            "created_at": timestamp
+        }))
+    return rows, ids, errors
+
+
+def group_task_updates(updates: List[Dict[str, Any]]) -> Tuple[Dict[str, Tuple[Dict[str, Any], List[str]]], List[Dict[str, Any]]]:
+    """
+    Group per-task updates ({"id", ...fields}) by identical payload, so a
+    status transition on N tasks becomes one UPDATE ... WHERE id IN (...).
+    Returns ({payload_key: (payload, [ids])}, [{"index", "error"}]).
+    """
+    groups: Dict[str, Tuple[Dict[str, Any], List[str]]] = {}
+    errors: List[Dict[str, Any]] = []
+    for index, update in enumerate(updates):
+        payload = {k: v for k, v in (update or {}).items() if k != "id"}
+        unknown = set(payload) - (TASK_COLUMNS - {"id"})
+        if not (update or {}).get("id"):
+            errors.append({"index": index, "error": "id is required"})
+        elif unknown:
+            errors.append({"index": index, "error": f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        elif not payload:
+            errors.append({"index": index, "error": "No fields to update"})
+        else:
+            key = json.dumps(payload, sort_keys=True, default=str)
+            groups.setdefault(key, (payload, []))[1].append(str(update["id"]))
+    return groups, errors
+
+
+class _TrackedQuery:
+    """
+    Wraps a postgrest query builder so execute() is timed as a "supabase"
+    upstream call labelled "<table>.<select|insert|update|upsert|delete>"
+    """
+
+    def __init__(self, builder, table: str, operation: Optional[str] = None):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+
+    def _wrap(self, result, name: str):
+        if hasattr(result, "execute"):
+            return _TrackedQuery(result, self._table, self._operation or name)
+        return result
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            # e.g. the `not_` property returns a builder
+            return self._wrap(attr, name)
+
+        def call(*args, **kwargs):
+            return self._wrap(attr(*args, **kwargs), name)
+        return call
+
+    def execute(self):
+        with track_upstream("supabase", f"{self._table}.{self._operation or 'query'}"):
+            return self._builder.execute()
+
 
 class SupabaseService:
     """Service wrapper for Supabase database operations"""
@@ -20,8 +284,12 @@ class SupabaseService:
                 settings.supabase_key
             )
         except Exception as e:
-            print(f"Failed to initialize Supabase client: {e}")
+            logger.error(f"Failed to initialize Supabase client: {e}")
             self.client = None
+
+    def _table(self, name: str) -> _TrackedQuery:
+        """Query builder for a table with upstream metrics on execute()"""
+        return _TrackedQuery(self.client.table(name), name)
     
     # ==================== Auth ====================
 
@@ -31,13 +299,14 @@ class SupabaseService:
             return {"error": "Supabase client not initialized. Check your API keys."}
             
         try:
-            response = self.client.auth.sign_up({
-                "email": email,
-                "password": password
-            })
+            with track_upstream("supabase", "auth.sign_up"):
+                response = self.client.auth.sign_up({
+                    "email": email,
+                    "password": password
+                })
             return {"user": response.user, "session": response.session}
         except Exception as e:
-            print(f"Error signing up: {e}")
+            logger.error(f"Error signing up: {e}")
             return {"error": str(e)}
 
     async def sign_in(self, email: str, password: str) -> Dict[str, Any]:
@@ -46,13 +315,14 @@ class SupabaseService:
             return {"error": "Supabase client not initialized. Check your API keys."}
 
         try:
-            response = self.client.auth.sign_in_with_password({
-                "email": email,
-                "password": password
-            })
+            with track_upstream("supabase", "auth.sign_in"):
+                response = self.client.auth.sign_in_with_password({
+                    "email": email,
+                    "password": password
+                })
             return {"user": response.user, "session": response.session}
         except Exception as e:
-            print(f"Error signing in: {e}")
+            logger.error(f"Error signing in: {e}")
             return {"error": str(e)}
 
     # ==================== Projects ====================
@@ -60,7 +330,7 @@ class SupabaseService:
     async def get_projects(self, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get projects, optionally filtered by user. Includes legacy projects (user_id is NULL)."""
         try:
-            query = self.client.table("projects").select("*").order("created_at", desc=True)
+            query = self._table("projects").select("*").order("created_at", desc=True)
             if user_id:
                 # Fetch projects belonging to user OR legacy projects (user_id is null)
                 query = query.or_(f"user_id.eq.{user_id},user_id.is.null")
@@ -68,16 +338,22 @@ class SupabaseService:
             response = query.execute()
             return response.data
         except Exception as e:
-            print(f"Error getting projects: {e}")
+            logger.error(f"Error getting projects: {e}")
             return []
     
     async def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific project by ID"""
+        """Get a specific project by ID (read-through cached)"""
+        cache = get_project_cache()
+        cached = cache.get(project_id)
+        if cached is not None:
+            return cached
+        version = cache.version(project_id)
         try:
-            response = self.client.table("projects").select("*").eq("id", project_id).single().execute()
+            response = self._table("projects").select("*").eq("id", project_id).single().execute()
+            cache.set(project_id, response.data, version)
             return response.data
         except Exception as e:
-            print(f"Error getting project {project_id}: {e}")
+            logger.error(f"Error getting project {project_id}: {e}")
             return None
     
     async def create_project(
@@ -102,10 +378,10 @@ class SupabaseService:
             if user_id:
                 data["user_id"] = user_id
                 
-            response = self.client.table("projects").insert(data).execute()
+            response = self._table("projects").insert(data).execute()
             return response.data[0] if response.data else data
         except Exception as e:
-            print(f"Error creating project: {e}")
+            logger.error(f"Error creating project: {e}")
             # Return mock data on error (for development without Supabase)
             return {
                 "id": project_id,
@@ -125,35 +401,95 @@ class SupabaseService:
         """Update a project"""
         try:
             update_data["updated_at"] = datetime.utcnow().isoformat()
-            response = self.client.table("projects").update(update_data).eq("id", project_id).execute()
+            response = self._table("projects").update(update_data).eq("id", project_id).execute()
+            get_project_cache().invalidate(project_id)
             return response.data[0] if response.data else None
         except Exception as e:
-            print(f"Error updating project {project_id}: {e}")
+            logger.error(f"Error updating project {project_id}: {e}")
             return None
     
     async def delete_project(self, project_id: str) -> bool:
         """Delete a project"""
         try:
-            self.client.table("projects").delete().eq("id", project_id).execute()
+            self._table("projects").delete().eq("id", project_id).execute()
+            get_project_cache().invalidate(project_id)
             return True
         except Exception as e:
-            print(f"Error deleting project {project_id}: {e}")
+            logger.error(f"Error deleting project {project_id}: {e}")
             return False
     
+    # ==================== Paginated Reads ====================
+
+    def _select_project_rows(
+        self,
+        table: str,
+        project_id: str,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Newest-first rows of a per-project table with keyset pagination.
+        The cursor is the (created_at, id) of the last row of the previous page.
+        """
+        query = self._table(table)\
+            .select(build_projection(fields))\
+            .eq("project_id", project_id)
+        
+        position = decode_cursor(cursor)
+        if position:
+            created_at, row_id = position
+            query = query.or_(
+                f'created_at.lt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.lt.{row_id})'
+            )
+        
+        query = query.order("created_at", desc=True).order("id", desc=True)
+        if limit:
+            query = query.limit(limit)
+        return query.execute().data
+
+    def _get_row(self, table: str, row_id: str) -> Optional[Dict[str, Any]]:
+        """Full row by primary key (detail fetch for list views)"""
+        response = self._table(table).select("*").eq("id", row_id).limit(1).execute()
+        return response.data[0] if response.data else None
+
+    async def get_project_page(
+        self,
+        table: str,
+        project_id: str,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        One page of a per-project table. Unlike the get_* readers, errors
+        propagate: an export must not mistake a failed read for the last page.
+        """
+        return self._select_project_rows(table, project_id, None, cursor, limit)
+
     # ==================== Crawl Results ====================
     
-    async def get_crawl_results(self, project_id: str) -> List[Dict[str, Any]]:
+    async def get_crawl_results(
+        self,
+        project_id: str,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """Get crawl results for a project"""
         try:
-            response = self.client.table("crawl_results")\
-                .select("*")\
-                .eq("project_id", project_id)\
-                .order("created_at", desc=True)\
-                .execute()
-            return response.data
+            return self._select_project_rows("crawl_results", project_id, fields, cursor, limit)
         except Exception as e:
-            print(f"Error getting crawl results: {e}")
+            logger.error(f"Error getting crawl results: {e}")
             return []
+
+    async def get_crawl_result(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single crawl result with its full content"""
+        try:
+            return self._get_row("crawl_results", result_id)
+        except Exception as e:
+            logger.error(f"Error getting crawl result {result_id}: {e}")
+            return None
     
     async def save_crawl_result(
         self, 
@@ -172,27 +508,79 @@ class SupabaseService:
                 "metadata": data.get("metadata"),
                 "created_at": datetime.utcnow().isoformat()
             }
-            response = self.client.table("crawl_results").insert(insert_data).execute()
+            response = self._table("crawl_results").insert(insert_data).execute()
             return response.data[0] if response.data else insert_data
         except Exception as e:
-            print(f"Error saving crawl result: {e}")
+            logger.error(f"Error saving crawl result: {e}")
             return {"error": str(e)}
     
-    # ==================== Tasks ====================
-    
-    async def get_tasks(self, project_id: str) -> List[Dict[str, Any]]:
-        """Get all tasks for a project"""
+    # ==================== Crawl Chunks (Retrieval Index) ====================
+
+    async def save_crawl_chunks(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Save a batch of retrieval chunks for crawl results"""
+        if not chunks:
+            return []
+            
+        try:
+            timestamp = datetime.utcnow().isoformat()
+            insert_data = [
+                {
+                    "id": str(uuid.uuid4()),
+                    "project_id": c.get("project_id"),
+                    "crawl_result_id": c.get("crawl_result_id"),
+                    "url": c.get("url"),
+                    "chunk_index": c.get("chunk_index", 0),
+                    "content": c.get("content"),
+                    "created_at": timestamp
+                }
+                for c in chunks
+            ]
+            # Two workers backfilling the same page write each chunk once
+            response = self._table("crawl_chunks")\
+                .upsert(insert_data, on_conflict="crawl_result_id,chunk_index", ignore_duplicates=True)\
+                .execute()
+            return response.data if response.data else insert_data
+        except Exception as e:
+            logger.error(f"Error saving crawl chunks: {e}")
+            return []
+
+    async def get_crawl_chunks(self, project_id: str) -> List[Dict[str, Any]]:
+        """Get all retrieval chunks for a project"""
         try:
-            response = self.client.table("tasks")\
-                .select("*")\
+            response = self._table("crawl_chunks")\
+                .select("id, crawl_result_id, url, chunk_index, content")\
                 .eq("project_id", project_id)\
-                .order("created_at", desc=True)\
+                .order("created_at")\
                 .execute()
             return response.data
         except Exception as e:
-            print(f"Error getting tasks: {e}")
+            logger.error(f"Error getting crawl chunks: {e}")
             return []
     
+    # ==================== Tasks ====================
+    
+    async def get_tasks(
+        self,
+        project_id: str,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Get tasks for a project (all of them unless limit is given)"""
+        try:
+            return self._select_project_rows("tasks", project_id, fields, cursor, limit)
+        except Exception as e:
+            logger.error(f"Error getting tasks: {e}")
+            return []
+
+    async def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single task with its full content"""
+        try:
+            return self._get_row("tasks", task_id)
+        except Exception as e:
+            logger.error(f"Error getting task {task_id}: {e}")
+            return None
+    
     async def create_task(
         self,
         project_id: str,
@@ -208,10 +596,10 @@ class SupabaseService:
                 "id": task_id,
                 "created_at": datetime.utcnow().isoformat()
             }
-            response = self.client.table("tasks").insert(insert_data).execute()
+            response = self._table("tasks").insert(insert_data).execute()
             return response.data[0] if response.data else insert_data
         except Exception as e:
-            print(f"Error creating task: {e}")
+            logger.error(f"Error creating task: {e}")
             return {"error": str(e)}
     
     async def update_task(
@@ -222,14 +610,94 @@ class SupabaseService:
         """Update a task"""
         try:
             update_data["updated_at"] = datetime.utcnow().isoformat()
-            response = self.client.table("tasks").update(update_data).eq("id", task_id).execute()
+            response = self._table("tasks").update(update_data).eq("id", task_id).execute()
             return response.data[0] if response.data else None
         except Exception as e:
-            print(f"Error updating task: {e}")
+            logger.error(f"Error updating task: {e}")
             return None
 
+    async def create_tasks(
+        self,
+        project_id: str,
+        tasks: List[Dict[str, Any]],
+        chunk_size: int = TASK_INSERT_CHUNK
+    ) -> Dict[str, Any]:
+        """
+        Create many tasks with one insert per chunk.
+        Returns {"data": created rows, "ids": ids in input order (None for
+        failed rows), "errors": [{"index", "error"}]}. A chunk the database
+        rejects is retried row by row so one bad row does not sink the rest.
+        """
+        rows, ids, errors = prepare_task_rows(project_id, tasks)
+        created: Dict[int, Dict[str, Any]] = {}
+
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                response = self._table("tasks").insert([row for _, row in chunk]).execute()
+                by_id = {str(r.get("id")): r for r in response.data or []}
+                for index, row in chunk:
+                    created[index] = by_id.get(row["id"], row)
+            except Exception as e:
+                logger.warning(f"Error creating task chunk ({len(chunk)} rows), retrying per row: {e}")
+                for index, row in chunk:
+                    try:
+                        response = self._table("tasks").insert(row).execute()
+                        created[index] = response.data[0] if response.data else row
+                    except Exception as row_error:
+                        errors.append({"index": index, "error": str(row_error)})
+                        ids[index] = None
+
+        errors.sort(key=lambda e: e["index"])
+        return {"data": [created[i] for i in sorted(created)], "ids": ids, "errors": errors}
 
+    async def update_tasks(self, updates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Apply per-task updates ({"id", ...fields}); tasks sharing the same
+        change are updated together. Returns {"data": updated rows,
+        "missing": ids that matched no task, "errors": [{"index", "error"}]}.
+        """
+        groups, errors = group_task_updates(updates)
+        updated: List[Dict[str, Any]] = []
+        missing: List[str] = []
+        timestamp = datetime.utcnow().isoformat()
 
+        for payload, task_ids in groups.values():
+            try:
+                response = self._table("tasks").update(
+                    {**payload, "updated_at": timestamp}
+                ).in_("id", task_ids).execute()
+                rows = response.data or []
+                found = {str(r.get("id")) for r in rows}
+                updated.extend(rows)
+                missing.extend(i for i in task_ids if i not in found)
+            except Exception as e:
+                logger.error(f"Error updating {len(task_ids)} tasks: {e}")
+                errors.append({"ids": task_ids, "error": str(e)})
+
+        return {"data": updated, "missing": missing, "errors": errors}
+
+    # ==================== Raw Writes ====================
+
+    async def write_rows(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        on_conflict: str = "id",
+        ignore_duplicates: bool = False
+    ) -> bool:
+        """
+        Idempotent bulk upsert used by the write-behind queue. With
+        ignore_duplicates existing rows are left untouched (insert-only).
+        """
+        if not rows:
+            return True
+        try:
+            self._table(table).upsert(rows, on_conflict=on_conflict, ignore_duplicates=ignore_duplicates).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error writing {len(rows)} rows to {table}: {e}")
+            return False
 
     # ==================== Analysis Reports ====================
 
@@ -241,36 +709,35 @@ class SupabaseService:
     ) -> Dict[str, Any]:
         """Save an analysis report (gap analysis, deep audit, etc)"""
         try:
-            insert_data = {
-                "project_id": project_id,
-                "report_type": report_type,
-                "data": data,
-                "created_at": datetime.utcnow().isoformat()
-            }
-            response = self.client.table("analysis_reports").insert(insert_data).execute()
+            insert_data = build_analysis_report_row(project_id, report_type, data)
+            response = self._table("analysis_reports").insert(insert_data).execute()
             return response.data[0] if response.data else insert_data
         except Exception as e:
-            print(f"Error saving analysis report: {e}")
+            logger.error(f"Error saving analysis report: {e}")
             return {"error": str(e)}
 
     async def get_analysis_reports(
         self, 
         project_id: str, 
-        limit: int = 10
+        limit: int = 10,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Get analysis reports for a project"""
         try:
-            response = self.client.table("analysis_reports")\
-                .select("*")\
-                .eq("project_id", project_id)\
-                .order("created_at", desc=True)\
-                .limit(limit)\
-                .execute()
-            return response.data
+            return self._select_project_rows("analysis_reports", project_id, fields, cursor, limit)
         except Exception as e:
-            print(f"Error getting analysis reports: {e}")
+            logger.error(f"Error getting analysis reports: {e}")
             return []
 
+    async def get_analysis_report(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single analysis report with its full data"""
+        try:
+            return self._get_row("analysis_reports", report_id)
+        except Exception as e:
+            logger.error(f"Error getting analysis report {report_id}: {e}")
+            return None
+
     # ==================== Keywords ====================
 
     async def save_keywords(
@@ -283,41 +750,28 @@ class SupabaseService:
             return []
             
         try:
-            # Prepare data for bulk insert
-            insert_data = []
-            timestamp = datetime.utcnow().isoformat()
-            
-            for k in keywords:
-                insert_data.append({
-                    "project_id": project_id,
-                    "keyword": k.get("keyword"),
-                    "data": k, 
-                    "source": k.get("source", "unknown"),
-                    "created_at": timestamp
-                })
+            insert_data = build_keyword_rows(project_id, keywords)
             
-            response = self.client.table("generated_keywords").insert(insert_data).execute()
+            response = self._table("generated_keywords")\
+                .upsert(insert_data, on_conflict="project_id,keyword")\
+                .execute()
             return response.data if response.data else insert_data
         except Exception as e:
-            print(f"Error saving keywords: {e}")
+            logger.error(f"Error saving keywords: {e}")
             return []
 
     async def get_keywords(
         self,
         project_id: str,
-        limit: int = 500
+        limit: int = 500,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Get saved keywords for a project"""
         try:
-            response = self.client.table("generated_keywords")\
-                .select("*")\
-                .eq("project_id", project_id)\
-                .order("created_at", desc=True)\
-                .limit(limit)\
-                .execute()
-            return response.data
+            return self._select_project_rows("generated_keywords", project_id, fields, cursor, limit)
         except Exception as e:
-            print(f"Error getting keywords: {e}")
+            logger.error(f"Error getting keywords: {e}")
             return []
 
     # ==================== Content Posts ====================
@@ -329,48 +783,166 @@ class SupabaseService:
     ) -> Dict[str, Any]:
         """Save a generated content post"""
         try:
-            insert_data = {
-                "project_id": project_id,
-                "title": post_data.get("title"),
-                "content_type": post_data.get("type", "Article"),
-                "status": post_data.get("status", "DRAFT"),
-                "content": post_data.get("full_content", ""),
-                "image_url": post_data.get("image_url"),
-                "meta_data": post_data.get("meta_data", {}),
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
-            }
-            response = self.client.table("content_posts").insert(insert_data).execute()
+            insert_data = build_content_post_row(project_id, post_data)
+            response = self._table("content_posts").insert(insert_data).execute()
             return response.data[0] if response.data else insert_data
         except Exception as e:
-            print(f"Error saving content post: {e}")
+            logger.error(f"Error saving content post: {e}")
             return {"error": str(e)}
 
     async def get_content_posts(
         self,
         project_id: str,
-        limit: int = 50
+        limit: int = 50,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Get content posts for a project"""
         try:
-            response = self.client.table("content_posts")\
-                .select("*")\
-                .eq("project_id", project_id)\
-                .order("created_at", desc=True)\
-                .limit(limit)\
-                .execute()
-            return response.data
+            return self._select_project_rows("content_posts", project_id, fields, cursor, limit)
+        except Exception as e:
+            logger.error(f"Error getting content posts: {e}")
+            return []
+
+    async def get_content_post(self, post_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single content post with its full content"""
+        try:
+            return self._get_row("content_posts", post_id)
         except Exception as e:
-            print(f"Error getting content posts: {e}")
+            logger.error(f"Error getting content post {post_id}: {e}")
+            return None
+
+    async def get_content_posts_by_ids(self, post_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get several content posts (full rows) in one query"""
+        if not post_ids:
             return []
+        try:
+            response = self._table("content_posts").select("*").in_("id", list(post_ids)).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"Error getting content posts by id: {e}")
+            return []
+
+    async def update_content_post(
+        self,
+        post_id: str,
+        update_data: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Update a content post"""
+        try:
+            update_data["updated_at"] = datetime.utcnow().isoformat()
+            response = self._table("content_posts").update(update_data).eq("id", post_id).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.error(f"Error updating content post {post_id}: {e}")
+            return None
+
+    # ==================== WordPress Media ====================
+
+    async def get_wordpress_media(self, site: str, image_hash: str) -> Optional[int]:
+        """Media id of an image already uploaded to a WordPress site"""
+        try:
+            response = self._table("wordpress_media").select("media_id")\
+                .eq("site", site).eq("image_hash", image_hash).limit(1).execute()
+            return response.data[0]["media_id"] if response.data else None
+        except Exception as e:
+            logger.error(f"Error getting WordPress media: {e}")
+            return None
+
+    async def save_wordpress_media(self, site: str, image_hash: str, media_id: int, source_url: str) -> None:
+        """Remember the media id an image got on a WordPress site"""
+        try:
+            row = {"site": site, "image_hash": image_hash, "media_id": media_id,
+                   "source_url": source_url, "created_at": datetime.utcnow().isoformat()}
+            self._table("wordpress_media").upsert(row, on_conflict="site,image_hash").execute()
+        except Exception as e:
+            logger.error(f"Error saving WordPress media: {e}")
+
+    # ==================== Scheduled Posts ====================
+
+    async def save_scheduled_posts(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert schedule entries (rows from build_scheduled_post_row)"""
+        if not rows:
+            return []
+        try:
+            response = self._table("scheduled_posts").insert(rows).execute()
+            return response.data or rows
+        except Exception as e:
+            logger.error(f"Error saving scheduled posts: {e}")
+            return []
+
+    async def get_scheduled_posts(
+        self,
+        project_id: str,
+        limit: int = 100,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Schedule entries of a project, newest first"""
+        try:
+            return self._select_project_rows("scheduled_posts", project_id, fields, cursor, limit)
+        except Exception as e:
+            logger.error(f"Error getting scheduled posts: {e}")
+            return []
+
+    async def get_pending_schedule(self) -> List[Dict[str, Any]]:
+        """id and publish_at of every pending entry (for the scheduler's timer heap)"""
+        rows: List[Dict[str, Any]] = []
+        try:
+            while True:
+                page = self._table("scheduled_posts").select("id,publish_at")\
+                    .eq("status", "pending").order("id")\
+                    .range(len(rows), len(rows) + SCHEDULE_PAGE_SIZE - 1).execute().data or []
+                rows.extend(page)
+                if len(page) < SCHEDULE_PAGE_SIZE:
+                    return rows
+        except Exception as e:
+            logger.error(f"Error loading pending schedule: {e}")
+            return rows
+
+    async def transition_scheduled_posts(
+        self,
+        schedule_ids: List[str],
+        from_status: str,
+        update_data: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Update entries still in from_status and return the ones changed.
+        Concurrent callers cannot both move the same entry (used to claim).
+        """
+        if not schedule_ids:
+            return []
+        try:
+            update_data["updated_at"] = datetime.utcnow().isoformat()
+            response = self._table("scheduled_posts").update(update_data)\
+                .in_("id", list(schedule_ids)).eq("status", from_status).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"Error updating scheduled posts: {e}")
+            return []
+
+    async def release_stale_scheduled_posts(self, claimed_before: str) -> int:
+        """Return entries claimed before the cutoff (their worker died) to pending"""
+        try:
+            response = self._table("scheduled_posts")\
+                .update({"status": "pending", "updated_at": datetime.utcnow().isoformat()})\
+                .eq("status", "claimed").lt("claimed_at", claimed_before).execute()
+            return len(response.data or [])
+        except Exception as e:
+            logger.error(f"Error releasing stale scheduled posts: {e}")
+            return 0
 
 
 # Singleton instance
 _supabase_service: Optional[SupabaseService] = None
 
 def get_supabase_service() -> SupabaseService:
-    """Get or create Supabase service instance"""
+    """Get or create Supabase service instance (or the local SQLite backend when DB_BACKEND=sqlite)"""
     global _supabase_service
     if _supabase_service is None:
-        _supabase_service = SupabaseService()
+        if get_settings().db_backend.lower() == "sqlite":
+            from api.services.local_db_service import LocalDBService
+            _supabase_service = LocalDBService()
+        else:
+            _supabase_service = SupabaseService()
     return _supabase_service
@@ -0,0 +1,350 @@
+"""
+Write-Behind Service - Deferred persistence for posts, reports and keywords
+
+When WRITE_BEHIND_ENABLED is set, generation/analysis endpoints no longer
+wait for the DB round trip after the LLM call:
+1. The row is built locally (with a pre-generated id), appended + fsynced to a
+   per-worker JSONL spool, queued in memory, and returned. Spool writes run
+   in a thread, and concurrent saves share one write + fsync (group commit)
+2. A background task flushes queued rows in batches as idempotent upserts
+3. Flushed records are acknowledged (durably) in the spool; on shutdown the
+   queue is drained, and on startup unacknowledged records from spools left
+   behind by crashed workers are replayed insert-only, so a row that was
+   already written (and maybe updated since) is never overwritten
+4. A batch the DB rejects is retried row by row; rows that still fail (e.g. a
+   foreign key violation) are moved to a dead-letter file and acked, so one
+   bad row cannot hold up the queue
+
+When disabled (the default) every call goes straight to the DB service.
+"""
+
+import asyncio
+import glob
+import json
+import os
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
+
+from api.config import get_settings
+from api.services.supabase_service import (
+    get_supabase_service, build_content_post_row, build_analysis_report_row, build_keyword_rows
+)
+from api.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows: spools of other workers are not reclaimed
+    fcntl = None
+
+
+MAX_BACKOFF = 30.0
+# Flush attempts that write nothing at all (likely an outage) before the
+# failing rows are dead-lettered anyway
+DEAD_LETTER_ATTEMPTS = 10
+
+
+class WriteBehindService:
+    """Queue DB writes off the response path, backed by a durable spool"""
+
+    def __init__(self):
+        settings = get_settings()
+        self.db = get_supabase_service()
+        self.enabled = settings.write_behind_enabled
+        self.spool_dir = settings.write_behind_dir
+        self.batch_size = max(1, settings.write_behind_batch_size)
+        self.flush_interval = settings.write_behind_flush_interval
+        self.dead_letter_path = os.path.join(self.spool_dir, "dead-letter.jsonl")
+
+        self._pending: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._seq = 0
+        self._spool = None
+        self._spool_path: Optional[str] = None
+        # (line, or None to truncate; future resolved once fsynced)
+        self._spool_buffer: List[Tuple[Optional[str], asyncio.Future]] = []
+        self._spool_writer: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.stats = {"enqueued": 0, "flushed": 0, "failed_flushes": 0, "recovered": 0, "dead_lettered": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    # ==================== Public write API ====================
+
+    async def save_content_post(self, project_id: str, post_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Same contract as SupabaseService.save_content_post"""
+        if not self.running:
+            return await self.db.save_content_post(project_id, post_data)
+        row = build_content_post_row(project_id, post_data)
+        await self._enqueue("content_posts", [row], "id")
+        return row
+
+    async def save_analysis_report(
+        self,
+        project_id: str,
+        report_type: str,
+        data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Same contract as SupabaseService.save_analysis_report"""
+        if not self.running:
+            return await self.db.save_analysis_report(project_id, report_type, data)
+        row = build_analysis_report_row(project_id, report_type, data)
+        await self._enqueue("analysis_reports", [row], "id")
+        return row
+
+    async def save_keywords(self, project_id: str, keywords: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Same contract as SupabaseService.save_keywords"""
+        if not self.running:
+            return await self.db.save_keywords(project_id, keywords)
+        rows = build_keyword_rows(project_id, keywords or [])
+        if rows:
+            await self._enqueue("generated_keywords", rows, "project_id,keyword")
+        return rows
+
+    # ==================== Lifecycle ====================
+
+    async def start(self) -> None:
+        """Recover orphaned spools and start the flusher (no-op when disabled)"""
+        if not self.enabled or self.running:
+            return
+        os.makedirs(self.spool_dir, exist_ok=True)
+        recovered = self._recover_spools()
+
+        self._spool_path = os.path.join(self.spool_dir, f"spool-{os.getpid()}.jsonl")
+        self._spool = open(self._spool_path, "a+", encoding="utf-8")
+        if fcntl is not None:
+            # Held while this worker lives, so others know the spool is not orphaned
+            fcntl.flock(self._spool.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._stopping = False
+        self._wake = asyncio.Event()
+        for table, rows, on_conflict in recovered:
+            await self._enqueue(table, rows, on_conflict, replay=True)
+        self.stats["recovered"] += len(recovered)
+
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"[WriteBehind] Started (spool: {self._spool_path}, recovered {len(recovered)} records)")
+
+    async def stop(self) -> None:
+        """Drain the queue and stop the flusher"""
+        if not self.running:
+            return
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        self._task = None
+
+        failures = 0
+        while self._pending and failures < 3:
+            if not await self.flush():
+                failures += 1
+                await asyncio.sleep(0.5 * failures)
+        if self._spool_writer is not None:
+            await self._spool_writer
+        self._spool.close()
+        if self._pending:
+            logger.warning(f"[WriteBehind] {len(self._pending)} records left in {self._spool_path}; replayed on next start")
+        else:
+            os.remove(self._spool_path)
+        self._spool = None
+        logger.info("[WriteBehind] Stopped")
+
+    # ==================== Flushing ====================
+
+    async def flush(self) -> bool:
+        """Write up to one batch of queued rows; False if nothing could be written"""
+        if not self._pending:
+            return True
+
+        taken: List[int] = []
+        groups: Dict[Tuple[str, str, bool], "OrderedDict[Any, Dict[str, Any]]"] = {}
+        count = 0
+        for seq, record in self._pending.items():
+            if taken and count + len(record["rows"]) > self.batch_size:
+                break
+            taken.append(seq)
+            count += len(record["rows"])
+            group = groups.setdefault(
+                (record["table"], record["on_conflict"], record.get("replay", False)), OrderedDict()
+            )
+            key_columns = record["on_conflict"].split(",")
+            # One upsert cannot touch the same key twice; the latest write wins
+            for row in record["rows"]:
+                group[tuple(row.get(c) for c in key_columns)] = row
+
+        failed: List[Tuple[str, str, Dict[str, Any]]] = []
+        wrote_any = False
+        for (table, on_conflict, replay), grouped in groups.items():
+            rows = list(grouped.values())
+            if await self.db.write_rows(table, rows, on_conflict, ignore_duplicates=replay):
+                wrote_any = True
+                continue
+            self.stats["failed_flushes"] += 1
+            if len(rows) == 1:
+                failed.append((table, on_conflict, rows[0]))
+                continue
+            # Find the rows the DB rejects instead of retrying the whole batch forever
+            for row in rows:
+                if await self.db.write_rows(table, [row], on_conflict, ignore_duplicates=replay):
+                    wrote_any = True
+                else:
+                    failed.append((table, on_conflict, row))
+
+        if failed:
+            attempts = 1 + max(self._pending[seq].get("attempts", 0) for seq in taken)
+            if not wrote_any and attempts < DEAD_LETTER_ATTEMPTS:
+                # Nothing got through: more likely the DB is down than the rows bad
+                for seq in taken:
+                    self._pending[seq]["attempts"] = attempts
+                return False
+            await self._dead_letter(failed)
+
+        for seq in taken:
+            del self._pending[seq]
+        self.stats["flushed"] += count - len(failed)
+        if self._pending:
+            await self._append({"ack": taken})
+        else:
+            # Everything is persisted: start the spool over
+            await self._spool_op(None)
+        return True
+
+    async def _dead_letter(self, failed: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """Move rows the DB keeps rejecting out of the queue, keeping a copy on disk"""
+        lines = [
+            json.dumps({"table": table, "row": row}, ensure_ascii=False, default=str) + "\n"
+            for table, _, row in failed
+        ]
+        try:
+            await asyncio.to_thread(self._write_dead_letter, lines)
+        except OSError as e:
+            logger.error(f"[WriteBehind] Could not write {self.dead_letter_path}: {e}")
+        self.stats["dead_lettered"] += len(failed)
+        by_table: Dict[str, List[str]] = {}
+        for table, on_conflict, row in failed:
+            key = ",".join(str(row.get(c)) for c in on_conflict.split(","))
+            by_table.setdefault(table, []).append(key)
+        for table, ids in by_table.items():
+            logger.error(
+                f"[WriteBehind] Dropped {len(ids)} rows from {table} to {self.dead_letter_path}: {'; '.join(ids)}"
+            )
+
+    def _write_dead_letter(self, lines: List[str]) -> None:
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def _run(self) -> None:
+        backoff = self.flush_interval
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                while self._pending and not self._stopping:
+                    if not await self.flush():
+                        break
+                backoff = self.flush_interval if not self._pending else min(max(backoff, 0.5) * 2, MAX_BACKOFF)
+            except Exception as e:
+                logger.warning(f"[WriteBehind] Flush error: {e}")
+                backoff = min(max(backoff, 0.5) * 2, MAX_BACKOFF)
+
+    # ==================== Spool ====================
+
+    async def _enqueue(self, table: str, rows: List[Dict[str, Any]], on_conflict: str, replay: bool = False) -> None:
+        """Queue rows; returns once their spool record is on disk"""
+        self._seq += 1
+        record = {"seq": self._seq, "table": table, "on_conflict": on_conflict, "rows": rows}
+        if replay:
+            record["replay"] = True
+        # Spooled before it can be acked: both go through the same ordered buffer
+        written = self._append(record)
+        self._pending[self._seq] = record
+        self.stats["enqueued"] += len(rows)
+        if sum(len(r["rows"]) for r in self._pending.values()) >= self.batch_size:
+            self._wake.set()
+        await written
+
+    def _append(self, record: Dict[str, Any]) -> "asyncio.Future":
+        return self._spool_op(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def _spool_op(self, line: Optional[str]) -> "asyncio.Future":
+        """
+        Buffer a spool line (None truncates the spool) and return a future
+        resolved once it is fsynced. One writer task drains the buffer in a
+        thread, so a burst of saves shares a single write + fsync.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._spool_buffer.append((line, future))
+        if self._spool_writer is None or self._spool_writer.done():
+            self._spool_writer = asyncio.create_task(self._drain_spool())
+        return future
+
+    async def _drain_spool(self) -> None:
+        while self._spool_buffer:
+            batch, self._spool_buffer = self._spool_buffer, []
+            try:
+                await asyncio.to_thread(self._write_spool, [line for line, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    def _write_spool(self, lines: List[Optional[str]]) -> None:
+        for line in lines:
+            if line is None:
+                self._spool.seek(0)
+                self._spool.truncate()
+            else:
+                self._spool.write(line)
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+
+    def _recover_spools(self) -> List[Tuple[str, List[Dict[str, Any]], str]]:
+        """Collect unacknowledged records from spools no live worker holds"""
+        recovered: List[Tuple[str, List[Dict[str, Any]], str]] = []
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "spool-*.jsonl"))):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    if fcntl is not None:
+                        try:
+                            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        except OSError:
+                            continue  # owned by a running worker
+                    records: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue  # torn write at crash time
+                        if "ack" in entry:
+                            for seq in entry["ack"]:
+                                records.pop(seq, None)
+                        else:
+                            records[entry["seq"]] = entry
+                    recovered.extend((r["table"], r["rows"], r["on_conflict"]) for r in records.values())
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"[WriteBehind] Could not recover {path}: {e}")
+        return recovered
+
+
+# Singleton
+_write_behind_service: Optional[WriteBehindService] = None
+
+def get_write_behind_service() -> WriteBehindService:
+    """Get or create Write-behind service instance"""
+    global _write_behind_service
+    if _write_behind_service is None:
+        _write_behind_service = WriteBehindService()
+    return _write_behind_service
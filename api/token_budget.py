@@ -0,0 +1,198 @@
+"""
+Token Budget - Shared context packing for prompt builders
+
+Prompt builders used to cut inputs with fixed character slices, which wastes
+context on short inputs, overflows on CJK-heavy text (~1 token per character)
+and can cut JSON in half. This module:
+1. Counts tokens with a cached tokenizer (tiktoken when installed, otherwise
+   a CJK-aware estimate)
+2. Splits a per-model input budget across prompt sections by priority
+3. Truncates text at sentence boundaries and JSON by shrinking string values,
+   so the result is always valid
+"""
+
+import re
+import json
+from functools import lru_cache
+from typing import Optional, Dict, Any, List
+
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# Input tokens we are willing to spend on variable context per model.
+# Deliberately far below the context window: latency and cost grow with
+# prompt size, and the instructions/output need room too.
+MODEL_CONTEXT_BUDGETS = {
+    "gpt-4o-mini": 12000,
+    "gpt-4o": 12000,
+    "sonar": 6000,
+    "sonar-pro": 8000,
+}
+
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+_SENTENCE_END_RE = re.compile(r"[。！？!?；;.\n](?=\s|$)|[。！？；\n]")
+
+
+@lru_cache(maxsize=8)
+def _get_encoder(model: str):
+    """Load (once per model) a tiktoken encoder, or None if unavailable"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            return None
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """Count tokens in text for a model (short strings are memoized)"""
+    if not text:
+        return 0
+    if len(text) <= 2000:
+        return _count_tokens_cached(text, model)
+    return _count_tokens(text, model)
+
+
+@lru_cache(maxsize=4096)
+def _count_tokens_cached(text: str, model: str) -> int:
+    return _count_tokens(text, model)
+
+
+def _count_tokens(text: str, model: str) -> int:
+    encoder = _get_encoder(model)
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    # Estimate: CJK characters are ~1 token each, other text ~4 chars/token
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def get_context_budget(model: str = DEFAULT_MODEL) -> int:
+    """Token budget for variable prompt context on a model"""
+    return MODEL_CONTEXT_BUDGETS.get(model, MODEL_CONTEXT_BUDGETS[DEFAULT_MODEL])
+
+
+def truncate_text(text: str, max_tokens: int, model: str = DEFAULT_MODEL) -> str:
+    """
+    Trim text to at most max_tokens, cutting at the last sentence boundary
+    that fits (falls back to a hard cut if no boundary is close enough).
+    """
+    if not text or max_tokens <= 0:
+        return ""
+    total = count_tokens(text, model)
+    if total <= max_tokens:
+        return text
+
+    # Binary search the longest prefix that fits, then back off to a sentence end
+    lo, hi = 0, min(len(text), max(1, int(len(text) * max_tokens / total) * 2))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid], model) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    prefix = text[:lo]
+
+    boundary = None
+    for match in _SENTENCE_END_RE.finditer(prefix):
+        boundary = match.end()
+    # Only honour the boundary if it keeps most of the allowed text
+    if boundary and boundary >= len(prefix) * 0.6:
+        prefix = prefix[:boundary]
+    return prefix.rstrip()
+
+
+def truncate_json(value: Any, max_tokens: int, model: str = DEFAULT_MODEL) -> str:
+    """
+    Serialize value as JSON within max_tokens. Long string values are
+    shortened (longest first) instead of cutting the document, so the
+    output always parses.
+    """
+    text = json.dumps(value, ensure_ascii=False)
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    def shrink(node: Any, limit: int) -> Any:
+        if isinstance(node, str):
+            return node if len(node) <= limit else node[:limit] + "…"
+        if isinstance(node, dict):
+            return {k: shrink(v, limit) for k, v in node.items()}
+        if isinstance(node, list):
+            return [shrink(v, limit) for v in node]
+        return node
+
+    lo, hi = 0, len(text)
+    best = json.dumps(shrink(value, 0), ensure_ascii=False)
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        candidate = json.dumps(shrink(value, mid), ensure_ascii=False)
+        if count_tokens(candidate, model) <= max_tokens:
+            best, lo = candidate, mid + 1
+        else:
+            hi = mid - 1
+    return best
+
+
+def pack_sections(
+    sections: List[Dict[str, Any]],
+    model: str = DEFAULT_MODEL,
+    budget: Optional[int] = None
+) -> Dict[str, str]:
+    """
+    Fit prompt sections into a shared token budget.
+
+    Each section is a dict:
+        {"name": str, "text": str | <json-serializable>, "priority": int (lower first),
+         "max_tokens": int (optional cap), "json": bool (optional)}
+
+    Sections are filled in priority order; each takes what it needs (up to its
+    cap) from what is left. Short inputs therefore leave room for later
+    sections instead of wasting a fixed slice.
+    Returns {name: packed_text}.
+    """
+    remaining = budget if budget is not None else get_context_budget(model)
+    packed: Dict[str, str] = {}
+
+    for section in sorted(sections, key=lambda s: s.get("priority", 100)):
+        name = section["name"]
+        cap = section.get("max_tokens")
+        allowed = remaining if cap is None else min(cap, remaining)
+        value = section.get("text")
+
+        if section.get("json"):
+            text = truncate_json(value, allowed, model) if allowed > 0 else ""
+        else:
+            text = truncate_text(value or "", allowed, model)
+
+        packed[name] = text
+        remaining = max(0, remaining - count_tokens(text, model))
+
+    return packed
+
+
+def split_by_tokens(text: str, max_tokens: int, model: str = DEFAULT_MODEL) -> List[str]:
+    """Split text into consecutive parts of at most max_tokens, each ending on a sentence boundary"""
+    parts: List[str] = []
+    remaining = (text or "").strip()
+    while remaining:
+        part = truncate_text(remaining, max_tokens, model)
+        if not part:
+            break
+        parts.append(part)
+        remaining = remaining[len(part):].strip()
+    return parts
+
+
+def fit_text(text: Optional[str], max_tokens: int, model: str = DEFAULT_MODEL) -> str:
+    """Single-section shorthand for truncate_text that tolerates None"""
+    return truncate_text(text or "", max_tokens, model)
+
+
+def fit_json(value: Any, max_tokens: int, model: str = DEFAULT_MODEL) -> str:
+    """Single-section shorthand for truncate_json"""
+    return truncate_json(value, max_tokens, model)
@@ -0,0 +1,278 @@
+"""
+Tracing - OpenTelemetry spans for requests, service methods and upstream calls
+
+A slow request becomes one trace:
+- A server span per HTTP request, named "<METHOD> <route template>"
+- A span per public service method (see trace_service), e.g.
+  "SearchService.discover_competitors"
+- A client span per upstream call, opened by api.metrics.track_upstream
+  (httpx transports, Firecrawl, Supabase), with URL, status and, for LLM
+  calls, model and token counts
+
+TRACE_EXPORTER selects where finished spans go:
+- ""        tracing off (spans are non-recording and nearly free)
+- "console" pretty-printed to stdout
+- "file"    one JSON object per line in TRACE_FILE (for offline analysis)
+- "otlp"    an OTLP/HTTP collector (standard OTEL_EXPORTER_OTLP_* variables)
+
+Incoming W3C traceparent headers are honoured so traces can start upstream.
+opentelemetry-api/-sdk are optional: without them everything here is a no-op.
+"""
+
+import functools
+import inspect
+import json
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any
+
+from api.config import get_settings
+from api.logging_config import get_logger
+
+try:
+    from opentelemetry import trace, propagate
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:
+    trace = None
+
+logger = get_logger(__name__)
+
+TRACER_NAME = "geo-content-engine"
+
+_configured = False
+
+
+class _NoopSpan:
+    """Stand-in when opentelemetry is not installed"""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def set_status(self, *args, **kwargs):
+        pass
+
+    def record_exception(self, exc, *args, **kwargs):
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def setup_tracing() -> None:
+    """Install a tracer provider and exporter once per process (TRACE_EXPORTER)"""
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    settings = get_settings()
+    exporter_name = settings.trace_exporter.lower()
+    if not exporter_name or trace is None:
+        return
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        logger.warning("TRACE_EXPORTER is set but opentelemetry-sdk is not installed; tracing disabled")
+        return
+
+    if exporter_name == "console":
+        exporter = ConsoleSpanExporter()
+    elif exporter_name == "file":
+        exporter = _file_exporter(settings.trace_file)
+    elif exporter_name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("TRACE_EXPORTER=otlp needs opentelemetry-exporter-otlp-proto-http; tracing disabled")
+            return
+        exporter = OTLPSpanExporter()
+    else:
+        logger.warning(f"Unknown TRACE_EXPORTER {exporter_name!r}; tracing disabled")
+        return
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": TRACER_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(settings.trace_sample_rate)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    logger.info(f"Tracing enabled ({exporter_name})")
+
+
+def shutdown_tracing() -> None:
+    """Flush spans still waiting in the batch processor"""
+    if trace is None:
+        return
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+def _file_exporter(path: str):
+    """SpanExporter writing one JSON line per span"""
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    class JsonLinesSpanExporter(SpanExporter):
+        def __init__(self):
+            self._lock = threading.Lock()
+
+        def export(self, spans) -> "SpanExportResult":
+            lines = "".join(json.dumps(json.loads(span.to_json())) + "\n" for span in spans)
+            try:
+                with self._lock, open(path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+            except OSError as e:
+                logger.warning(f"Could not write spans to {path}: {e}")
+                return SpanExportResult.FAILURE
+            return SpanExportResult.SUCCESS
+
+    return JsonLinesSpanExporter()
+
+
+def get_tracer():
+    return trace.get_tracer(TRACER_NAME) if trace is not None else None
+
+
+@contextmanager
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None, kind: str = "internal"):
+    """
+    Child span of whatever is current. Exceptions are recorded on the span
+    and re-raised. Yields the span (a no-op object without opentelemetry).
+    """
+    if trace is None:
+        yield _NOOP_SPAN
+        return
+    span_kind = {"server": SpanKind.SERVER, "client": SpanKind.CLIENT}.get(kind, SpanKind.INTERNAL)
+    with get_tracer().start_as_current_span(name, kind=span_kind, attributes=_clean(attributes)) as span:
+        yield span
+
+
+def current_span():
+    """The active span (non-recording when there is none)"""
+    return trace.get_current_span() if trace is not None else _NOOP_SPAN
+
+
+def set_span_attributes(**attributes: Any) -> None:
+    """Attach attributes to the active span, skipping None values"""
+    span = current_span()
+    if span.is_recording():
+        span.set_attributes(_clean(attributes))
+
+
+def mark_span_error(span, description: str = "") -> None:
+    if trace is not None and span.is_recording():
+        span.set_status(Status(StatusCode.ERROR, description or None))
+
+
+def record_llm_usage(response: Any, model: Optional[str] = None) -> None:
+    """
+    Model and token counts of a chat completion on the active span. Accepts
+    SDK response objects (OpenAI) and decoded JSON bodies (Perplexity).
+    """
+    def field(obj, name):
+        return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+    usage = field(response, "usage")
+    set_span_attributes(**{
+        "llm.model": field(response, "model") or model,
+        "llm.prompt_tokens": field(usage, "prompt_tokens"),
+        "llm.completion_tokens": field(usage, "completion_tokens"),
+        "llm.total_tokens": field(usage, "total_tokens"),
+    })
+
+
+def _clean(attributes: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """OpenTelemetry only accepts primitive attribute values"""
+    cleaned = {}
+    for key, value in (attributes or {}).items():
+        if value is None:
+            continue
+        cleaned[key] = value if isinstance(value, (str, bool, int, float)) else str(value)
+    return cleaned
+
+
+def traced(name: Optional[str] = None):
+    """Decorator: run a sync or async function inside its own span"""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def trace_service(cls):
+    """Class decorator: a span per public async method, named "<Class>.<method>" """
+    for attr, value in list(vars(cls).items()):
+        if not attr.startswith("_") and inspect.iscoroutinefunction(value):
+            setattr(cls, attr, traced(f"{cls.__name__}.{attr}")(value))
+    return cls
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening the server span for each HTTP request. Recent
+    FastAPI versions open one natively around the whole app; in that case
+    this middleware steps aside rather than adding a duplicate.
+    """
+
+    def __init__(self, app, skip_paths=("/api/metrics", "/api/health")):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if (trace is None or scope["type"] != "http" or scope.get("path") in self.skip_paths
+                or trace.get_current_span().is_recording()):
+            await self.app(scope, receive, send)
+            return
+
+        from api.metrics import route_template
+
+        method = scope.get("method", "")
+        carrier = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope.get("headers") or []}
+        parent = propagate.extract(carrier)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        span = get_tracer().start_span(
+            f"{method} {scope.get('path', '')}", context=parent, kind=SpanKind.SERVER,
+            attributes={"http.method": method, "http.target": scope.get("path", "")}
+        )
+        try:
+            with trace.use_span(span, end_on_exit=False):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            # The route is only known once the router has run
+            route = route_template(scope)
+            span.update_name(f"{method} {route}")
+            span.set_attribute("http.route", route)
+            span.set_attribute("http.status_code", status)
+            if status >= 500:
+                span.set_status(Status(StatusCode.ERROR))
+            span.end()
@@ -1,23 +1,31 @@
+"""
+Database migration runner
 
-import asyncio
+Usage:
+    python setup_db.py            # apply pending migrations (needs DATABASE_URL)
+    python setup_db.py --status   # list applied / pending migrations
+    python setup_db.py --print    # print the SQL of every migration for the Supabase SQL Editor
+
+DATABASE_URL is a Postgres connection string: a local Postgres for
+development and load tests, or the Supabase "direct connection" string.
+Migrations are versioned and recorded in schema_migrations, and every
+statement is idempotent, so re-running is always safe.
+"""
+
+import sys
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
 
 # Load environment variables
 load_dotenv('.env.local')
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("Error: SUPABASE_URL and SUPABASE_KEY must be set in .env.local")
-    exit(1)
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+DATABASE_URL = os.getenv("DATABASE_URL")
 
 # SQL statements to create tables
 SQL_COMMANDS = [
+    """
+    CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+    """,
     """
     CREATE TABLE IF NOT EXISTS projects (
         id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -40,6 +48,17 @@ SQL_COMMANDS = [
     );
     """,
     """
+    CREATE TABLE IF NOT EXISTS crawl_chunks (
+        id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+        project_id UUID REFERENCES projects(id) ON DELETE CASCADE,
+        crawl_result_id UUID REFERENCES crawl_results(id) ON DELETE CASCADE,
+        url TEXT,
+        chunk_index INTEGER DEFAULT 0,
+        content TEXT NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now())
+    );
+    """,
+    """
     CREATE TABLE IF NOT EXISTS analysis_reports (
         id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
         project_id UUID REFERENCES projects(id) ON DELETE CASCADE,
@@ -89,19 +108,182 @@ SQL_COMMANDS = [
     """
 ]
 
-async def run_migrations():
-    print("Running Supabase migrations...")
-    
-    # Note: supabase-py doesn't strictly support raw SQL execution via the client 
-    # unless 'rpc' function is set up or using direct connection.
-    # However, for many setups, we might not have direct SQL access.
-    # We will try to use the `rpc` if a 'exec_sql' function exists, 
-    # otherwise we will print instructions for the user.
-    
+# Tables read per project, newest first (see SupabaseService._select_project_rows)
+PROJECT_SCOPED_TABLES = [
+    "crawl_results",
+    "crawl_chunks",
+    "analysis_reports",
+    "generated_keywords",
+    "content_posts",
+    "tasks",
+]
+
+# Versioned migrations: (version, description, statements).
+# Never edit an applied migration; append a new one instead.
+MIGRATIONS = [
+    (1, "initial schema", SQL_COMMANDS),
+    (2, "project columns used by the app", [
+        "ALTER TABLE projects ADD COLUMN IF NOT EXISTS user_id UUID;",
+        "ALTER TABLE projects ADD COLUMN IF NOT EXISTS wp_connection JSONB;",
+        "ALTER TABLE projects ADD COLUMN IF NOT EXISTS social_connections JSONB;",
+        "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS meta_data JSONB;",
+    ]),
+    (3, "composite (project_id, created_at) indexes for paginated reads", [
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_project_created "
+        f"ON {table} (project_id, created_at DESC, id DESC);"
+        for table in PROJECT_SCOPED_TABLES
+    ] + [
+        "CREATE INDEX IF NOT EXISTS idx_projects_user_created ON projects (user_id, created_at DESC);",
+    ]),
+    (4, "unique (project_id, keyword) on generated_keywords", [
+        # Keep the newest row of each duplicate group before adding the key
+        """
+        DELETE FROM generated_keywords a
+        USING generated_keywords b
+        WHERE a.project_id = b.project_id
+          AND a.keyword = b.keyword
+          AND (a.created_at, a.id) < (b.created_at, b.id);
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_generated_keywords_project_keyword "
+        "ON generated_keywords (project_id, keyword);",
+    ]),
+    (5, "wordpress_media: uploaded media id per site and image", [
+        """
+        CREATE TABLE IF NOT EXISTS wordpress_media (
+            site TEXT NOT NULL,
+            image_hash TEXT NOT NULL,
+            media_id BIGINT NOT NULL,
+            source_url TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()),
+            PRIMARY KEY (site, image_hash)
+        );
+        """,
+    ]),
+    (6, "scheduled_posts: durable publish schedule", [
+        """
+        CREATE TABLE IF NOT EXISTS scheduled_posts (
+            id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+            project_id UUID REFERENCES projects(id) ON DELETE CASCADE,
+            post_id UUID REFERENCES content_posts(id) ON DELETE CASCADE,
+            platform TEXT NOT NULL,
+            target JSONB,
+            publish_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            last_error TEXT,
+            result JSONB,
+            claimed_at TIMESTAMP WITH TIME ZONE,
+            published_at TIMESTAMP WITH TIME ZONE,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()),
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now())
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_posts_status_publish_at "
+        "ON scheduled_posts (status, publish_at);",
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_posts_project_created "
+        "ON scheduled_posts (project_id, created_at DESC, id DESC);",
+    ]),
+    (7, "unique (crawl_result_id, chunk_index) on crawl_chunks", [
+        # Concurrent backfills may have stored a page's chunks twice; keep the oldest
+        """
+        DELETE FROM crawl_chunks a
+        USING crawl_chunks b
+        WHERE a.crawl_result_id = b.crawl_result_id
+          AND a.chunk_index = b.chunk_index
+          AND (a.created_at, a.id) > (b.created_at, b.id);
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_crawl_chunks_result_chunk "
+        "ON crawl_chunks (crawl_result_id, chunk_index);",
+    ]),
+]
+
+MIGRATIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description TEXT,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now())
+);
+"""
+
+
+def connect():
+    """Open a Postgres connection from DATABASE_URL"""
+    try:
+        import psycopg
+    except ImportError:
+        print("Error: psycopg is required to run migrations (pip install 'psycopg[binary]')")
+        sys.exit(1)
+    return psycopg.connect(DATABASE_URL)
+
+
+def applied_versions(conn) -> set:
+    with conn.cursor() as cur:
+        cur.execute(MIGRATIONS_TABLE_SQL)
+        cur.execute("SELECT version FROM schema_migrations")
+        versions = {row[0] for row in cur.fetchall()}
+    conn.commit()
+    return versions
+
+
+def run_migrations():
+    """Apply pending migrations in order, one transaction per migration"""
+    with connect() as conn:
+        done = applied_versions(conn)
+        pending = [m for m in MIGRATIONS if m[0] not in done]
+        if not pending:
+            print("Database is up to date.")
+            return
+
+        for version, description, statements in pending:
+            print(f"Applying migration {version}: {description}")
+            try:
+                with conn.transaction():
+                    with conn.cursor() as cur:
+                        for sql in statements:
+                            cur.execute(sql)
+                        cur.execute(
+                            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s) "
+                            "ON CONFLICT (version) DO NOTHING",
+                            (version, description)
+                        )
+            except Exception as e:
+                print(f"❌ Migration {version} failed, rolled back: {e}")
+                sys.exit(1)
+            print(f"✅ Migration {version} applied")
+
+
+def show_status():
+    with connect() as conn:
+        done = applied_versions(conn)
+    for version, description, _ in MIGRATIONS:
+        mark = "applied" if version in done else "pending"
+        print(f"{version:>4}  {mark:<8} {description}")
+
+
+def print_sql():
+    """
+    Fallback when there is no direct connection: print the SQL of every
+    migration (applied or not; all statements are idempotent) for the SQL Editor
+    """
     print("\nIMPORTANT: Please run the following SQL in your Supabase SQL Editor:\n")
-    for sql in SQL_COMMANDS:
-        print(sql)
+    print(MIGRATIONS_TABLE_SQL)
+    for version, description, statements in MIGRATIONS:
+        print(f"-- Migration {version}: {description}")
+        for sql in statements:
+            print(sql)
+        print(
+            f"INSERT INTO schema_migrations (version, description) "
+            f"VALUES ({version}, '{description}') ON CONFLICT (version) DO NOTHING;"
+        )
         print("-" * 50)
 
+
 if __name__ == "__main__":
-    asyncio.run(run_migrations())
+    if "--print" in sys.argv or not DATABASE_URL:
+        if not DATABASE_URL:
+            print("DATABASE_URL is not set; printing SQL instead of applying it.")
+        print_sql()
+    elif "--status" in sys.argv:
+        show_status()
+    else:
+        run_migrations()
@@ -0,0 +1,20 @@
+"""
+Shared test setup. Settings are read from the environment at import time,
+so the defaults below are set before any api module is imported: a local
+SQLite backend and no external API keys.
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("DB_BACKEND", "sqlite")
+os.environ.setdefault("LOCAL_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="geo-tests-"), "test.db"))
+os.environ.setdefault("CACHE_BUS_PATH", os.path.join(tempfile.mkdtemp(prefix="geo-tests-"), "bus.log"))
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
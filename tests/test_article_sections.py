@@ -0,0 +1,87 @@
+from api.article_sections import (
+    split_sections, join_sections, splice_sections, clean_section, stitch_article
+)
+
+ARTICLE = """# Title
+
+Intro paragraph.
+
+## First
+
+Text of the first section.
+
+```python
+# not a heading
+
+
+x = 1
+```
+
+### A sub-heading
+
+More text.
+
+## Second
+
+Second text.
+
+
+
+## Third
+
+Third text.
+"""
+
+
+def test_split_finds_sections_and_ignores_code_fences():
+    preamble, sections = split_sections(ARTICLE)
+    assert preamble == "# Title\n\nIntro paragraph."
+    assert [s["heading"] for s in sections] == ["First", "Second", "Third"]
+    assert all(s["level"] == 2 for s in sections)
+    assert "### A sub-heading" in sections[0]["text"]
+    assert "# not a heading" in sections[0]["text"]
+
+
+def test_split_join_round_trip():
+    preamble, sections = split_sections(ARTICLE)
+    joined = join_sections(preamble, [s["text"] for s in sections])
+    assert split_sections(joined) == (preamble, sections)
+
+
+def test_article_without_sections():
+    assert split_sections("# Title\n\nJust text.") == ("# Title\n\nJust text.", [])
+
+
+def test_clean_section_normalizes_headings():
+    text = "```markdown\n# Article title\n## First\n\nBody\n## Stray\nMore\n```"
+    cleaned = clean_section(text, "First")
+    assert cleaned == "## First\n\nBody\n### Stray\nMore"
+
+
+def test_clean_section_keeps_code_blocks():
+    cleaned = clean_section("Body\n\n\n\n```\na\n\n\n\nb\n```", "Heading")
+    assert cleaned == "## Heading\n\nBody\n\n```\na\n\n\n\nb\n```"
+
+
+def test_stitch_then_split():
+    article = stitch_article("Title", "Intro.", ["## A\n\na", "## B\n\nb"])
+    preamble, sections = split_sections(article)
+    assert preamble == "# Title\n\nIntro."
+    assert [s["text"] for s in sections] == ["## A\n\na", "## B\n\nb"]
+
+
+def test_splice_without_replacements_is_exact():
+    assert splice_sections(ARTICLE, {}) == ARTICLE
+
+
+def test_splice_replaces_only_the_given_section():
+    spliced = splice_sections(ARTICLE, {1: "## Second\n\nRewritten."})
+    assert spliced == ARTICLE.replace("Second text.", "Rewritten.")
+    # Untouched sections, code blocks and blank runs are kept byte for byte
+    assert "# not a heading\n\n\nx = 1" in spliced
+    assert "Rewritten.\n\n\n\n## Third" in spliced
+
+
+def test_splice_replaces_the_intro_and_keeps_the_title():
+    spliced = splice_sections(ARTICLE, {}, intro="New intro.")
+    assert spliced == ARTICLE.replace("Intro paragraph.", "New intro.")
@@ -0,0 +1,34 @@
+from api.services import cache_service
+from api.services.cache_service import InvalidationBus
+
+
+def test_poll_returns_what_other_workers_published(tmp_path):
+    path = str(tmp_path / "bus.log")
+    reader, writer = InvalidationBus(path), InvalidationBus(path)
+    writer.publish("projects", "p1")
+    writer.publish("posts", "p2")
+    assert reader.poll() == [("projects", "p1"), ("posts", "p2")]
+    assert reader.poll() == []
+
+
+def test_rotation_is_seen_even_when_the_new_file_outgrows_the_offset(tmp_path, monkeypatch):
+    path = str(tmp_path / "bus.log")
+    reader, writer = InvalidationBus(path), InvalidationBus(path)
+    writer.publish("projects", "old")
+    assert reader.poll() == [("projects", "old")]
+
+    monkeypatch.setattr(cache_service, "BUS_MAX_BYTES", 0)
+    # The rotated bus ends up longer than the reader's offset into the old one
+    writer.publish("projects", "a-much-longer-key-after-rotation")
+    assert reader.poll() is None
+    monkeypatch.setattr(cache_service, "BUS_MAX_BYTES", 1024 * 1024)
+    writer.publish("projects", "next")
+    # The new file is read from its start
+    assert reader.poll() == [("projects", "a-much-longer-key-after-rotation"), ("projects", "next")]
+
+
+def test_bus_created_after_the_reader_is_not_a_rotation(tmp_path):
+    path = str(tmp_path / "bus.log")
+    reader = InvalidationBus(path)
+    InvalidationBus(path).publish("projects", "p1")
+    assert reader.poll() == [("projects", "p1")]
@@ -0,0 +1,118 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from api.services.export_service import ExportService, EXPORT_ENTITIES, ENTITY_TABLES, parse_include
+from api.services.supabase_service import decode_cursor
+
+
+class FakeDB:
+    """Keyset pagination over in-memory rows, like get_project_page"""
+
+    def __init__(self, rows_by_table, fail_on_call=None):
+        self.rows = {
+            table: sorted(rows, key=lambda r: (r["created_at"], r["id"]), reverse=True)
+            for table, rows in rows_by_table.items()
+        }
+        self.calls = 0
+        self.fail_on_call = fail_on_call
+
+    async def get_project_page(self, table, project_id, cursor=None, limit=None):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError("connection reset")
+        rows = [r for r in self.rows.get(table, []) if r["project_id"] == project_id]
+        position = decode_cursor(cursor)
+        if position:
+            rows = [r for r in rows if (r["created_at"], r["id"]) < position]
+        return rows[:limit] if limit else rows
+
+
+def make_rows(count, **fields):
+    start = datetime(2026, 1, 1)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "project_id": "p1",
+            "created_at": (start + timedelta(seconds=i)).isoformat(),
+            **{k: (v(i) if callable(v) else v) for k, v in fields.items()},
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def service():
+    svc = ExportService()
+    svc.db = FakeDB({
+        "tasks": make_rows(450, title=lambda i: f"Task {i}", status="DONE", meta_data={"n": 1}),
+        "generated_keywords": make_rows(3, keyword=lambda i: f"kw,{i}", source="ai"),
+        "content_posts": [],
+        "crawl_results": make_rows(2, url="https://x.com", content="line1\nline2"),
+    })
+    return svc
+
+
+def collect(svc, **kwargs) -> bytes:
+    async def run():
+        return b"".join([chunk async for chunk in svc.stream("p1", **kwargs)])
+    return asyncio.run(run())
+
+
+def test_ndjson_pages_through_every_row(service):
+    lines = collect(service, format="ndjson").decode().splitlines()
+    records = [json.loads(line) for line in lines]
+    tasks = [r for r in records if r["type"] == "tasks"]
+    assert len(tasks) == 450
+    assert len({t["id"] for t in tasks}) == 450
+    assert [r["type"] for r in records].count("keywords") == 3
+    # Newest first within an entity
+    assert tasks[0]["title"] == "Task 449"
+
+
+def test_json_is_one_valid_document(service):
+    document = json.loads(collect(service, format="json", entities=["keywords", "posts"]))
+    assert document["project_id"] == "p1"
+    assert len(document["keywords"]) == 3
+    assert document["posts"] == []
+
+
+def test_csv_has_a_type_column_and_escapes_values(service):
+    text = collect(service, format="csv", entities=["keywords", "crawl_results"]).decode("utf-8")
+    assert text.startswith("\ufeff")
+    rows = list(csv.reader(io.StringIO(text.lstrip("\ufeff"))))
+    header, body = rows[0], rows[1:]
+    assert header[0] == "type"
+    assert len(body) == 5
+    keyword = dict(zip(header, body[0]))
+    assert keyword["type"] == "keywords" and keyword["keyword"].startswith("kw,")
+    crawl = dict(zip(header, body[-1]))
+    assert crawl["content"] == "line1\nline2"
+
+
+def test_gzip_output_decompresses_to_the_plain_export(service):
+    plain = collect(service, format="ndjson", entities=["keywords"])
+    compressed = collect(service, format="ndjson", entities=["keywords"], compress=True)
+    assert gzip.decompress(compressed) == plain
+
+
+def test_db_error_aborts_the_stream(service):
+    # The second tasks page fails: the stream must raise, not end early
+    service.db.fail_on_call = 2
+    with pytest.raises(RuntimeError):
+        collect(service, format="ndjson", entities=["tasks"])
+
+
+def test_unknown_format_and_entities_are_rejected(service):
+    with pytest.raises(ValueError):
+        collect(service, format="xml")
+    with pytest.raises(ValueError):
+        parse_include("tasks,secrets")
+    assert parse_include(None) == list(EXPORT_ENTITIES)
+    assert set(ENTITY_TABLES) == set(EXPORT_ENTITIES)
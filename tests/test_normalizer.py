@@ -0,0 +1,53 @@
+from api.services.normalizer_service import NormalizerService
+
+CHROME = "Menu Home About Pricing Contact\n\n© 2024 Acme Inc. All rights reserved."
+# Digits are ignored when matching lines, so page bodies differ in words
+TOPICS = ["widgets", "gadgets", "sprockets", "gizmos", "doohickeys"]
+
+
+def page(body: str) -> str:
+    return f"{CHROME}\n\n{body}"
+
+
+def test_chrome_repeated_across_pages_is_stripped():
+    normalizer = NormalizerService()
+    for i, topic in enumerate(TOPICS[:3]):
+        normalizer.normalize(page(f"All about {topic}."), f"https://acme.com/p{i}")
+
+    cleaned = normalizer.normalize(page("All about gizmos."), "https://acme.com/new")
+    assert cleaned == "All about gizmos."
+
+
+def test_chrome_is_kept_until_enough_pages_are_seen():
+    normalizer = NormalizerService()
+    cleaned = normalizer.normalize(page("Only page."), "https://acme.com/")
+    assert "Menu Home About" in cleaned
+
+
+def test_number_only_lines_are_kept():
+    cleaned = NormalizerService().normalize("Pricing\n\n$49/mo\n\n2024\n\n99.9%\n\n---\n\n-")
+    assert cleaned == "Pricing\n\n$49/mo\n\n2024\n\n99.9%"
+
+
+def test_rescraping_one_url_does_not_empty_it():
+    normalizer = NormalizerService()
+    markdown = "# Acme\n\nWe sell widgets.\n\nContact us today."
+    results = [normalizer.normalize(markdown, "https://acme.com/") for _ in range(5)]
+    assert results == [results[0]] * 5
+    assert "We sell widgets." in results[0]
+
+
+def test_page_made_only_of_chrome_is_not_emptied():
+    normalizer = NormalizerService()
+    for i, topic in enumerate(TOPICS[:4]):
+        normalizer.normalize(page(f"All about {topic}."), f"https://acme.com/p{i}")
+    assert normalizer.normalize(CHROME, "https://acme.com/about") != ""
+
+
+def test_normalize_pages_strips_chrome_from_the_first_page():
+    pages = [
+        {"url": f"https://acme.com/p{i}", "content": page(f"All about {topic}.")}
+        for i, topic in enumerate(TOPICS[:3])
+    ]
+    cleaned = NormalizerService().normalize_pages(pages)
+    assert cleaned == ["All about widgets.", "All about gadgets.", "All about sprockets."]
@@ -0,0 +1,46 @@
+import base64
+import json
+import uuid
+
+import pytest
+
+from api.services.supabase_service import encode_cursor, decode_cursor, next_cursor, InvalidCursor
+
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def test_round_trip():
+    row = {"created_at": "2026-01-02T03:04:05.123456+00:00", "id": str(uuid.uuid4())}
+    assert decode_cursor(encode_cursor(row)) == (row["created_at"], row["id"])
+
+
+def test_absent_cursor():
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+
+
+def test_zulu_and_naive_timestamps_are_accepted():
+    row_id = str(uuid.uuid4())
+    assert decode_cursor(raw_cursor(["2026-01-02T03:04:05Z", row_id]))[0] == "2026-01-02T03:04:05Z"
+    assert decode_cursor(raw_cursor(["2026-01-02T03:04:05.5", row_id]))[0] == "2026-01-02T03:04:05.5"
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 !",
+    raw_cursor("just a string"),
+    raw_cursor(["2026-01-02T03:04:05", "1"]),
+    raw_cursor(['x",id.gt.0', str(uuid.uuid4())]),
+    raw_cursor(["2026-01-02", "00000000-0000-0000-0000-000000000000", "extra"]),
+])
+def test_malformed_cursors_raise(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_next_cursor_only_for_full_pages():
+    rows = [{"created_at": "2026-01-01T00:00:00", "id": str(uuid.uuid4())} for _ in range(3)]
+    assert next_cursor(rows, None) is None
+    assert next_cursor(rows, 5) is None
+    assert decode_cursor(next_cursor(rows, 3)) == (rows[-1]["created_at"], rows[-1]["id"])
@@ -0,0 +1,23 @@
+from api.services.perplexity_service import normalize_topic
+
+
+def test_case_and_whitespace_are_folded():
+    assert normalize_topic("  AI   Marketing\tTrends ") == "ai marketing trends"
+
+
+def test_full_width_characters_are_folded():
+    assert normalize_topic("ＡＩ　营销") == normalize_topic("AI 营销")
+
+
+def test_edge_punctuation_is_stripped():
+    assert normalize_topic("“AI 营销趋势？”") == "ai 营销趋势"
+    assert normalize_topic("'seo tools.'") == "seo tools"
+
+
+def test_inner_punctuation_is_kept():
+    assert normalize_topic("c++ vs. rust") == "c++ vs. rust"
+
+
+def test_empty_topic():
+    assert normalize_topic("") == ""
+    assert normalize_topic(None) == ""
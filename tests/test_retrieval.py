@@ -0,0 +1,96 @@
+import asyncio
+
+from api.services.retrieval_service import ChunkIndex, RetrievalService, chunk_text, tokenize
+
+
+def chunk(content: str, url: str = "https://acme.com/") -> dict:
+    return {"url": url, "content": content}
+
+
+def test_tokenize_drops_stopwords_and_bigrams_cjk():
+    assert tokenize("The pricing and the plans") == ["pricing", "plans"]
+    assert tokenize("价格套餐") == ["价格", "格套", "套餐"]
+
+
+def test_chunk_text_prefixes_heading_and_bounds_size():
+    text = "# Pricing\n\n" + "\n\n".join(f"Plan {i} costs money." for i in range(100))
+    chunks = chunk_text(text, max_chars=200)
+    assert len(chunks) > 1
+    assert all(c.startswith("# Pricing\n") for c in chunks)
+    assert all(len(c) <= 200 + len("# Pricing\n") for c in chunks)
+
+
+def test_search_ranks_the_relevant_chunk_first():
+    index = ChunkIndex()
+    index.add(chunk("Our pricing plans start at $49 per month.", "https://acme.com/pricing"))
+    index.add(chunk("Read customer success stories from our clients.", "https://acme.com/cases"))
+    index.add(chunk("Company history and founding team.", "https://acme.com/about"))
+
+    hits = index.search("pricing plans", k=3)
+    assert hits[0][1]["url"] == "https://acme.com/pricing"
+    # Chunks sharing no term with the query are not returned
+    assert [c["url"] for _, c in hits] == ["https://acme.com/pricing"]
+
+
+def test_rare_terms_outweigh_common_ones():
+    index = ChunkIndex()
+    for i in range(5):
+        index.add(chunk(f"Widgets page number {i} widgets"))
+    index.add(chunk("Widgets with ISO certification"))
+
+    _, best = index.search("widgets certification", k=1)[0]
+    assert best["content"] == "Widgets with ISO certification"
+
+
+def test_duplicate_chunks_are_indexed_once():
+    index = ChunkIndex()
+    assert index.add(chunk("Same text"))
+    assert not index.add(chunk("Same text", "https://acme.com/other"))
+    assert not index.add(chunk(""))
+    assert len(index) == 1
+
+
+def test_chunks_added_after_a_search_are_found():
+    index = ChunkIndex()
+    index.add(chunk("Pricing for teams"))
+    index.search("pricing")
+    index.add(chunk("Pricing for enterprises", "https://acme.com/enterprise"))
+
+    urls = [c["url"] for _, c in index.search("pricing enterprises", k=5)]
+    assert urls[0] == "https://acme.com/enterprise"
+    assert len(urls) == 2
+
+
+def test_empty_index_returns_nothing():
+    assert ChunkIndex().search("anything") == []
+
+
+class FakeDB:
+    def __init__(self):
+        self.chunks = []
+        self.saves = 0
+
+    async def get_crawl_chunks(self, project_id):
+        await asyncio.sleep(0.01)
+        return list(self.chunks)
+
+    async def get_crawl_results(self, project_id):
+        return [{"id": "r1", "url": "https://acme.com/pricing", "content": "# Pricing\n\nPlans start at $49."}]
+
+    async def save_crawl_chunks(self, chunks):
+        self.saves += 1
+        self.chunks.extend(chunks)
+        return chunks
+
+
+def test_concurrent_first_loads_backfill_once():
+    service = RetrievalService()
+    service.db = FakeDB()
+
+    async def load():
+        return await asyncio.gather(*(service.get_index("p1") for _ in range(5)))
+
+    indexes = asyncio.run(load())
+    assert service.db.saves == 1
+    assert all(index is indexes[0] for index in indexes)
+    assert indexes[0].search("pricing plans")[0][1]["crawl_result_id"] == "r1"
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+from api.services.scheduler_service import SchedulerService, to_utc, wordpress_credentials
+
+NOW = 1_800_000_000.0
+
+
+def at(offset: float) -> datetime:
+    return datetime.fromtimestamp(NOW + offset, tz=timezone.utc)
+
+
+def make_scheduler(batch_size: int = 50) -> SchedulerService:
+    scheduler = SchedulerService()
+    scheduler.batch_size = batch_size
+    return scheduler
+
+
+def test_pops_due_entries_in_time_order():
+    scheduler = make_scheduler()
+    scheduler._push("late", at(-10))
+    scheduler._push("early", at(-60))
+    scheduler._push("future", at(60))
+    assert scheduler._pop_due(NOW) == ["early", "late"]
+    assert scheduler._next_due() == NOW + 60
+    assert scheduler._pop_due(NOW) == []
+
+
+def test_batch_size_limits_a_pop():
+    scheduler = make_scheduler(batch_size=2)
+    for i in range(5):
+        scheduler._push(f"s{i}", at(-i))
+    assert len(scheduler._pop_due(NOW)) == 2
+    assert len(scheduler._pop_due(NOW)) == 2
+    assert len(scheduler._pop_due(NOW)) == 1
+
+
+def test_rescheduled_entry_uses_its_new_time():
+    scheduler = make_scheduler()
+    scheduler._push("a", at(-30))
+    scheduler._push("a", at(30))
+    assert scheduler._pop_due(NOW) == []
+    assert scheduler._pop_due(NOW + 30) == ["a"]
+    assert scheduler._next_due() is None
+
+
+def test_pushing_the_same_time_twice_does_not_duplicate():
+    scheduler = make_scheduler()
+    scheduler._push("a", at(-5))
+    scheduler._push("a", at(-5))
+    assert scheduler._pop_due(NOW) == ["a"]
+    assert scheduler._pop_due(NOW) == []
+
+
+def test_to_utc_treats_naive_times_as_utc():
+    assert to_utc("2026-01-01T00:00:00") == datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert to_utc("2026-01-01T08:00:00+08:00") == datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert to_utc(datetime(2026, 1, 1, tzinfo=timezone(timedelta(hours=-5)))).hour == 5
+
+
+def test_cancelled_entry_is_skipped():
+    scheduler = make_scheduler()
+    scheduler._push("a", at(-5))
+    scheduler._push("b", at(-1))
+    # cancel() drops the id from _due_at; its heap entry is skipped lazily
+    del scheduler._due_at["a"]
+    assert scheduler._pop_due(NOW) == ["b"]
+
+
+def test_credentials_come_from_the_project_connection():
+    project = {"wp_connection": {"url": "https://blog.acme.com/", "username": "u", "appPassword": "p"}}
+    creds = wordpress_credentials({"status": "publish", "site": "blog.acme.com"}, project)
+    assert creds == {"url": "https://blog.acme.com/", "username": "u", "app_password": "p"}
+
+
+def test_credentials_for_another_site_are_not_used():
+    project = {"wp_connection": {"url": "https://other.com", "username": "u", "app_password": "p"}}
+    assert wordpress_credentials({"site": "blog.acme.com"}, project) is None
+    assert wordpress_credentials({"site": "blog.acme.com"}, None) is None
@@ -0,0 +1,65 @@
+import json
+
+from api.token_budget import (
+    count_tokens, truncate_text, truncate_json, pack_sections, split_by_tokens, fit_text
+)
+
+
+def test_short_text_is_untouched():
+    assert truncate_text("Hello world.", 100) == "Hello world."
+
+
+def test_truncate_text_fits_and_cuts_at_sentence_end():
+    text = "This is a sentence about pricing. " * 200
+    cut = truncate_text(text, 50)
+    assert count_tokens(cut) <= 50
+    assert cut.endswith(".")
+    assert text.startswith(cut)
+
+
+def test_truncate_text_handles_cjk():
+    text = "这是一个关于产品定价的句子。" * 500
+    cut = truncate_text(text, 100)
+    assert 0 < count_tokens(cut) <= 100
+    assert cut.endswith("。")
+
+
+def test_non_positive_budget_gives_empty_text():
+    assert truncate_text("anything", 0) == ""
+    assert fit_text(None, 100) == ""
+
+
+def test_truncate_json_stays_valid():
+    value = {"name": "Acme", "about": "word " * 2000, "tags": ["a" * 500, "b"]}
+    text = truncate_json(value, 80)
+    assert count_tokens(text) <= 80
+    parsed = json.loads(text)
+    assert parsed["name"] == "Acme"
+    assert set(parsed) == set(value)
+
+
+def test_pack_sections_fills_by_priority_within_budget():
+    packed = pack_sections([
+        {"name": "low", "text": "filler text. " * 500, "priority": 2},
+        {"name": "high", "text": "important. " * 500, "priority": 1, "max_tokens": 60},
+    ], budget=100)
+    assert count_tokens(packed["high"]) <= 60
+    assert count_tokens(packed["high"]) + count_tokens(packed["low"]) <= 100
+    assert packed["low"]
+
+
+def test_short_sections_leave_room_for_later_ones():
+    packed = pack_sections([
+        {"name": "a", "text": "short.", "priority": 1, "max_tokens": 50},
+        {"name": "b", "text": "longer text. " * 100, "priority": 2},
+    ], budget=100)
+    assert packed["a"] == "short."
+    assert count_tokens(packed["b"]) > 50
+
+
+def test_split_by_tokens_keeps_all_text():
+    text = "One sentence here. " * 300
+    parts = split_by_tokens(text, 40)
+    assert len(parts) > 1
+    assert all(count_tokens(part) <= 40 for part in parts)
+    assert " ".join(parts).split() == text.split()
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import os
+
+from api.services.write_behind_service import WriteBehindService
+
+
+class FakeDB:
+    def __init__(self):
+        self.writes = []
+        self.down = False
+
+    async def write_rows(self, table, rows, on_conflict="id", ignore_duplicates=False):
+        if self.down or any(row.get("bad") for row in rows):
+            return False
+        self.writes.append((table, [row["id"] for row in rows], ignore_duplicates))
+        return True
+
+
+def make_service(spool_dir) -> WriteBehindService:
+    service = WriteBehindService()
+    service.db = FakeDB()
+    service.enabled = True
+    service.spool_dir = str(spool_dir)
+    service.dead_letter_path = os.path.join(str(spool_dir), "dead-letter.jsonl")
+    # Flush only when a test asks for it
+    service.flush_interval = 3600
+    service.batch_size = 1000
+    return service
+
+
+def spool_lines(service):
+    with open(service._spool_path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_rows_are_spooled_then_flushed_and_the_spool_reset(tmp_path):
+    async def scenario():
+        service = make_service(tmp_path)
+        await service.start()
+        await service._enqueue("content_posts", [{"id": "a"}], "id")
+        assert [r["rows"] for r in spool_lines(service)] == [[{"id": "a"}]]
+
+        assert await service.flush()
+        assert service.db.writes == [("content_posts", ["a"], False)]
+        assert spool_lines(service) == []
+        await service.stop()
+
+    asyncio.run(scenario())
+
+
+def test_partial_flush_appends_an_ack(tmp_path):
+    async def scenario():
+        service = make_service(tmp_path)
+        await service.start()
+        await service._enqueue("content_posts", [{"id": "a"}], "id")
+        await service._enqueue("content_posts", [{"id": "b"}], "id")
+        service.batch_size = 1
+
+        assert await service.flush()
+        assert spool_lines(service)[-1] == {"ack": [1]}
+        assert list(service._pending) == [2]
+        await service.stop()
+
+    asyncio.run(scenario())
+
+
+def test_orphaned_spool_is_replayed_insert_only(tmp_path):
+    records = [
+        {"seq": 1, "table": "content_posts", "on_conflict": "id", "rows": [{"id": "done"}]},
+        {"seq": 2, "table": "content_posts", "on_conflict": "id", "rows": [{"id": "lost"}]},
+        {"ack": [1]},
+    ]
+    orphan = tmp_path / "spool-99999.jsonl"
+    orphan.write_text("".join(json.dumps(r) + "\n" for r in records) + '{"seq": 3, "tab', encoding="utf-8")
+
+    async def scenario():
+        service = make_service(tmp_path)
+        await service.start()
+        assert not orphan.exists()
+        assert service.stats["recovered"] == 1
+        assert await service.flush()
+        # Only the unacked record, without overwriting a row that may have been updated since
+        assert service.db.writes == [("content_posts", ["lost"], True)]
+        await service.stop()
+
+    asyncio.run(scenario())
+
+
+def test_rejected_row_is_dead_lettered_and_acked(tmp_path):
+    async def scenario():
+        service = make_service(tmp_path)
+        await service.start()
+        await service._enqueue("content_posts", [{"id": "a"}], "id")
+        await service._enqueue("content_posts", [{"id": "b", "bad": True}], "id")
+        await service._enqueue("content_posts", [{"id": "c"}], "id")
+
+        assert await service.flush()
+        assert not service._pending
+        assert ("content_posts", ["a"], False) in service.db.writes
+        assert ("content_posts", ["c"], False) in service.db.writes
+        with open(service.dead_letter_path, encoding="utf-8") as f:
+            assert [json.loads(line)["row"]["id"] for line in f] == ["b"]
+        await service.stop()
+
+    asyncio.run(scenario())
+
+
+def test_batch_is_kept_while_nothing_can_be_written(tmp_path):
+    async def scenario():
+        service = make_service(tmp_path)
+        await service.start()
+        service.db.down = True
+        await service._enqueue("content_posts", [{"id": "a"}], "id")
+
+        assert not await service.flush()
+        assert list(service._pending) == [1]
+        assert not os.path.exists(service.dead_letter_path)
+
+        service.db.down = False
+        assert await service.flush()
+        assert service.db.writes == [("content_posts", ["a"], False)]
+        await service.stop()
+
+    asyncio.run(scenario())